@@ -0,0 +1,165 @@
+# benchmarks/bench_ingesta.py
+# Benchmark de la ingesta (utils.ris_merge) sobre corpus sintéticos de generar_ris.py:
+# parse_ris_file, load_ris_from_dirs, merge_records y export_outputs a varios tamaños.
+# Cada tamaño corre en un proceso aparte (el pico de RSS es el de ese tamaño, y uno que se
+# quede sin memoria no tumba al resto). Mide registros/s y RSS pico tras cada etapa, y los
+# compara con una línea base guardada: marca como regresión lo que empeore más que la tolerancia.
+#
+#   python benchmarks/bench_ingesta.py                               # 10k 100k 1M 10M
+#   python benchmarks/bench_ingesta.py --tamanios 10000 100000 --guardar-base
+#
+# Los corpus se generan una vez en --corpus (por defecto un temporal) y se reutilizan.
+
+import os, sys, json, time, shutil, argparse, platform, tempfile, contextlib
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ris_merge import parse_ris_file, load_ris_from_dirs, merge_records, export_outputs
+from generar_ris import generar_corpus
+
+TAMANIOS = (10_000, 100_000, 1_000_000, 10_000_000)
+ETAPAS = ("parse_ris_file", "load_ris_from_dirs", "merge_records", "export_outputs")
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linea_base_ingesta.json")
+
+def rss_pico_mb():
+    """RSS pico del proceso en MB (None si no se puede medir en esta plataforma)."""
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024   # bytes en macOS, KB en Linux
+    except ImportError:
+        pass
+    try:
+        import psutil   # opcional (Windows)
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+def _medir(resultados, etapa, registros, fn):
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    resultados[etapa] = {"segundos": dt, "registros": registros(out), "rps": registros(out) / dt if dt else None,
+                         "rss_mb": rss_pico_mb()}
+    return out
+
+def _correr_tamanio(carpeta_corpus, cola):
+    """Proceso hijo: las cuatro etapas sobre un corpus ya generado."""
+    with open(os.path.join(carpeta_corpus, "corpus.json"), "r", encoding="utf-8") as f:
+        pares = [tuple(p) for p in json.load(f)["carpetas"]]
+    res = {}
+    salida = tempfile.mkdtemp(prefix="bench_export_")
+    try:
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            def parsear():
+                n = 0
+                for carpeta, fuente in pares:
+                    for nombre in os.listdir(carpeta):
+                        n += len(parse_ris_file(os.path.join(carpeta, nombre), fuente))
+                return n
+            _medir(res, "parse_ris_file", lambda n: n, parsear)
+            registros = _medir(res, "load_ris_from_dirs", len, lambda: load_ris_from_dirs(pares, verbose=False))
+            unificados, duplicados = _medir(res, "merge_records", lambda _: len(registros), lambda: merge_records(registros))
+            del registros
+            _medir(res, "export_outputs", lambda _: len(unificados),
+                   lambda: export_outputs(unificados, duplicados, salida, base_name="bench"))
+        res["unificados"], res["duplicados"] = len(unificados), len(duplicados)
+    except MemoryError:
+        res["error"] = "MemoryError"
+    finally:
+        shutil.rmtree(salida, ignore_errors=True)
+    cola.put(res)
+
+def _corpus(carpeta, n, args):
+    destino = os.path.join(carpeta, f"corpus_{n}_s{args.semilla}_d{args.duplicados}_n{args.sin_doi}_a{args.palabras_resumen}")
+    if not os.path.isfile(os.path.join(destino, "corpus.json")):
+        print(f"🧪 Generando corpus de {n:,} registros ...")
+        t0 = time.perf_counter()
+        generar_corpus(destino, n, args.semilla, args.duplicados, args.sin_doi, palabras_resumen=args.palabras_resumen)
+        print(f"   listo en {time.perf_counter() - t0:.1f} s -> {destino}")
+    return destino
+
+def _comparar(n, res, base, tolerancia):
+    """Lista de regresiones (texto) de 'res' frente a la línea base de ese tamaño."""
+    regresiones = []
+    for etapa in ETAPAS:
+        a, b = res.get(etapa), (base.get(str(n)) or {}).get(etapa)
+        if not a or not b:
+            continue
+        if a["rps"] and b.get("rps") and a["rps"] < b["rps"] * (1 - tolerancia):
+            regresiones.append(f"{n:,} {etapa}: {a['rps']:,.0f} reg/s vs {b['rps']:,.0f} (línea base)")
+        if a["rss_mb"] and b.get("rss_mb") and a["rss_mb"] > b["rss_mb"] * (1 + tolerancia):
+            regresiones.append(f"{n:,} {etapa}: RSS pico {a['rss_mb']:,.0f} MB vs {b['rss_mb']:,.0f} MB (línea base)")
+    return regresiones
+
+def _imprimir(n, res):
+    print(f"\n📊 {n:,} registros" + (f" -> {res['unificados']:,} unificados, {res['duplicados']:,} duplicados"
+                                     if "unificados" in res else ""))
+    print(f"   {'etapa':<20}{'s':>9}{'reg/s':>13}{'RSS pico MB':>13}")
+    for etapa in ETAPAS:
+        r = res.get(etapa)
+        if r:
+            rss = f"{r['rss_mb']:,.0f}" if r["rss_mb"] is not None else "-"
+            print(f"   {etapa:<20}{r['segundos']:>9.2f}{(r['rps'] or 0):>13,.0f}{rss:>13}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de ingesta RIS (utils.ris_merge) con corpus sintéticos")
+    ap.add_argument("--tamanios", type=int, nargs="+", default=list(TAMANIOS))
+    ap.add_argument("--corpus", default=None, help="carpeta donde generar/reutilizar los corpus")
+    ap.add_argument("--semilla", type=int, default=0)
+    ap.add_argument("--duplicados", type=float, default=0.1)
+    ap.add_argument("--sin-doi", type=float, default=0.05)
+    ap.add_argument("--palabras-resumen", type=int, default=150)
+    ap.add_argument("--linea-base", default=LINEA_BASE)
+    ap.add_argument("--guardar-base", action="store_true", help="guarda estos resultados como línea base")
+    ap.add_argument("--tolerancia", type=float, default=0.15, help="empeoramiento admitido antes de marcar regresión")
+    args = ap.parse_args()
+
+    carpeta = args.corpus or tempfile.mkdtemp(prefix="bench_ingesta_")
+    try:
+        with open(args.linea_base, "r", encoding="utf-8") as f:
+            base = json.load(f)
+    except (OSError, ValueError):
+        base = {}
+    con_base = bool(base)
+
+    ctx = mp.get_context("spawn")
+    resultados, regresiones = {}, []
+    try:
+        for n in args.tamanios:
+            corpus = _corpus(carpeta, n, args)
+            cola = ctx.Queue()
+            proc = ctx.Process(target=_correr_tamanio, args=(corpus, cola))
+            proc.start()
+            proc.join()
+            res = cola.get() if not cola.empty() else {"error": f"el proceso terminó con código {proc.exitcode}"}
+            if "error" in res:
+                print(f"\n❌ {n:,} registros: {res['error']} (¿memoria insuficiente?)")
+                continue
+            resultados[str(n)] = res
+            _imprimir(n, res)
+            regresiones += _comparar(n, res, base, args.tolerancia)
+    finally:
+        if not args.corpus:
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+    if args.guardar_base and resultados:
+        base.update(resultados)
+        base["_entorno"] = {"python": platform.python_version(), "plataforma": platform.platform(),
+                            "fecha": time.strftime("%Y-%m-%d %H:%M")}
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump(base, f, ensure_ascii=False, indent=1)
+        print(f"\n💾 Línea base guardada en {args.linea_base}")
+
+    if regresiones:
+        print("\n⚠️ Regresiones frente a la línea base:")
+        for r in regresiones:
+            print("   -", r)
+        sys.exit(1)
+    elif con_base:
+        print("\n✅ Sin regresiones frente a la línea base.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_scraping.py
+# Benchmark de punta a punta de los scrapers con Selenium (SAGE y ScienceDirect) contra
+# utils.reproductor: misma secuencia que main.py / main_sciencedirect.py (login, búsqueda,
+# export RIS página por página) pero offline, en headless y repetible.
+#
+#   python benchmarks/bench_scraping.py                          # grabación sintética
+#   python benchmarks/bench_scraping.py --grabacion grabaciones  # hecha con main_pipeline.py --grabar
+#
+# Informa latencia por página (presupuesto de esperas: total / espera / trabajo) y el
+# rendimiento de cada fuente en páginas/s y registros/s.
+
+import os, sys, json, time, glob, shutil, argparse, tempfile, statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.browser import crear_navegador
+from utils.sso_google import login_con_google
+from utils.sage import buscar_en_sage, exportar_ris_paginando
+from utils.sciencedirect import (
+    abrir_home_sciencedirect, buscar_en_sciencedirect, fijar_resultados_por_pagina, descargar_varias_paginas_sd
+)
+from utils.esperas import resumen_esperas, reiniciar_esperas, imprimir_resumen_esperas
+from utils.reproductor import iniciar_reproductor, grabacion_sintetica
+
+QUERY = "generative artificial intelligence"
+SLUG = "bench"
+
+def _carpetas_grabadas(carpeta):
+    """{fuente: carpeta_host} según el origen grabado en cada indice.json."""
+    out = {}
+    for ind in glob.glob(os.path.join(carpeta, "*", "indice.json")):
+        with open(ind, "r", encoding="utf-8") as f:
+            origen = (json.load(f).get("origen") or "").lower()
+        if "sagepub" in origen:
+            out["SAGE"] = os.path.dirname(ind)
+        elif "sciencedirect" in origen:
+            out["ScienceDirect"] = os.path.dirname(ind)
+    return out
+
+def _registros(rutas):
+    n = 0
+    for r in rutas:
+        with open(r, "r", encoding="utf-8", errors="ignore") as f:
+            n += sum(1 for ln in f if ln.startswith("TY  -"))
+    return n
+
+def _cosechar(fuente, driver, url, descargas, paginas):
+    if fuente == "SAGE":
+        driver.get(url + "/")
+        buscar_en_sage(driver, QUERY, descargas)
+        return exportar_ris_paginando(driver, descargas, SLUG, max_paginas=paginas)
+    abrir_home_sciencedirect(driver, url + "/", descargas)
+    buscar_en_sciencedirect(driver, QUERY, descargas)
+    fijar_resultados_por_pagina(driver, 100)
+    return descargar_varias_paginas_sd(driver, descargas, SLUG, paginas=paginas)
+
+def _informe(fuente, corridas):
+    print(f"\n📊 {fuente}: {len(corridas)} corrida(s)")
+    segs = [c["segundos"] for c in corridas]
+    pags = sum(c["paginas"] for c in corridas)
+    regs = sum(c["registros"] for c in corridas)
+    total = sum(segs)
+    lat = [p for c in corridas for p in c["por_pagina"]]
+    print(f"   cosecha: {statistics.median(segs):.2f} s (mediana)  |  {pags} página(s), {regs} registro(s)")
+    if total:
+        print(f"   rendimiento: {pags / total:.2f} páginas/s  |  {regs / total:.1f} registros/s")
+    if lat:
+        print(f"   latencia por página: mediana {statistics.median(lat):.2f} s  |  máx {max(lat):.2f} s")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark headless de los scrapers contra grabaciones locales")
+    ap.add_argument("--grabacion", default=None, help="carpeta de main_pipeline.py --grabar (por defecto: sintética)")
+    ap.add_argument("--fuentes", nargs="+", default=["SAGE", "ScienceDirect"], choices=["SAGE", "ScienceDirect"])
+    ap.add_argument("--paginas", type=int, default=5)
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--total", type=int, default=250, help="resultados de la grabación sintética")
+    ap.add_argument("--latencia", type=float, default=0.0, help="segundos extra por respuesta del servidor")
+    ap.add_argument("--ventana", action="store_true", help="con ventana (sin headless)")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_scraping_")
+    if args.grabacion:
+        hosts = _carpetas_grabadas(args.grabacion)
+        faltan = [f for f in args.fuentes if f not in hosts]
+        if faltan:
+            sys.exit(f"❌ La grabación no tiene {', '.join(faltan)} ({args.grabacion}).")
+    else:
+        hosts = {f: grabacion_sintetica(os.path.join(tmp, "grabacion", f), f, total=args.total) for f in args.fuentes}
+
+    servidores = {f: iniciar_reproductor(hosts[f], latencia=args.latencia) for f in args.fuentes}
+    resultados = {f: [] for f in args.fuentes}
+    try:
+        for rep in range(1, args.repeticiones + 1):
+            descargas = os.path.join(tmp, f"descargas_{rep}")
+            os.makedirs(descargas)
+            driver = crear_navegador(None, descargas, headless=not args.ventana)
+            try:
+                # un solo login: la cookie de sesión vale para todos los reproductores (mismo host 127.0.0.1)
+                t0 = time.perf_counter()
+                login_con_google(driver, servidores[args.fuentes[0]][1] + "/", "bench@example.org", "-",
+                                 descargas, dominio_objetivo="127.0.0.1")
+                print(f"🔐 Corrida {rep}: login en {time.perf_counter() - t0:.2f} s")
+                for fuente in args.fuentes:
+                    reiniciar_esperas()
+                    t0 = time.perf_counter()
+                    rutas = _cosechar(fuente, driver, servidores[fuente][1], descargas, args.paginas)
+                    dt = time.perf_counter() - t0
+                    por_pagina, _ = resumen_esperas()
+                    resultados[fuente].append({
+                        "segundos": dt, "paginas": len(rutas), "registros": _registros(rutas),
+                        "por_pagina": [r["total"] for r in por_pagina.values()],
+                    })
+                    print(f"⏱️ {fuente} corrida {rep}: {len(rutas)} página(s) en {dt:.2f} s")
+                    if rep == args.repeticiones:
+                        imprimir_resumen_esperas()
+            finally:
+                driver.quit()
+    finally:
+        for srv, _ in servidores.values():
+            srv.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for fuente, corridas in resultados.items():
+        if corridas:
+            _informe(fuente, corridas)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# benchmarks/generar_ris.py
+# Generador determinista (con semilla) de corpus RIS al estilo de las exportaciones de
+# SAGE y ScienceDirect, para medir utils.ris_merge sin depender de descargas reales.
+#
+#   python benchmarks/generar_ris.py salida/ --registros 100000 --duplicados 0.15 --sin-doi 0.05
+#
+# Parámetros:
+#   registros        total de registros (duplicados incluidos)
+#   prop_duplicados  fracción que repite un registro anterior (otro formato de DOI, título con
+#                    otra puntuación/mayúsculas, a menudo desde la otra fuente)
+#   prop_sin_doi     fracción sin DOI (se deduplican por título)
+#   codificaciones   {codificación: peso} por archivo (utf-8, utf-8-sig, latin-1...)
+#   palabras_resumen largo medio del AB en palabras
+#   por_archivo      registros por archivo (como una exportación de una página)
+# Escribe <carpeta>/Sage_Journals/*.ris y <carpeta>/science_direct/*.ris.
+
+import os, json, random, argparse
+from collections import deque
+
+CARPETAS = {"SAGE": "Sage_Journals", "ScienceDirect": "science_direct"}
+CODIFICACIONES = {"utf-8": 0.8, "utf-8-sig": 0.1, "latin-1": 0.1}
+
+# Vocabulario representable en latin-1 (con tildes, para que la codificación importe)
+_PALABRAS = (
+    "generative artificial intelligence learning model language education assessment students "
+    "ethics policy análisis evaluación enseñanza aprendizaje università Ökonomie données système "
+    "framework review survey adoption chatbot writing medicine health design creativity risk "
+    "governance transformer diffusion image text bias fairness privacy workforce labour innovation"
+).split()
+_REVISTAS = {
+    "SAGE": ["Journal of Educational Computing Research", "Social Science Computer Review",
+             "Big Data & Society", "Science Communication", "Information Development"],
+    "ScienceDirect": ["Computers & Education", "Computers in Human Behavior", "Technovation",
+                      "International Journal of Information Management", "Telematics and Informatics"],
+}
+_APELLIDOS = ["García", "Smith", "Müller", "Rossi", "Nguyen", "López", "Kim", "Dubois", "Silva", "Novák"]
+
+def _titulo(rnd):
+    return " ".join(rnd.choice(_PALABRAS) for _ in range(rnd.randint(6, 14))).capitalize()
+
+def _variante_titulo(rnd, t):
+    """Mismo título canónico (ris_merge._canon_title), distinta forma."""
+    return rnd.choice([t.upper(), t.lower(), t + ".", t.replace(" ", "  ", 1), f"{t}: "])
+
+def _variante_doi(rnd, doi):
+    return rnd.choice([doi.upper(), f"https://doi.org/{doi}", f"doi:{doi}", doi])
+
+def _registro_nuevo(rnd, i, fuente, prop_sin_doi, palabras_resumen):
+    prefijo = "10.1177" if fuente == "SAGE" else "10.1016/j.bench"
+    return {
+        "fuente": fuente,
+        "titulo": _titulo(rnd),
+        "doi": None if rnd.random() < prop_sin_doi else f"{prefijo}.{i:09d}",
+        "autores": [f"{rnd.choice(_APELLIDOS)}, {chr(65 + rnd.randrange(26))}." for _ in range(rnd.randint(1, 6))],
+        "anio": rnd.randint(2015, 2025),
+        "revista": rnd.choice(_REVISTAS[fuente]),
+        "resumen": " ".join(rnd.choice(_PALABRAS) for _ in range(max(1, int(rnd.gauss(palabras_resumen, palabras_resumen / 4))))),
+        "claves": rnd.sample(_PALABRAS, rnd.randint(2, 6)),
+        "pii": f"S{i:016d}",
+    }
+
+def _ris(r, fuente):
+    """Texto RIS con las etiquetas que usa cada plataforma (SD: T1, DA, DOI como URL)."""
+    lineas = ["TY  - JOUR"]
+    if fuente == "SAGE":
+        lineas += [f"AU  - {a}" for a in r["autores"]]
+        lineas += [f"TI  - {r['titulo']}", f"JO  - {r['revista']}", f"PY  - {r['anio']}"]
+        if r["doi"]:
+            lineas += [f"DO  - {r['doi']}", f"UR  - https://doi.org/{r['doi']}"]
+    else:
+        lineas += [f"T1  - {r['titulo']}", f"JO  - {r['revista']}", f"VL  - {r['anio'] - 2000}",
+                   f"SP  - {r['anio'] % 97 + 1}", f"PY  - {r['anio']}", f"DA  - {r['anio']}/01/01"]
+        if r["doi"]:
+            lineas.append(f"DO  - {r['doi']}")
+        lineas.append(f"UR  - https://www.sciencedirect.com/science/article/pii/{r['pii']}")
+        lineas += [f"AU  - {a}" for a in r["autores"]]
+    lineas += [f"KW  - {k}" for k in r["claves"]]
+    lineas += [f"AB  - {r['resumen']}", "ER  - ", ""]
+    return "\n".join(lineas)
+
+def generar_corpus(carpeta, registros, semilla=0, prop_duplicados=0.1, prop_sin_doi=0.05, codificaciones=None,
+                   palabras_resumen=150, por_archivo=100, prop_sd=0.5):
+    """
+    Escribe el corpus en 'carpeta' y devuelve sus estadísticas (también en <carpeta>/corpus.json):
+    registros, duplicados, sin_doi, archivos por fuente y pares (carpeta, etiqueta) para
+    load_ris_from_dirs.
+    """
+    rnd = random.Random(semilla)
+    codificaciones = codificaciones or CODIFICACIONES
+    cods, pesos = list(codificaciones), list(codificaciones.values())
+    previos = deque(maxlen=10000)       # registros de los que salen los duplicados (memoria acotada)
+    buffers = {f: [] for f in CARPETAS}
+    n_archivos = {f: 0 for f in CARPETAS}
+    stats = {"registros": registros, "semilla": semilla, "duplicados": 0, "sin_doi": 0}
+
+    for f, sub in CARPETAS.items():
+        os.makedirs(os.path.join(carpeta, sub), exist_ok=True)
+
+    def volcar(fuente):
+        n_archivos[fuente] += 1
+        prefijo = "sage" if fuente == "SAGE" else "sd"
+        cod = rnd.choices(cods, pesos)[0]
+        ruta = os.path.join(carpeta, CARPETAS[fuente], f"{prefijo}_bench_p{n_archivos[fuente]}.ris")
+        with open(ruta, "w", encoding=cod, errors="replace", newline="\r\n" if rnd.random() < 0.2 else "\n") as fh:
+            fh.write("\n".join(buffers[fuente]))
+        buffers[fuente].clear()
+
+    for i in range(registros):
+        fuente = "ScienceDirect" if rnd.random() < prop_sd else "SAGE"
+        if previos and rnd.random() < prop_duplicados:
+            r = dict(rnd.choice(previos))
+            r["titulo"] = _variante_titulo(rnd, r["titulo"])
+            if r["doi"]:
+                r["doi"] = _variante_doi(rnd, r["doi"])
+            stats["duplicados"] += 1
+        else:
+            r = _registro_nuevo(rnd, i, fuente, prop_sin_doi, palabras_resumen)
+            previos.append(r)
+        stats["sin_doi"] += r["doi"] is None
+        buffers[fuente].append(_ris(r, fuente))
+        if len(buffers[fuente]) >= por_archivo:
+            volcar(fuente)
+
+    for fuente in CARPETAS:
+        if buffers[fuente]:
+            volcar(fuente)
+
+    stats["archivos"] = dict(n_archivos)
+    stats["carpetas"] = [(os.path.join(carpeta, sub), f) for f, sub in CARPETAS.items()]
+    with open(os.path.join(carpeta, "corpus.json"), "w", encoding="utf-8") as fh:
+        json.dump(stats, fh, ensure_ascii=False, indent=1)
+    return stats
+
+def _codificaciones(texto):
+    """'utf-8=0.8,latin-1=0.2' -> {'utf-8': 0.8, 'latin-1': 0.2}"""
+    out = {}
+    for parte in texto.split(","):
+        cod, _, peso = parte.partition("=")
+        out[cod.strip()] = float(peso or 1)
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Genera un corpus RIS sintético (SAGE + ScienceDirect)")
+    ap.add_argument("carpeta")
+    ap.add_argument("--registros", type=int, default=10000)
+    ap.add_argument("--semilla", type=int, default=0)
+    ap.add_argument("--duplicados", type=float, default=0.1, help="fracción de registros duplicados")
+    ap.add_argument("--sin-doi", type=float, default=0.05, help="fracción de registros sin DOI")
+    ap.add_argument("--codificaciones", type=_codificaciones, default=CODIFICACIONES,
+                    help="pesos por archivo, p. ej. 'utf-8=0.8,utf-8-sig=0.1,latin-1=0.1'")
+    ap.add_argument("--palabras-resumen", type=int, default=150)
+    ap.add_argument("--por-archivo", type=int, default=100)
+    args = ap.parse_args()
+    s = generar_corpus(args.carpeta, args.registros, args.semilla, args.duplicados, args.sin_doi,
+                       args.codificaciones, args.palabras_resumen, args.por_archivo)
+    print(f"✅ {s['registros']:,} registros ({s['duplicados']:,} duplicados, {s['sin_doi']:,} sin DOI) "
+          f"en {sum(s['archivos'].values())} archivo(s) -> {args.carpeta}")
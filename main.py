@@ -1,9 +1,26 @@
+import os, sys
 from utils.browser import crear_navegador, cerrar_banners
 from utils.sso_google import login_con_google
-from utils.sage import buscar_en_sage, exportar_ris_paginando
+from utils.sage import buscar_en_sage, exportar_ris_paginando, PAGE_SIZE_UI_SAGE
+from utils.esperas import imprimir_resumen_esperas
+from utils.cache_cosecha import CacheCosecha, restaurar
 import config
 
 if __name__ == "__main__":
+    QUERY = "generative artificial intelligence"
+    PAGINAS = 5
+
+    # Caché compartida con main_pipeline.py: la misma búsqueda dentro del TTL no se vuelve a cosechar
+    # (python main.py --refrescar la ignora)
+    out_dir = getattr(config, "OUTPUT_DIR_BIBLIO", os.path.join(os.path.expanduser("~"), "Desktop", "salidas"))
+    cache = CacheCosecha(os.path.join(out_dir, "cache_cosecha"), ttl=getattr(config, "CACHE_TTL_HORAS", 24) * 3600,
+                         forzar="--refrescar" in sys.argv)
+    guardadas = cache.buscar("SAGE", QUERY, tam=PAGE_SIZE_UI_SAGE, paginas=PAGINAS)
+    if guardadas:
+        for ruta in restaurar(guardadas, config.DOWNLOAD_DIR_SAGE):
+            print(f"🗃️ Desde la caché: {ruta}")
+        sys.exit(0)
+
     driver = crear_navegador(config.CHROMEDRIVER_PATH, config.DOWNLOAD_DIR_SAGE)
     try:
         URL_REVISTA = "https://journals-sagepub-com.crai.referencistas.com/"
@@ -20,19 +37,23 @@ if __name__ == "__main__":
 
         cerrar_banners(driver)
 
-        QUERY = "generative artificial intelligence"
         buscar_en_sage(driver, QUERY, config.DOWNLOAD_DIR_SAGE)
 
-        # === Exportar múltiples páginas (ajusta max_paginas a 5–10 según lo que quieras) ===
-        exportar_ris_paginando(
+        # === Exportar múltiples páginas (ajusta PAGINAS a 5–10 según lo que quieras) ===
+        fallidas = []
+        rutas = exportar_ris_paginando(
             driver,
             carpeta_descargas=config.DOWNLOAD_DIR_SAGE,
             consulta_slug="generative-artificial-intelligence",
-            max_paginas=5  # 10 páginas ≈ 100 artículos si pageSize=10
+            max_paginas=PAGINAS,  # 10 páginas ≈ 100 artículos si pageSize=10
+            fallidas=fallidas
         )
+        if not fallidas:
+            cache.guardar("SAGE", QUERY, rutas, tam=PAGE_SIZE_UI_SAGE, paginas=PAGINAS)
 
         print("URL actual:", driver.current_url)
         print("Título:", driver.title)
+        imprimir_resumen_esperas()
 
     finally:
         driver.quit()
@@ -1,9 +1,13 @@
 # main_pipeline.py
-# Orquestra todo: SAGE -> ScienceDirect -> Unificación en un solo run.
+# Orquestra todo: SAGE + ScienceDirect (en paralelo) -> Unificación en un solo run.
 
 import os
-import time
+import math
+import argparse
 from datetime import datetime
+from functools import partial
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 
 import config
 
@@ -11,7 +15,24 @@ from utils.browser import crear_navegador, cerrar_banners
 from utils.sso_google import login_con_google
 import utils.sage as sage
 import utils.sciencedirect as sd
-from utils.ris_merge import load_ris_from_dirs, merge_records, export_outputs
+import utils.http_export as http_export
+import utils.planificador as planificador
+from utils.ris_merge import load_ris_from_dirs, merge_records, export_outputs, parse_ris_file, tag_query
+from utils.paralelo import navegadores_clonados, repartir_en_navegadores, mover_descarga
+from utils.consultas import leer_consultas, normalizar_consultas, como_consultas
+from utils.fragmentos import fragmentar_consultas, TOPE_RESULTADOS
+from utils.diario import DiarioCosecha
+from utils.reintentos import pagina_fallida, informar_fallidas
+from utils.plan import plan_paginas, informar_plan, Progreso
+from utils.incremental import IndiceConocidos, detener_si_conocida
+from utils.cache_cosecha import CacheCosecha, restaurar
+from utils.esperas import esperar, esperar_transicion, en_pagina, imprimir_resumen_esperas
+from utils.sondas import estado_pagina, cuando, resultados_sd, SELECTORES
+from utils.trazas import trazar, activar_trazas, trazas_activas, imprimir_resumen_trazas
+from utils.grabacion import grabar_pagina, activar_grabacion
+from utils.perfilado import Perfilador, etapa
+from utils.metricas import contar as contar_metrica, activar_metricas, volcar_metricas
+from utils.capturas import configurar_capturas, paso_capturado, esperar_capturas, MODOS as MODOS_CAPTURA
 
 # Selenium helpers para los fallbacks locales (por si tus utils no traen ciertas funciones)
 from selenium.webdriver.common.by import By
@@ -24,26 +45,14 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException,
 
 def _sd_resultados_listos(driver, timeout=25):
     """Heurística: hay select-all o botón export + hay resultados en la SRP."""
-    def listo(d):
-        try:
-            sel_all = bool(d.find_elements(By.CSS_SELECTOR, '#select-all-results'))
-            btn_exp = bool(d.find_elements(By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-expand"]'))
-            items = bool(d.find_elements(By.CSS_SELECTOR, 'a.result-list-title-link, ol.search-results li, div.result-item-content'))
-            return (sel_all or btn_exp) and items
-        except Exception:
-            return False
-    WebDriverWait(driver, timeout).until(listo)
+    esperar(driver, cuando("ScienceDirect", resultados_sd), timeout=timeout, paso="resultados")
 
 def _sd_set_per_page_manual(driver, per_page=100, timeout=20):
     """Clic en el link del paginador 'ResultsPerPage' (25/50/100) si existe."""
     _sd_resultados_listos(driver, timeout=timeout)
     # ¿ya activo?
-    try:
-        active = driver.find_element(By.CSS_SELECTOR, 'ol.ResultsPerPage span.active-per-page')
-        if (active.text or "").strip() == str(per_page):
-            return True
-    except Exception:
-        pass
+    if (estado_pagina(driver, "ScienceDirect").get("por_pagina") or "") == str(per_page):
+        return True
 
     # buscar enlace con el número
     links = driver.find_elements(By.CSS_SELECTOR, 'ol.ResultsPerPage a.anchor')
@@ -56,78 +65,57 @@ def _sd_set_per_page_manual(driver, per_page=100, timeout=20):
         return True  # si no hay link, asumimos que ya está aplicado
 
     href_before = driver.current_url
-    try:
-        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", target)
-    except Exception:
-        pass
-    try:
-        target.click()
-    except ElementClickInterceptedException:
-        driver.execute_script("arguments[0].click();", target)
 
-    def listo(d):
+    def _clic():
         try:
-            a = d.find_element(By.CSS_SELECTOR, 'ol.ResultsPerPage span.active-per-page')
-            return (a.text or "").strip() == str(per_page) or d.current_url != href_before
+            driver.execute_script("arguments[0].scrollIntoView({block:'center'});", target)
         except Exception:
-            return d.current_url != href_before
+            pass
+        try:
+            target.click()
+        except ElementClickInterceptedException:
+            driver.execute_script("arguments[0].click();", target)
+
+    def listo(e):
+        return e.get("por_pagina") == str(per_page) or e.get("url", href_before) != href_before
 
-    WebDriverWait(driver, timeout).until(listo)
-    time.sleep(0.4)
+    if not esperar_transicion(driver, _clic, SELECTORES["ScienceDirect"]["items"], timeout=timeout, paso="per_page",
+                              condicion=cuando("ScienceDirect", listo)):
+        raise TimeoutException(f"La SRP no se recargó con per-page = {per_page}.")
+    _sd_resultados_listos(driver, timeout=timeout)
     return True
 
 def _sd_marcar_select_all(driver, timeout=12):
     """Marca 'Select all articles' con distintos intentos (input, label, JS)."""
     try:
         driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(0.2)
     except Exception:
         pass
 
-    inp = None
-    for sel in ['#select-all-results', 'input.checkbox-input#select-all-results', 'input.checkbox-input[aria-label*="Select all"]']:
-        try:
-            inp = driver.find_element(By.CSS_SELECTOR, sel)
-            break
-        except NoSuchElementException:
-            continue
-
-    lbl = None
-    for sel in ['label[for="select-all-results"]', 'label.checkbox-label[for="select-all-results"]']:
-        try:
-            lbl = driver.find_element(By.CSS_SELECTOR, sel)
-            break
-        except NoSuchElementException:
-            continue
+    e = estado_pagina(driver, "ScienceDirect")
+    inp, lbl = e.get("select_all"), e.get("select_all_label")
 
     if not inp and not lbl:
         raise TimeoutException("No encontré el checkbox ni su label para 'Select all articles'.")
 
     def _checked():
-        try:
-            if inp and inp.is_selected():
-                return True
-            if inp and (inp.get_attribute("aria-checked") or "").lower() == "true":
-                return True
-            return False
-        except Exception:
-            return False
+        return bool(estado_pagina(driver, "ScienceDirect").get("seleccionado"))
 
     if not _checked() and inp:
         try:
             inp.click()
-            time.sleep(0.25)
+            esperar(driver, lambda d: _checked(), timeout=2, paso="select_all", ignorar_timeout=True)
         except ElementClickInterceptedException:
             driver.execute_script("arguments[0].click();", inp)
-            time.sleep(0.25)
+            esperar(driver, lambda d: _checked(), timeout=2, paso="select_all", ignorar_timeout=True)
 
     if not _checked() and lbl:
         try:
             lbl.click()
-            time.sleep(0.25)
+            esperar(driver, lambda d: _checked(), timeout=2, paso="select_all", ignorar_timeout=True)
         except ElementClickInterceptedException:
             driver.execute_script("arguments[0].click();", lbl)
-            time.sleep(0.25)
+            esperar(driver, lambda d: _checked(), timeout=2, paso="select_all", ignorar_timeout=True)
 
     if not _checked() and inp:
         driver.execute_script("""
@@ -137,29 +125,21 @@ def _sd_marcar_select_all(driver, timeout=12):
             el.setAttribute('aria-checked','true');
             el.dispatchEvent(new Event('change', {bubbles:true}));
         """, inp)
-        time.sleep(0.25)
+        esperar(driver, lambda d: _checked(), timeout=2, paso="select_all", ignorar_timeout=True)
 
     if not _checked():
         raise TimeoutException("No pude marcar 'Select all articles'.")
 
+@trazar("sd.export_page")
 def _sd_export_ris_pagina(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", etiqueta="p1", timeout=25):
     """Exporta RIS de la página actual (fallback si no usamos sd.exportar_ris_pagina_actual_sd)."""
     _sd_resultados_listos(driver, timeout=timeout)
+    grabar_pagina(driver)
     _sd_marcar_select_all(driver)
 
     # habilitado export
-    def _export_habilitado(d):
-        try:
-            b = d.find_element(By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-expand"]')
-            aria = (b.get_attribute("aria-disabled") or "").lower()
-            disabled = b.get_attribute("disabled")
-            return (aria == "false") or (aria == "") and (disabled is None)
-        except Exception:
-            return False
-    try:
-        WebDriverWait(driver, 10).until(_export_habilitado)
-    except TimeoutException:
-        pass
+    esperar(driver, cuando("ScienceDirect", lambda e: e.get("export_habilitado")),
+            timeout=10, paso="export_habilitado", ignorar_timeout=True)
 
     # abrir export
     btn = driver.find_element(By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-expand"]')
@@ -167,10 +147,10 @@ def _sd_export_ris_pagina(driver, carpeta_descargas, consulta_slug="generative-a
         btn.click()
     except ElementClickInterceptedException:
         driver.execute_script("arguments[0].click();", btn)
-    time.sleep(0.3)
 
-    # RIS
-    ris = driver.find_element(By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-ris"]')
+    # RIS (esperamos a que el menú lo muestre clicable)
+    ris = esperar(driver, EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-ris"]')),
+                  timeout=10, paso="menu_export")
     try:
         ris.click()
     except ElementClickInterceptedException:
@@ -183,51 +163,275 @@ def _sd_export_ris_pagina(driver, carpeta_descargas, consulta_slug="generative-a
     nombre_final = f"sd_{consulta_slug}_{etiqueta}_{fecha}.ris"
     final_path = renombrar_si_es_necesario(ruta, nombre_final)
     print(f"✅ SD {etiqueta}: descargado -> {final_path}")
+    if final_path:
+        contar_metrica("biblio_paginas_exportadas_total", fuente="ScienceDirect", modo="selenium")
     return final_path
 
 def _sd_next(driver, timeout=20):
     """Clic en 'next' en SRP (fallback)."""
-    candidatos = [
-        (By.CSS_SELECTOR, 'li.pagination-link.next-link a.anchor[data-aa-name="srp-next-page"]'),
-        (By.CSS_SELECTOR, 'a.anchor[data-aa-name="srp-next-page"]'),
-        (By.XPATH, '//a[contains(@data-aa-name,"srp-next-page") or .//span[contains(., "next")]]')
-    ]
-    nxt = None
-    for how, what in candidatos:
-        try:
-            nxt = driver.find_element(how, what)
-            break
-        except NoSuchElementException:
-            continue
+    e = estado_pagina(driver, "ScienceDirect")
+    nxt = e.get("siguiente")
     if not nxt:
         return False
-    url_before = driver.current_url
-    try:
-        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", nxt)
-    except Exception:
-        pass
-    try:
-        nxt.click()
-    except ElementClickInterceptedException:
-        driver.execute_script("arguments[0].click();", nxt)
+    url_before = e.get("url") or driver.current_url
 
-    try:
-        WebDriverWait(driver, timeout).until(lambda d: d.current_url != url_before)
-    except TimeoutException:
-        _sd_resultados_listos(driver, timeout=timeout)
-    time.sleep(0.4)
-    return True
+    def _clic():
+        try:
+            driver.execute_script("arguments[0].scrollIntoView({block:'center'});", nxt)
+        except Exception:
+            pass
+        try:
+            nxt.click()
+        except ElementClickInterceptedException:
+            driver.execute_script("arguments[0].click();", nxt)
 
+    if not esperar_transicion(driver, _clic, SELECTORES["ScienceDirect"]["items"], timeout=timeout,
+                              paso="siguiente_pagina", condicion=lambda d: d.current_url != url_before):
+        return False    # el clic no hizo nada: no re-exportar la misma página
+    _sd_resultados_listos(driver, timeout=timeout)
+    return True
 
-# ---------------- Pipeline ----------------
 
-def run_pipeline(
-        query="generative artificial intelligence",
-        paginas_sage=5,
-        paginas_sd=5,
-        sd_per_page=100
-):
-    # -------- SAGE --------
+# ---------------- Cosechadores por fuente ----------------
+# Cada fuente usa su propio navegador y carpeta de descargas: pueden correr en paralelo.
+# 'query' puede ser una consulta o una lista (lote): el login se hace una sola vez por fuente.
+# Dentro de cada cosechador las consultas son objetos Consulta (texto + rango de años opcional).
+
+def _callback_consulta(al_descargar, query, diario=None, fuente=None, tam=None):
+    """
+    al_descargar(ruta, registros=None, query=...) -> callback de una sola consulta.
+    Los registros se etiquetan con el texto de la consulta (un fragmento por años cuenta como su consulta).
+    Con diario, cada archivo queda anotado como página hecha antes de avisar al pipeline.
+    """
+    if not diario:
+        return partial(al_descargar, query=query.texto) if al_descargar else None
+
+    def cb(ruta, registros=None):
+        diario.registrar(fuente, str(query), tam, ruta)
+        if al_descargar:
+            al_descargar(ruta, registros, query=query.texto)
+    return cb
+
+def _paginas_para(query, paginas, tam):
+    """Un fragmento ya contado se cosecha completo (ceil(total/tam)); si no, las páginas pedidas."""
+    if query.total is not None and tam:
+        return math.ceil(query.total / tam)
+    return paginas
+
+def _pendientes(fuente, query, tam, paginas, cb, diario=None):
+    """
+    Páginas que faltan según el diario. Las ya hechas se re-entregan a 'cb' (se parsean y
+    etiquetan igual que las nuevas) y no se vuelven a exportar.
+    """
+    lista = list(range(1, paginas + 1)) if isinstance(paginas, int) else list(paginas)
+    if not diario:
+        return lista, False
+    pend, hechas = diario.pendientes(fuente, str(query), tam, lista)
+    if hechas:
+        print(f"⏭️  {fuente} '{query}': {len(hechas)} página(s) ya exportadas en el diario; faltan {pend or 'ninguna'}.")
+        for ruta in dict.fromkeys(hechas.values()):     # un export de varias páginas se entrega una vez
+            if cb:
+                cb(ruta)
+    return pend, bool(hechas)
+
+def _exportar_http(fuente, exportar, cliente, carpeta, prefijo, pedidos, paginas,
+                   al_descargar=None, concurrencia=1, diario=None, tam=None, fallidas=None, contar=None,
+                   detener=None):
+    """
+    Export por HTTP de un lote: pedidos = [(query, url_resultados, kwargs de exportar), ...].
+    Secuencial, o con el planificador asyncio si concurrencia > 1 (páginas de todas las
+    consultas intercaladas: primero la p1 de cada una, luego la p2...).
+    Con diario, cada consulta solo pide las páginas que le faltan.
+    contar(cliente, url_resultados, **kwargs) -> total de resultados: recorta el plan a las páginas
+    que existen (sin pedir páginas vacías al final) y permite informar avance/ETA.
+    detener(ruta) -> True corta esa consulta (modo incremental); obliga a ir página por página.
+    """
+    cbs = {q: _callback_consulta(al_descargar, q, diario, fuente, tam) for q, _, _ in pedidos}
+    pendientes = {q: _pendientes(fuente, q, tam, _paginas_para(q, paginas, tam), cbs[q], diario)[0] for q, _, _ in pedidos}
+    if contar:
+        for query, url_resultados, kwargs in pedidos:
+            if not pendientes[query]:
+                continue
+            try:
+                total = contar(cliente, url_resultados, **kwargs)
+            except http_export.SesionVencida:
+                raise
+            except Exception as e:
+                print(f"⚠️ {fuente} '{query}': no se pudo leer el total de resultados: {e}")
+                total = None
+            plan = plan_paginas(total, tam, pendientes[query])
+            informar_plan(fuente, query, total, tam, plan, pendientes[query])
+            pendientes[query] = plan
+
+    progreso = Progreso(sum(len(p) for p in pendientes.values()), f"{fuente} (HTTP)")
+
+    def _con_progreso(cb):
+        def f(ruta, registros=None):
+            if cb:
+                cb(ruta, registros)
+            progreso.avanzar()
+        return f
+    cbs = {q: _con_progreso(cb) for q, cb in cbs.items()}
+
+    if concurrencia <= 1 or detener:
+        rutas = []
+        for query, url_resultados, kwargs in pedidos:
+            if not pendientes[query]:
+                continue
+            try:
+                rutas += http_export.descargar_paginas_http(
+                    exportar, cliente, url_resultados, carpeta, prefijo, query.slug, pendientes[query],
+                    al_descargar=cbs[query], detener=detener, **kwargs)
+            except http_export.SesionVencida:
+                raise
+            except Exception as e:
+                pagina = getattr(e, "pagina", None)
+                rutas += getattr(e, "rutas", [])
+                print(f"⚠️ {fuente} '{query}'" + (f" p{pagina}" if pagina else "") + f": {e}")
+                if fallidas is not None:
+                    # la que falló y las que ya no se pidieron de esa consulta
+                    lista = pendientes[query]
+                    lista = list(range(1, lista + 1)) if isinstance(lista, int) else list(lista)
+                    for p in lista[lista.index(pagina):] if pagina in lista else lista:
+                        fallidas.append(pagina_fallida(fuente, query, p, e if p == pagina or pagina is None else
+                                                       f"no se pidió (falló p{pagina}: {type(e).__name__})"))
+        return rutas
+
+    def al_completar(res):
+        t = res["trabajo"]
+        if res["error"]:
+            print(f"⚠️ {t}: {res['error']}")
+            progreso.avanzar()
+            if fallidas is not None:
+                fallidas.append(pagina_fallida(fuente, t.consulta, t.pagina, res["error"]))
+        elif res["ruta"]:
+            print(f"✅ {t} (HTTP async): {len(res['registros'])} registro(s)")
+            cbs[t.consulta](res["ruta"], res["registros"])
+
+    por_consulta = [
+        planificador.trabajos_paginas(fuente, exportar, url_resultados, carpeta, prefijo, query.slug,
+                                      pendientes[query], consulta=query, **kwargs)
+        for query, url_resultados, kwargs in pedidos
+    ]
+    trabajos = [t for fila in zip_longest(*por_consulta) for t in fila if t is not None]
+    resultados = planificador.exportar_concurrente(cliente, trabajos, al_completar=al_completar,
+                                                   concurrencia_por_host=concurrencia)
+    return sorted((r["ruta"] for r in resultados if r["ruta"]))
+
+def _cosechar_lote(fuente, driver, carpeta, url_home, consultas, paginas, una_consulta, al_descargar=None, navegadores=1,
+                   diario=None, tam=None):
+    """
+    Recorre las consultas con la sesión ya autenticada de 'driver'.
+    una_consulta(driver, carpeta, query, al_descargar, paginas, reanudando) busca y exporta una
+    consulta desde la home; 'paginas' son las que faltan según el diario (si lo hay).
+    Con varias consultas y navegadores>1, las consultas se reparten entre clones de la sesión
+    (cada navegador toma la siguiente consulta libre). Una consulta que falla no corta el lote.
+    """
+    if len(consultas) > 1 and navegadores > 1:
+        def tarea(drv, carpeta_w, query):
+            cb = _callback_consulta(al_descargar, query, diario, fuente, tam)
+            faltan, reanudando = _pendientes(fuente, query, tam, _paginas_para(query, paginas, tam), cb, diario)
+            if not faltan:
+                return []
+            drv.get(url_home)
+            cerrar_banners(drv)
+            movidas = {}    # ruta en la carpeta del clon -> ruta final (ya anotada en el diario)
+
+            def cb_pagina(ruta, registros=None):
+                # cada página se mueve y se anota apenas baja: si el proceso cae a mitad de la
+                # consulta, --reanudar no vuelve a pedir lo ya descargado
+                destino = movidas[ruta] = mover_descarga(ruta, carpeta)
+                if cb:
+                    cb(destino, registros)
+
+            rutas = []
+            for r in una_consulta(drv, carpeta_w, query, cb_pagina, faltan, reanudando):
+                if r and r not in movidas:
+                    cb_pagina(r)
+                if r:
+                    rutas.append(movidas[r])
+            return rutas
+
+        with navegadores_clonados(driver, navegadores, carpeta, url_home) as navs:
+            print(f"→ {fuente}: {len(consultas)} consulta(s) en {len(navs)} navegador(es)...")
+            resultados, fallidos = repartir_en_navegadores(navs, consultas, tarea, reintentos=0)
+        for query, err in fallidos.items():
+            print(f"⚠️ {fuente} '{query}': {err}")
+        return [r for q in consultas for r in resultados.get(q, [])]
+
+    rutas = []
+    for i, query in enumerate(consultas):
+        if len(consultas) > 1:
+            print(f"\n🔎 {fuente} [{i + 1}/{len(consultas)}]: {query}")
+        cb = _callback_consulta(al_descargar, query, diario, fuente, tam)
+        faltan, reanudando = _pendientes(fuente, query, tam, _paginas_para(query, paginas, tam), cb, diario)
+        if not faltan:
+            continue
+        try:
+            if i:
+                driver.get(url_home)
+                cerrar_banners(driver)
+            rutas += una_consulta(driver, carpeta, query, cb, faltan, reanudando) or []
+        except Exception as e:
+            print(f"⚠️ {fuente} '{query}': {e}")
+    return rutas
+
+def _tam_sage(page_size=None, navegadores=1, n_consultas=1, modo_http=False, fragmentar=False, incremental=False):
+    """
+    Resultados por página de SAGE para una cosecha: pageSize pedido; si no, 100 en modo HTTP,
+    con varios navegadores sobre una consulta o con fragmentos (paginación por URL); si no, 10 (UI).
+    """
+    nav_paginas = navegadores if n_consultas == 1 and not incremental else 1
+    return page_size or (sage.PAGE_SIZE_MAX_SAGE if modo_http or nav_paginas > 1 or fragmentar
+                         else sage.PAGE_SIZE_UI_SAGE)
+
+def _cosechar_con_cache(fuente, cosechar, consultas, al_descargar, cache, carpeta, tam, paginas, filtros=None,
+                        fallidas=None):
+    """
+    cosechar(consultas, al_descargar) con caché: las consultas vigentes en 'cache' se entregan
+    desde ahí (copiadas a 'carpeta') y solo el resto se cosecha; al terminar, cada consulta
+    cosechada se guarda en la caché (salvo que la fuente haya dejado páginas fallidas).
+    'paginas' None = cosecha completa (fragmentos por años).
+    """
+    if not cache:
+        return cosechar(consultas, al_descargar)
+
+    rutas, faltan = [], []
+    for q in consultas:
+        guardadas = cache.buscar(fuente, q, filtros, tam, paginas)
+        if guardadas is None:
+            faltan.append(q)
+            continue
+        print(f"🗃️ {fuente} '{q}': {len(guardadas)} archivo(s) desde la caché (sin cosechar).")
+        for ruta in restaurar(guardadas, carpeta):
+            rutas.append(ruta)
+            if al_descargar:
+                al_descargar(ruta, query=q)
+    if not faltan:
+        return rutas
+
+    recogidos = {}
+    def cb(ruta, registros=None, query=None):
+        recogidos.setdefault(query, []).append(ruta)
+        if al_descargar:
+            al_descargar(ruta, registros, query=query)
+
+    previas = len(fallidas) if fallidas is not None else 0
+    rutas += cosechar(faltan, cb) or []
+    if fallidas and any(f["fuente"] == fuente for f in fallidas[previas:]):
+        print(f"🗃️ {fuente}: la cosecha dejó páginas fallidas; no se guarda en la caché.")
+        return rutas
+    for q in faltan:
+        if recogidos.get(q):
+            cache.guardar(fuente, q, recogidos[q], filtros, tam, paginas)
+    return rutas
+
+def _cosechar_sage(query, paginas_sage, al_descargar=None, page_size=None, navegadores=1, modo_http=False,
+                   http_concurrencia=1, diario=None, fallidas=None, conocidos=None, fragmentar=False, acumular=1,
+                   tam=None):
+    consultas = como_consultas(query)
+    detener = detener_si_conocida(conocidos, "SAGE") if conocidos else None
+    tope = getattr(config, "TOPE_RESULTADOS_SAGE", TOPE_RESULTADOS["SAGE"])
     driver = crear_navegador(config.CHROMEDRIVER_PATH, config.DOWNLOAD_DIR_SAGE)
     try:
         URL_SAGE = "https://journals-sagepub-com.crai.referencistas.com/"
@@ -240,19 +444,107 @@ def run_pipeline(
             dominio_objetivo="journals-sagepub-com"
         )
         cerrar_banners(driver)
-        sage.buscar_en_sage(driver, query, config.DOWNLOAD_DIR_SAGE)
 
-        print(f"→ SAGE: exportando {paginas_sage} página(s)...")
-        sage.exportar_ris_paginando(
-            driver,
-            carpeta_descargas=config.DOWNLOAD_DIR_SAGE,
-            consulta_slug=query.replace(" ", "-"),
-            max_paginas=paginas_sage
-        )
+        # Modo híbrido: Selenium solo para el login; el export va por HTTP con las cookies del proxy
+        if modo_http:
+            cliente = http_export.ClienteHTTP.desde_driver(driver)
+            tam = tam or page_size or sage.PAGE_SIZE_MAX_SAGE
+            orden = sage.ORDEN_FECHA_SAGE if conocidos else None
+            if fragmentar:
+                consultas = fragmentar_consultas(consultas, lambda c: http_export.total_resultados_http_sage(
+                    cliente, URL_SAGE, page_size=sage.PAGE_SIZE_UI_SAGE, query=c.texto, desde=c.desde, hasta=c.hasta), tope)
+            pedidos = [
+                (q, URL_SAGE, {"page_size": tam, "query": q.texto, "orden": orden, "desde": q.desde, "hasta": q.hasta})
+                for q in consultas
+            ]
+            try:
+                return _exportar_http(
+                    "SAGE", http_export.exportar_ris_http_sage, cliente,
+                    config.DOWNLOAD_DIR_SAGE, "sage", pedidos, paginas_sage,
+                    al_descargar=al_descargar, concurrencia=http_concurrencia, diario=diario, tam=tam,
+                    fallidas=fallidas, contar=http_export.total_resultados_http_sage, detener=detener
+                )
+            finally:
+                cliente.cerrar()
+
+        # fragmentos por años: cada uno bajo el tope de SAGE; se reparten entre navegadores como un lote
+        if fragmentar:
+            consultas = fragmentar_consultas(consultas, lambda c: sage.contar_resultados_sage(
+                driver, URL_SAGE, c.texto, c.desde, c.hasta), tope)
+
+        # con una sola consulta los navegadores extra se usan para repartir páginas
+        # (en modo incremental se pagina en orden, de a una, para poder cortar)
+        nav_paginas = navegadores if len(consultas) == 1 and not conocidos else 1
+
+        # la UI pagina de a 10; el diario distingue páginas por tamaño (la caché lo fija antes del login)
+        tam = tam or page_size or (sage.PAGE_SIZE_MAX_SAGE if nav_paginas > 1 or fragmentar else sage.PAGE_SIZE_UI_SAGE)
+
+        def una_consulta(drv, carpeta, q, cb, paginas, reanudando):
+            if q.desde is not None or q.hasta is not None:
+                sage.abrir_busqueda_sage(drv, URL_SAGE, q.texto, page_size=tam, desde=q.desde, hasta=q.hasta)
+            else:
+                sage.buscar_en_sage(drv, q.texto, carpeta)
+
+            # incremental: más recientes primero y cortar en la primera página ya conocida
+            if detener:
+                sage.ordenar_por_fecha_sage(drv, page_size=tam)
+                return sage.exportar_ris_paginando(
+                    drv,
+                    carpeta_descargas=carpeta,
+                    consulta_slug=q.slug,
+                    max_paginas=len(paginas),
+                    al_descargar=cb,
+                    fallidas=fallidas,
+                    detener=detener
+                )
+
+            # selección acumulada: un solo export (modal + descarga) cada 'acumular' páginas
+            if acumular > 1 and nav_paginas == 1:
+                return sage.exportar_ris_acumulando(
+                    drv,
+                    carpeta_descargas=carpeta,
+                    consulta_slug=q.slug,
+                    paginas=paginas,
+                    page_size=tam,
+                    paginas_por_lote=acumular,
+                    al_descargar=cb,
+                    fallidas=fallidas
+                )
+
+            # pageSize grande, varios navegadores, fragmento o reanudación: paginación por URL (sin clicar 'Siguiente')
+            if page_size or nav_paginas > 1 or fragmentar or reanudando:
+                return sage.exportar_ris_por_url_sage(
+                    drv,
+                    carpeta_descargas=carpeta,
+                    consulta_slug=q.slug,
+                    paginas=paginas,
+                    page_size=tam,
+                    navegadores=nav_paginas,
+                    al_descargar=cb,
+                    query=q.texto,
+                    fallidas=fallidas
+                )
+
+            print(f"→ SAGE: exportando {len(paginas)} página(s)...")
+            return sage.exportar_ris_paginando(
+                drv,
+                carpeta_descargas=carpeta,
+                consulta_slug=q.slug,
+                max_paginas=len(paginas),
+                al_descargar=cb,
+                fallidas=fallidas
+            )
+
+        return _cosechar_lote("SAGE", driver, config.DOWNLOAD_DIR_SAGE, URL_SAGE, consultas, paginas_sage, una_consulta,
+                              al_descargar=al_descargar, navegadores=navegadores, diario=diario, tam=tam)
     finally:
         driver.quit()
 
-    # -------- ScienceDirect --------
+def _cosechar_sd(query, paginas_sd, sd_per_page, al_descargar=None, navegadores=1, modo_http=False,
+                 http_concurrencia=1, diario=None, fallidas=None, conocidos=None, fragmentar=False):
+    consultas = como_consultas(query)
+    detener = detener_si_conocida(conocidos, "ScienceDirect") if conocidos else None
+    tope = getattr(config, "TOPE_RESULTADOS_SD", TOPE_RESULTADOS["ScienceDirect"])
     driver = crear_navegador(config.CHROMEDRIVER_PATH, config.DOWNLOAD_DIR_SCIENCEDIRECT)
     try:
         URL_SD = getattr(config, "SCIENCEDIRECT_URL", "https://www-sciencedirect-com.crai.referencistas.com/")
@@ -266,42 +558,290 @@ def run_pipeline(
         )
         cerrar_banners(driver)
 
-        # abrir home + buscar
-        sd.abrir_home_sciencedirect(driver, URL_SD, config.DOWNLOAD_DIR_SCIENCEDIRECT)
-        sd.buscar_en_sciencedirect(driver, query, config.DOWNLOAD_DIR_SCIENCEDIRECT)
+        if modo_http:
+            cliente = http_export.ClienteHTTP.desde_driver(driver)
+            if fragmentar:
+                consultas = fragmentar_consultas(consultas, lambda c: http_export.total_resultados_http_sd(
+                    cliente, sd._url_busqueda_sd(URL_SD, c.texto, desde=c.desde, hasta=c.hasta), show=25), tope)
+            orden = sd.ORDEN_FECHA_SD if conocidos else None
+            pedidos = [
+                (q, sd._url_busqueda_sd(URL_SD, q.texto, show=sd_per_page, desde=q.desde, hasta=q.hasta, orden=orden),
+                 {"show": sd_per_page})
+                for q in consultas
+            ]
+            try:
+                return _exportar_http(
+                    "ScienceDirect", http_export.exportar_ris_http_sd, cliente,
+                    config.DOWNLOAD_DIR_SCIENCEDIRECT, "sd", pedidos, paginas_sd,
+                    al_descargar=al_descargar, concurrencia=http_concurrencia, diario=diario, tam=sd_per_page,
+                    fallidas=fallidas, contar=http_export.total_resultados_http_sd, detener=detener
+                )
+            finally:
+                cliente.cerrar()
+
+        # fragmentos por años: cada uno bajo el tope de ScienceDirect; se reparten entre navegadores como un lote
+        if fragmentar:
+            consultas = fragmentar_consultas(consultas, lambda c: sd.contar_resultados_sd(
+                driver, URL_SD, c.texto, c.desde, c.hasta), tope)
+
+        # con una sola consulta los navegadores extra se usan para repartir páginas
+        # (en modo incremental se pagina en orden, de a una, para poder cortar)
+        nav_paginas = navegadores if len(consultas) == 1 and not conocidos else 1
+
+        def una_consulta(drv, carpeta, q, cb, paginas, reanudando):
+            if q.desde is not None or q.hasta is not None:
+                # fragmento: la SRP filtrada se abre por URL (ya con show=sd_per_page)
+                sd.abrir_busqueda_sd(drv, URL_SD, q.texto, show=sd_per_page, desde=q.desde, hasta=q.hasta)
+            else:
+                # abrir home + buscar
+                sd.abrir_home_sciencedirect(drv, URL_SD, carpeta)
+                sd.buscar_en_sciencedirect(drv, q.texto, carpeta)
+
+                # forzar 100 por página: si el módulo lo trae, úsalo; si no, fallback local
+                if hasattr(sd, "fijar_resultados_por_pagina"):
+                    sd.fijar_resultados_por_pagina(drv, per_page=sd_per_page, carpeta_descargas=carpeta)
+                else:
+                    _sd_set_per_page_manual(drv, per_page=sd_per_page)
+
+            # incremental: más recientes primero y cortar en la primera página ya conocida
+            if detener:
+                sd.ordenar_por_fecha_sd(drv)
+                return sd.descargar_varias_paginas_sd(
+                    drv,
+                    carpeta_descargas=carpeta,
+                    consulta_slug=q.slug,
+                    paginas=len(paginas),
+                    etiqueta_prefijo="p",
+                    al_descargar=cb,
+                    fallidas=fallidas,
+                    detener=detener
+                )
 
-        # forzar 100 por página: si el módulo lo trae, úsalo; si no, fallback local
-        if hasattr(sd, "fijar_resultados_por_pagina"):
-            sd.fijar_resultados_por_pagina(driver, per_page=sd_per_page, carpeta_descargas=config.DOWNLOAD_DIR_SCIENCEDIRECT)
-        else:
-            _sd_set_per_page_manual(driver, per_page=sd_per_page)
-
-        # paginar y descargar
-        if hasattr(sd, "descargar_varias_paginas_sd"):
-            sd.descargar_varias_paginas_sd(
-                driver,
-                carpeta_descargas=config.DOWNLOAD_DIR_SCIENCEDIRECT,
-                consulta_slug=query.replace(" ", "-"),
-                paginas=paginas_sd,
-                etiqueta_prefijo="p"
-            )
-        else:
-            # Fallback: descargar página actual + next x (paginas_sd-1)
-            for i in range(1, paginas_sd + 1):
-                _sd_export_ris_pagina(
-                    driver,
-                    carpeta_descargas=config.DOWNLOAD_DIR_SCIENCEDIRECT,
-                    consulta_slug=query.replace(" ", "-"),
-                    etiqueta=f"p{i}"
+            # paginar y descargar: con varios navegadores (o al reanudar), salto directo por offset
+            if nav_paginas > 1 or reanudando:
+                return sd.descargar_paginas_sd_por_offset(
+                    drv,
+                    carpeta_descargas=carpeta,
+                    consulta_slug=q.slug,
+                    paginas=paginas,
+                    etiqueta_prefijo="p",
+                    navegadores=nav_paginas,
+                    al_descargar=cb,
+                    fallidas=fallidas
+                )
+            if hasattr(sd, "descargar_varias_paginas_sd"):
+                return sd.descargar_varias_paginas_sd(
+                    drv,
+                    carpeta_descargas=carpeta,
+                    consulta_slug=q.slug,
+                    paginas=len(paginas),
+                    etiqueta_prefijo="p",
+                    al_descargar=cb,
+                    fallidas=fallidas
                 )
-                if i < paginas_sd:
-                    if not _sd_next(driver):
-                        print("ℹ SD: no hay más páginas.")
-                        break
+
+            # Fallback: descargar página actual + next x (paginas_sd-1)
+            archivos = []
+            for i in range(1, len(paginas) + 1):
+                with en_pagina(f"sd:p{i}"), paso_capturado(drv, carpeta, f"sd_p{i}"):
+                    ruta = _sd_export_ris_pagina(
+                        drv,
+                        carpeta_descargas=carpeta,
+                        consulta_slug=q.slug,
+                        etiqueta=f"p{i}"
+                    )
+                    archivos.append(ruta)
+                    if cb and ruta:
+                        cb(ruta)
+                    siguiente = i < len(paginas) and _sd_next(drv)
+                if i < len(paginas) and not siguiente:
+                    print("ℹ SD: no hay más páginas.")
+                    break
+            return archivos
+
+        return _cosechar_lote("ScienceDirect", driver, config.DOWNLOAD_DIR_SCIENCEDIRECT, URL_SD, consultas, paginas_sd,
+                              una_consulta, al_descargar=al_descargar, navegadores=navegadores,
+                              diario=diario, tam=sd_per_page)
 
     finally:
         driver.quit()
 
+
+# ---------------- Pipeline ----------------
+
+BASE_SALIDA = "unificado_ai_generativa"
+
+def _parsear_de_consulta(ruta, fuente, query):
+    return tag_query(parse_ris_file(ruta, fuente), query)
+
+def _resumen_por_consulta(unificados, consultas):
+    """Cuántos registros únicos trajo cada consulta (un registro puede venir de varias)."""
+    print("\n🔎 Registros únicos por consulta:")
+    for q in consultas:
+        n = sum(1 for r in unificados if q in r.get("queries", ()))
+        print(f"   {n:>6}  {q}")
+
+def run_pipeline(
+        query="generative artificial intelligence",
+        paginas_sage=5,
+        paginas_sd=5,
+        sd_per_page=100,
+        traza=None,
+        capturas=None,
+        concurrente=True,
+        sd_navegadores=1,
+        sage_page_size=None,
+        sage_navegadores=1,
+        sage_acumular=1,
+        modo_http=False,
+        http_concurrencia=1,
+        reanudar=False,
+        incremental=False,
+        fragmentar=False,
+        refrescar=False,
+        cache_ttl=None,
+        grabar=None,
+        perfilar=False,
+        perfil_muestreo=False,
+        metricas=None,
+        metricas_puerto=None
+):
+    """
+    SAGE + ScienceDirect -> Unificación.
+    query: una consulta o una lista (lote). En lote se hace un solo login por fuente, las
+    consultas se recorren con esa sesión y cada registro lleva en 'queries' la(s) consulta(s)
+    que lo trajeron; todo se unifica en una sola pasada al final.
+    concurrente=True: ambas fuentes se cosechan a la vez (un hilo y un navegador por fuente)
+    y cada RIS se parsea apenas aterriza; el tiempo total ≈ el de la fuente más lenta.
+    concurrente=False: orden clásico SAGE -> ScienceDirect.
+    sd_navegadores>1: ScienceDirect salta por offset y reparte páginas entre varios Chrome
+    (en lote, reparte consultas entre esos Chrome).
+    sage_page_size / sage_navegadores>1: SAGE pagina por URL (pageSize 10/20/50/100 + startPage);
+    en lote, sage_navegadores>1 reparte consultas.
+    sage_acumular>1: SAGE marca 'select all' en esa cantidad de páginas seguidas y exporta una vez
+    por lote (un modal y una descarga por lote en vez de por página).
+    modo_http=True: Selenium solo hace login; los RIS se piden por HTTP con las cookies del proxy.
+    http_concurrencia>1: en modo HTTP, páginas en paralelo (asyncio, límite por host + token bucket).
+    reanudar=True: salta las páginas (fuente, consulta, página) que el diario de la corrida anterior
+    ya da por exportadas; si no, el diario (OUTPUT_DIR_BIBLIO/diario_cosecha.jsonl) empieza vacío.
+    incremental=True: resultados ordenados por fecha; cada consulta deja de paginar en la primera
+    página cuyos registros ya están todos en el corpus unificado anterior (DOI o título).
+    Con Selenium no se combina con reanudar: se pagina con 'Siguiente' desde la p1 (más recientes
+    primero) y no se puede retomar en la página donde quedó el diario; en modo HTTP sí.
+    fragmentar=True: cada consulta que pasa el tope de resultados de la plataforma se parte en
+    rangos de años (cada uno bajo el tope) y los fragmentos se cosechan completos, como un lote.
+    Caché (OUTPUT_DIR_BIBLIO/cache_cosecha): una consulta ya cosechada con los mismos filtros y
+    tamaño de página hace menos de cache_ttl horas (config.CACHE_TTL_HORAS, 24 por defecto) se
+    toma de la caché sin abrir el navegador. refrescar=True la ignora y la vuelve a llenar;
+    cache_ttl=0 la desactiva. El modo incremental no la usa.
+    grabar=<carpeta>: guarda el HTML de las páginas visitadas y los RIS descargados para
+    reproducirlos offline (utils.reproductor, benchmarks/bench_scraping.py).
+    perfilar=True: perfil por etapa de la unificación (parse / merge / export: cProfile, tracemalloc
+    y, con perfil_muestreo=True, pyinstrument); el informe queda en OUTPUT_DIR_BIBLIO. Con el perfil
+    activo los RIS se parsean en la etapa 'parse' y no en segundo plano durante la descarga.
+    metricas=<ruta.prom> / metricas_puerto=<n>: expone las métricas (utils.metricas: páginas
+    exportadas, esperas de descarga, bytes/registros parseados, duplicados, duración del export)
+    como archivo de texto de Prometheus o en http://127.0.0.1:<n>/metrics.
+    """
+    # Trazas opt-in: traza=<ruta.jsonl> (o BIBLIO_TRACE en el entorno)
+    if traza:
+        activar_trazas(traza)
+    # Capturas: always / sampled / on_failure (por defecto BIBLIO_CAPTURAS o on_failure)
+    if capturas:
+        configurar_capturas(capturas)
+    # Grabación para reproducir sin el proxy: grabar=<carpeta> (o BIBLIO_GRABAR en el entorno)
+    if grabar:
+        activar_grabacion(grabar)
+    if metricas or metricas_puerto is not None:
+        activar_metricas(metricas, metricas_puerto)
+
+    if reanudar and incremental and not modo_http:
+        raise ValueError("reanudar + incremental solo se admite en modo HTTP (con Selenium el modo "
+                         "incremental pagina desde la p1 y volvería a exportar lo que el diario ya tiene).")
+
+    consultas = normalizar_consultas(query)
+    if not consultas:
+        raise ValueError("No hay consultas para cosechar.")
+    if len(consultas) > 1:
+        print(f"📋 Lote de {len(consultas)} consultas (un login por fuente).")
+
+    out_dir = getattr(config, "OUTPUT_DIR_BIBLIO", os.path.join(os.path.expanduser("~"), "Desktop", "salidas"))
+    diario = DiarioCosecha(os.path.join(out_dir, "diario_cosecha.jsonl"), reanudar=reanudar)
+    if reanudar:
+        print(f"📒 Reanudando con el diario {diario.ruta}")
+
+    fallidas = []   # dead-letter: páginas que no salieron ni con reintentos
+    ruta_fallidas = os.path.join(out_dir, "paginas_fallidas.jsonl")
+    try:
+        os.remove(ruta_fallidas)    # la lista de una corrida anterior no debe pasar por la de esta
+    except FileNotFoundError:
+        pass
+    perfil = Perfilador(muestreo=perfil_muestreo) if perfilar else None
+
+    conocidos = None
+    if incremental:
+        ruta_corpus = os.path.join(out_dir, f"{BASE_SALIDA}.jsonl")
+        conocidos = IndiceConocidos.desde_jsonl(ruta_corpus)
+        if conocidos is None:
+            print(f"⚠️ Modo incremental sin corpus previo ({ruta_corpus}): se hace la cosecha completa.")
+        else:
+            print(f"🆕 Modo incremental: {len(conocidos)} clave(s) conocidas en {ruta_corpus}")
+
+    # Parseo incremental: un hilo aparte parsea cada archivo apenas se descarga
+    pool_parse = ThreadPoolExecutor(max_workers=1, thread_name_prefix="parse")
+    parseados = {}
+
+    def _al_descargar(fuente):
+        def cb(ruta, registros=None, query=None):
+            if registros is None:
+                if perfil:
+                    return      # se parsea en la etapa 'parse', donde lo ve cProfile
+                parseados[ruta] = pool_parse.submit(_parsear_de_consulta, ruta, fuente, query)
+            else:
+                # ya parseado en streaming (planificador HTTP)
+                parseados[ruta] = listo = Future()
+                listo.set_result(tag_query(registros, query))
+        return cb
+
+    cache_ttl = getattr(config, "CACHE_TTL_HORAS", 24) if cache_ttl is None else cache_ttl
+    cache = None
+    if cache_ttl and not incremental:
+        cache = CacheCosecha(os.path.join(out_dir, "cache_cosecha"), ttl=cache_ttl * 3600, forzar=refrescar)
+        cache.vencidas()
+    filtros = {"fragmentar": True} if fragmentar else None
+    tam_sage = _tam_sage(sage_page_size, sage_navegadores, len(consultas), modo_http, fragmentar, bool(conocidos))
+
+    def _cosechar_sage_lote(qs, cb):
+        return _cosechar_sage(qs, paginas_sage, cb, sage_page_size, sage_navegadores, modo_http, http_concurrencia,
+                              diario, fallidas, conocidos, fragmentar, sage_acumular, tam_sage)
+
+    def _cosechar_sd_lote(qs, cb):
+        return _cosechar_sd(qs, paginas_sd, sd_per_page, cb, sd_navegadores, modo_http, http_concurrencia,
+                            diario, fallidas, conocidos, fragmentar)
+
+    fases = [
+        ("SAGE", _cosechar_con_cache, ("SAGE", _cosechar_sage_lote, consultas, _al_descargar("SAGE"), cache,
+                                       config.DOWNLOAD_DIR_SAGE, tam_sage, None if fragmentar else paginas_sage,
+                                       filtros, fallidas)),
+        ("ScienceDirect", _cosechar_con_cache, ("ScienceDirect", _cosechar_sd_lote, consultas,
+                                                _al_descargar("ScienceDirect"), cache, config.DOWNLOAD_DIR_SCIENCEDIRECT,
+                                                sd_per_page, None if fragmentar else paginas_sd, filtros, fallidas)),
+    ]
+
+    if concurrente:
+        with ThreadPoolExecutor(max_workers=len(fases), thread_name_prefix="cosecha") as pool:
+            futuros = {pool.submit(fn, *args): nombre for nombre, fn, args in fases}
+            for fut in as_completed(futuros):
+                nombre = futuros[fut]
+                try:
+                    archivos = fut.result()
+                    print(f"✅ {nombre}: cosecha terminada ({len(archivos or [])} archivo(s)).")
+                except Exception as e:
+                    print(f"⚠️ {nombre}: la cosecha falló: {e}")
+    else:
+        for nombre, fn, args in fases:
+            fn(*args)
+
     # -------- Unificación --------
     print("\n📥 Leyendo y unificando descargas SAGE + ScienceDirect ...")
     dirs = []
@@ -310,21 +850,113 @@ def run_pipeline(
     if os.path.isdir(config.DOWNLOAD_DIR_SCIENCEDIRECT):
         dirs.append((config.DOWNLOAD_DIR_SCIENCEDIRECT, "ScienceDirect"))
 
-    registros = load_ris_from_dirs(dirs, exts=(".ris", ".RIS", ".txt", ".TXT"), verbose=True)
+    ya_parseados = {}   # ruta -> registros (no confundir con la CacheCosecha de arriba)
+    for ruta, fut in parseados.items():
+        try:
+            ya_parseados[ruta] = fut.result()
+        except Exception as e:
+            print(f"⚠️ Error parseando {ruta}: {e}")
+            contar_metrica("biblio_errores_parseo_total")
+    pool_parse.shutdown()
+
+    with etapa(perfil, "parse"):
+        registros = load_ris_from_dirs(dirs, exts=(".ris", ".RIS", ".txt", ".TXT"), verbose=True, cache=ya_parseados,
+                                       manifiesto=os.path.join(out_dir, "manifiesto_descubrimiento.json"))
     print(f"\n🧮 Unificando y deduplicando por DOI/Título (total leídos: {len(registros)}) ...")
-    unificados, duplicados = merge_records(registros)
+    with etapa(perfil, "merge"):
+        unificados, duplicados = merge_records(registros)
 
-    out_dir = getattr(config, "OUTPUT_DIR_BIBLIO", os.path.join(os.path.expanduser("~"), "Desktop", "salidas"))
     os.makedirs(out_dir, exist_ok=True)
-    export_outputs(unificados, duplicados, out_dir, base_name="unificado_ai_generativa")
+    with etapa(perfil, "export"):
+        export_outputs(unificados, duplicados, out_dir, base_name=BASE_SALIDA)
+    if len(consultas) > 1:
+        _resumen_por_consulta(unificados, consultas)
+    informar_fallidas(fallidas, ruta_fallidas)
+    esperar_capturas()
+    imprimir_resumen_esperas()
+    if trazas_activas():
+        imprimir_resumen_trazas()
+    if perfil:
+        perfil.informe(out_dir, BASE_SALIDA)
+    volcar_metricas()
     print("\n✅ Pipeline completo. Archivos en:", out_dir)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SAGE -> ScienceDirect -> Unificación")
+    parser.add_argument("--consulta", action="append", default=None, metavar="TEXTO",
+                        help="Consulta a cosechar (repetible para un lote)")
+    parser.add_argument("--consultas-archivo", default=None, metavar="RUTA",
+                        help="Archivo con una consulta por línea (# comenta); se suma a --consulta")
+    parser.add_argument("--trace", nargs="?", const="1", default=None, metavar="RUTA_JSONL",
+                        help="Escribe spans de tiempo en JSON-lines (sin RUTA: trazas_<fecha>.jsonl)")
+    parser.add_argument("--secuencial", action="store_true",
+                        help="Cosecha SAGE y luego ScienceDirect (sin paralelismo)")
+    parser.add_argument("--sd-navegadores", type=int, default=1,
+                        help="Chrome en paralelo para ScienceDirect (páginas por offset, misma sesión)")
+    parser.add_argument("--sage-page-size", type=int, choices=sage.PAGE_SIZES_SAGE, default=None,
+                        help="SAGE: resultados por página vía URL (ej. 100 en vez de los 10 de la UI)")
+    parser.add_argument("--sage-navegadores", type=int, default=1,
+                        help="Chrome en paralelo para SAGE (páginas por URL, misma sesión)")
+    parser.add_argument("--sage-acumular", type=int, default=1, metavar="N",
+                        help="SAGE: acumula la selección de N páginas y exporta un RIS por lote")
+    parser.add_argument("--http", action="store_true",
+                        help="Modo híbrido: login con Selenium y export RIS por HTTP (sin descargas de Chrome)")
+    parser.add_argument("--http-concurrencia", type=int, default=1,
+                        help="Con --http: páginas simultáneas por host (planificador asyncio con rate limit)")
+    parser.add_argument("--reanudar", action="store_true",
+                        help="Continúa la corrida anterior: salta las páginas ya exportadas según el diario")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Solo novedades: ordena por fecha y corta en la primera página ya presente en el corpus")
+    parser.add_argument("--fragmentar-anios", action="store_true",
+                        help="Parte las consultas amplias en rangos de años bajo el tope de resultados de cada fuente")
+    parser.add_argument("--refrescar", action="store_true",
+                        help="Ignora la caché de cosechas y vuelve a cosechar (la caché se actualiza)")
+    parser.add_argument("--cache-ttl", type=float, default=None, metavar="HORAS",
+                        help="Vigencia de la caché de cosechas en horas (0 = sin caché; por defecto 24)")
+    parser.add_argument("--grabar", default=None, metavar="CARPETA",
+                        help="Graba páginas HTML y RIS descargados para reproducirlos offline (utils.reproductor)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfil por etapa de la unificación (cProfile + tracemalloc); informe en OUTPUT_DIR_BIBLIO")
+    parser.add_argument("--profile-muestreo", action="store_true",
+                        help="Con --profile, añade perfil por muestreo (requiere pyinstrument)")
+    parser.add_argument("--metricas", default=None, metavar="RUTA_PROM",
+                        help="Escribe las métricas en formato de texto de Prometheus (textfile collector)")
+    parser.add_argument("--metricas-puerto", type=int, default=None, metavar="PUERTO",
+                        help="Sirve las métricas en http://127.0.0.1:PUERTO/metrics mientras corre")
+    parser.add_argument("--capturas", choices=MODOS_CAPTURA, default=None,
+                        help="Política de capturas de pantalla (por defecto: on_failure)")
+    args = parser.parse_args()
+    if args.reanudar and args.incremental and not args.http:
+        parser.error("--reanudar con --incremental requiere --http")
+
+    consultas = list(args.consulta or [])
+    if args.consultas_archivo:
+        consultas += leer_consultas(args.consultas_archivo)
+
     # Ajusta aquí cuántas páginas quieres de cada fuente:
     run_pipeline(
-        query='generative artificial intelligence',
+        query=consultas or 'generative artificial intelligence',
         paginas_sage=5,   # SAGE: páginas
         paginas_sd=5,     # ScienceDirect: páginas
-        sd_per_page=100   # SD: resultados por página (25/50/100)
+        sd_per_page=100,  # SD: resultados por página (25/50/100)
+        traza=args.trace,
+        capturas=args.capturas,
+        concurrente=not args.secuencial,
+        sd_navegadores=args.sd_navegadores,
+        sage_page_size=args.sage_page_size,
+        sage_navegadores=args.sage_navegadores,
+        sage_acumular=args.sage_acumular,
+        modo_http=args.http,
+        http_concurrencia=args.http_concurrencia,
+        reanudar=args.reanudar,
+        incremental=args.incremental,
+        fragmentar=args.fragmentar_anios,
+        refrescar=args.refrescar,
+        cache_ttl=args.cache_ttl,
+        grabar=args.grabar,
+        perfilar=args.profile,
+        perfil_muestreo=args.profile_muestreo,
+        metricas=args.metricas,
+        metricas_puerto=args.metricas_puerto
     )
@@ -1,4 +1,5 @@
 # main_sciencedirect.py
+import os, sys
 from utils.browser import crear_navegador, cerrar_banners
 from utils.sso_google import login_con_google
 from utils.sciencedirect import (
@@ -7,9 +8,26 @@ from utils.sciencedirect import (
     fijar_resultados_por_pagina,
     descargar_varias_paginas_sd,
 )
+from utils.esperas import imprimir_resumen_esperas
+from utils.cache_cosecha import CacheCosecha, restaurar
 import config
 
 if __name__ == "__main__":
+    QUERY = "generative artificial intelligence"
+    PAGINAS = 5
+    POR_PAGINA = 100
+
+    # Caché compartida con main_pipeline.py: la misma búsqueda dentro del TTL no se vuelve a cosechar
+    # (python main_sciencedirect.py --refrescar la ignora)
+    out_dir = getattr(config, "OUTPUT_DIR_BIBLIO", os.path.join(os.path.expanduser("~"), "Desktop", "salidas"))
+    cache = CacheCosecha(os.path.join(out_dir, "cache_cosecha"), ttl=getattr(config, "CACHE_TTL_HORAS", 24) * 3600,
+                         forzar="--refrescar" in sys.argv)
+    guardadas = cache.buscar("ScienceDirect", QUERY, tam=POR_PAGINA, paginas=PAGINAS)
+    if guardadas:
+        for ruta in restaurar(guardadas, config.DOWNLOAD_DIR_SCIENCEDIRECT):
+            print(f"🗃️ Desde la caché: {ruta}")
+        sys.exit(0)
+
     driver = crear_navegador(config.CHROMEDRIVER_PATH, config.DOWNLOAD_DIR_SCIENCEDIRECT)
     try:
         URL_SD = getattr(config, "SCIENCEDIRECT_URL", "https://www-sciencedirect-com.crai.referencistas.com/")
@@ -32,27 +50,31 @@ if __name__ == "__main__":
         abrir_home_sciencedirect(driver, URL_SD, config.DOWNLOAD_DIR_SCIENCEDIRECT)
 
         # 4) Buscar cadena
-        QUERY = "generative artificial intelligence"
         buscar_en_sciencedirect(driver, QUERY, config.DOWNLOAD_DIR_SCIENCEDIRECT)
 
         # 5) Forzar 100 por página (solo una vez)
         fijar_resultados_por_pagina(
             driver,
-            per_page=100,
+            per_page=POR_PAGINA,
             carpeta_descargas=config.DOWNLOAD_DIR_SCIENCEDIRECT
         )
 
         # 6) Descargar varias páginas: actual + “next” x 4 = 5 páginas en total
-        descargar_varias_paginas_sd(
+        fallidas = []
+        rutas = descargar_varias_paginas_sd(
             driver,
             carpeta_descargas=config.DOWNLOAD_DIR_SCIENCEDIRECT,
             consulta_slug="generative-artificial-intelligence",
-            paginas=5,                 # <-- ajusta aquí cuántas páginas quieres
-            etiqueta_prefijo="p"
+            paginas=PAGINAS,           # <-- ajusta aquí cuántas páginas quieres
+            etiqueta_prefijo="p",
+            fallidas=fallidas
         )
+        if not fallidas:
+            cache.guardar("ScienceDirect", QUERY, rutas, tam=POR_PAGINA, paginas=PAGINAS)
 
         print("URL actual:", driver.current_url)
         print("Título:", driver.title)
+        imprimir_resumen_esperas()
 
     finally:
         driver.quit()
@@ -1,51 +1,102 @@
 # main_unificar.py
 import os
+import argparse
 import config
 from utils.ris_merge import load_ris_from_dirs, merge_records, export_outputs
+from utils.perfilado import Perfilador, etapa
+from utils.descubrimiento import PATRONES_EXPORT
+from utils.vigilancia import Vigilante
+from utils.metricas import activar_metricas, volcar_metricas
 
 def _exists(p: str) -> bool:
     return bool(p) and os.path.isdir(p)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Unifica y deduplica las descargas RIS")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfil por etapa (cProfile + tracemalloc); informe en OUTPUT_DIR_BIBLIO")
+    parser.add_argument("--profile-muestreo", action="store_true",
+                        help="Con --profile, añade perfil por muestreo (requiere pyinstrument)")
+    parser.add_argument("--vigilar", action="store_true",
+                        help="Queda corriendo: cada RIS nuevo en las carpetas de descarga se unifica al llegar")
+    parser.add_argument("--intervalo", type=float, default=1.0, metavar="S",
+                        help="Con --vigilar: segundos entre sondeos de las carpetas")
+    parser.add_argument("--debounce", type=float, default=3.0, metavar="S",
+                        help="Con --vigilar: segundos sin cambios antes de reexportar")
+    parser.add_argument("--metricas", default=None, metavar="RUTA_PROM",
+                        help="Escribe las métricas en formato de texto de Prometheus (textfile collector)")
+    parser.add_argument("--metricas-puerto", type=int, default=None, metavar="PUERTO",
+                        help="Sirve las métricas en http://127.0.0.1:PUERTO/metrics mientras corre")
+    args = parser.parse_args()
+
+    if args.metricas or args.metricas_puerto is not None:
+        activar_metricas(args.metricas, args.metricas_puerto)
+
+    if args.vigilar:
+        # Solo las carpetas de descarga configuradas (las que llenan los scrapers)
+        Vigilante(
+            [(getattr(config, "DOWNLOAD_DIR_SAGE", ""), "SAGE"),
+             (getattr(config, "DOWNLOAD_DIR_SCIENCEDIRECT", ""), "ScienceDirect")],
+            getattr(config, "OUTPUT_DIR_BIBLIO", r"C:\Users\USER\Desktop\proyecto-final-algoritmos\salidas"),
+            base_name="unificado_ai_generativa", intervalo=args.intervalo, debounce=args.debounce,
+        ).vigilar()
+        raise SystemExit(0)
+
+    perfil = Perfilador(muestreo=args.profile_muestreo) if args.profile else None
+
+    # Raíces amplias (Descargas, carpeta del proyecto): solo exportaciones con nombre conocido
+    # (sage_*.ris, sd_*.ris...) y sin bajar más de unos niveles
+    ACOTADA = {"patrones": PATRONES_EXPORT, "max_profundidad": 3}
+
     # 1) Construimos la lista de raíces a inspeccionar (orden de prioridad)
     roots = [
         getattr(config, "DOWNLOAD_DIR_SAGE", r"C:\Users\USER\Desktop\YAN\Carpeta Universidad\decimo-semestre\Analisis-de-algoritmos\Proyecto-final-algoritmos\bases_de_datos\Sage_Journals"),
         getattr(config, "DOWNLOAD_DIR_SCIENCEDIRECT", r"C:\Users\USER\Desktop\YAN\Carpeta Universidad\decimo-semestre\Analisis-de-algoritmos\Proyecto-final-algoritmos\bases_de_datos\science_direct"),
         getattr(config, "DOWNLOAD_DIR", ""),  # por compatibilidad con scripts previos
-        os.path.join(os.path.expanduser("~"), "Downloads"),  # Descargas por defecto de Windows
-        os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)),  # raíz del proyecto
+        (os.path.join(os.path.expanduser("~"), "Downloads"), ACOTADA),  # Descargas por defecto de Windows
+        (os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)), ACOTADA),  # raíz del proyecto
     ]
 
     # Normalizamos: existentes, únicos y en el mismo orden
     uniq = []
     seen = set()
     for r in roots:
+        r, opciones = r if isinstance(r, tuple) else (r, {})
         if _exists(r) and r not in seen:
-            uniq.append(r); seen.add(r)
+            uniq.append((r, opciones)); seen.add(r)
 
     print("📚 Directorios a inspeccionar:")
-    for d in uniq:
-        print(" -", d)
+    for d, opciones in uniq:
+        print(" -", d, "(solo exportaciones sage_* / sd_*)" if opciones else "")
+
+    out_dir = getattr(config, "OUTPUT_DIR_BIBLIO", r"C:\Users\USER\Desktop\proyecto-final-algoritmos\salidas")
 
-    # 2) Disparamos la carga/parsing en todas las raíces
-    pairs = [(d, os.path.basename(d) or d) for d in uniq]
+    # 2) Disparamos la carga/parsing en todas las raíces (descubrimiento acotado, en paralelo y
+    #    con manifiesto de mtimes: las carpetas que no cambiaron no se vuelven a listar)
+    pairs = [(d, os.path.basename(d) or d, opciones) for d, opciones in uniq]
     print("\n📥 Buscando archivos .ris / .txt ...")
-    registros = load_ris_from_dirs(
-        pairs,
-        exts=(".ris", ".RIS", ".txt", ".TXT"),
-        verbose=True
-    )
+    with etapa(perfil, "parse"):
+        registros = load_ris_from_dirs(
+            pairs,
+            exts=(".ris", ".RIS", ".txt", ".TXT"),
+            verbose=True,
+            manifiesto=os.path.join(out_dir, "manifiesto_descubrimiento.json")
+        )
 
     # 3) Deduplicación y export
     print(f"\n🧮 Unificando y deduplicando por DOI y Título ...")
     print(f"   → Registros leídos (incluye duplicados): {len(registros)}")
-    unificados, duplicados = merge_records(registros)
+    with etapa(perfil, "merge"):
+        unificados, duplicados = merge_records(registros)
     print(f"   → Registros unificados (sin duplicados): {len(unificados)}")
     print(f"   → Duplicados detectados: {len(duplicados)}")
 
-    out_dir = getattr(config, "OUTPUT_DIR_BIBLIO", r"C:\Users\USER\Desktop\proyecto-final-algoritmos\salidas")
     print("\n💾 Exportando archivos ...")
     os.makedirs(out_dir, exist_ok=True)
-    export_outputs(unificados, duplicados, out_dir, base_name="unificado_ai_generativa")
+    with etapa(perfil, "export"):
+        export_outputs(unificados, duplicados, out_dir, base_name="unificado_ai_generativa")
+    if perfil:
+        perfil.informe(out_dir, "unificado_ai_generativa")
+    volcar_metricas()
 
     print("\n✅ Listo. Archivos en:", out_dir)
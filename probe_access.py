@@ -4,7 +4,9 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time, os
+import time, os, re, json, argparse
+from concurrent.futures import ThreadPoolExecutor
+from utils.http_export import ClienteHTTP, es_login
 
 # === CONFIGURA ESTO ===
 CHROMEDRIVER_PATH = r"C:\Users\USER\Desktop\YAN\Carpeta Universidad\decimo-semestre\Analisis-de-algoritmos\Proyecto-final-algoritmos\chromedriver.exe"
@@ -113,6 +115,70 @@ def probar_url(driver, url):
         print("✅ Detección: No se ve login. Probablemente ya tienes acceso a la home de la base.")
         return "OK"
 
+# ---------------- modo rápido (sin navegador) ----------------
+# Todas las URLs a la vez sobre un ClienteHTTP (pool keep-alive): estado HTTP, latencia y si el
+# proxy manda al login. Sin cookies de sesión lo esperable es LOGIN (el proxy responde y pide
+# autenticarse); con las cookies de un navegador ya logueado (--cookies) debería dar OK.
+
+TIMEOUT_RAPIDO = 1.0     # por petición: un host colgado no estira el sondeo más allá de ~1 s
+
+def _pide_login(resp):
+    """es_login del modo HTTP + el formulario de contraseña que busca hay_login_en_pantalla."""
+    return es_login(resp) or re.search(rb'<input[^>]+type=["\']?password', resp.body[:20000], re.I) is not None
+
+def sondear_url(cliente, url):
+    """{url, estado (OK / LOGIN / HTTP <código> / ERROR), codigo, ms, url_final, detalle}."""
+    t0 = time.perf_counter()
+    try:
+        resp = cliente.get(url)
+    except Exception as e:
+        return {"url": url, "estado": "ERROR", "codigo": None, "ms": (time.perf_counter() - t0) * 1000,
+                "url_final": None, "detalle": f"{type(e).__name__}: {e}"}
+    ms = (time.perf_counter() - t0) * 1000
+    if _pide_login(resp):
+        estado = "LOGIN"
+    elif resp.status >= 400:
+        estado = f"HTTP {resp.status}"
+    else:
+        estado = "OK"
+    return {"url": url, "estado": estado, "codigo": resp.status, "ms": ms,
+            "url_final": resp.url, "detalle": "redirigida" if resp.url != url else ""}
+
+def sondear_rapido(urls, cookies=None, timeout=TIMEOUT_RAPIDO):
+    """Sondea 'urls' en paralelo (un hilo por URL, conexiones del pool compartidas). Lista de resultados."""
+    cliente = ClienteHTTP(cookies=cookies, timeout=timeout)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(urls)), thread_name_prefix="sonda") as pool:
+            return list(pool.map(lambda u: sondear_url(cliente, u), urls))
+    finally:
+        cliente.cerrar()
+
+def _cookies_de(args):
+    """Cookies de --cookies (JSON como driver.get_cookies()) y de --cookie NOMBRE=VALOR."""
+    cookies = []
+    if args.cookies:
+        with open(args.cookies, "r", encoding="utf-8") as f:
+            cookies += json.load(f)
+    for par in args.cookie or []:
+        nombre, _, valor = par.partition("=")
+        cookies.append({"name": nombre.strip(), "value": valor.strip()})
+    return cookies
+
+def main_rapido(args):
+    urls = args.urls or URLS_A_PROBAR
+    t0 = time.perf_counter()
+    resultados = sondear_rapido(urls, cookies=_cookies_de(args), timeout=args.timeout)
+    total = time.perf_counter() - t0
+
+    print("\nResumen:")
+    for r in resultados:
+        codigo = r["codigo"] if r["codigo"] is not None else "-"
+        extra = f"  -> {r['url_final']}" if r["detalle"] == "redirigida" else (f"  ({r['detalle']})" if r["detalle"] else "")
+        print(f" - {r['url']} -> {r['estado']} [{codigo}] {r['ms']:.0f} ms{extra}")
+    ok = sum(r["estado"] == "OK" for r in resultados)
+    print(f"\n⏱️ {len(resultados)} URL(s) en {total:.2f} s: {ok} OK, {len(resultados) - ok} con login/error.")
+    return 0 if ok == len(resultados) else 1
+
 def main():
     driver = build_driver()
     try:
@@ -128,4 +194,20 @@ def main():
         driver.quit()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba el acceso a las bases vía el proxy CRAI")
+    parser.add_argument("urls", nargs="*", help="URLs a probar (por defecto URLS_A_PROBAR)")
+    parser.add_argument("--rapido", action="store_true",
+                        help="Sin navegador: todas las URLs en paralelo por HTTP (estado, latencia, login)")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_RAPIDO, metavar="S",
+                        help="Con --rapido: timeout por petición")
+    parser.add_argument("--cookies", default=None, metavar="RUTA_JSON",
+                        help="Con --rapido: cookies de sesión (lista como driver.get_cookies())")
+    parser.add_argument("--cookie", action="append", default=None, metavar="NOMBRE=VALOR",
+                        help="Con --rapido: cookie de sesión suelta (repetible)")
+    args = parser.parse_args()
+
+    if args.rapido:
+        raise SystemExit(main_rapido(args))
+    if args.urls:
+        URLS_A_PROBAR = args.urls
     main()
@@ -0,0 +1,115 @@
+# tests/test_http_export.py
+# Modo HTTP (utils.http_export + utils.planificador) contra el proxy CRAI simulado
+# (utils.proxy_local): sin red ni credenciales.
+#
+#   python -m pytest -q tests
+
+import os, sys, socket, asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.proxy_local import iniciar_proxy_local, COOKIE_SESION, VALOR_SESION
+from utils.http_export import ClienteHTTP, SesionVencida, exportar_ris_http_sage, exportar_ris_http_sd
+from utils.planificador import PlanificadorExport, trabajos_paginas
+from utils.ris_merge import parse_ris_text
+
+SESION = [{"name": COOKIE_SESION, "value": VALOR_SESION}]
+
+@pytest.fixture
+def proxy():
+    srv, base = iniciar_proxy_local(total_sage=25, total_sd=25)
+    yield srv, base
+    srv.shutdown()
+    srv.server_close()
+
+def _cliente(**kwargs):
+    return ClienteHTTP(cookies=SESION, timeout=5, **kwargs)
+
+def test_sin_sesion_el_login_lanza_sesion_vencida(proxy):
+    _, base = proxy
+    cliente = ClienteHTTP(timeout=5)
+    with pytest.raises(SesionVencida):
+        exportar_ris_http_sage(cliente, base + "/action/doSearch?AllField=ai", 1, page_size=10)
+    with pytest.raises(SesionVencida):
+        exportar_ris_http_sd(cliente, base + "/search?qs=ai", 1, show=10)
+
+def test_export_sage_devuelve_ris_parseable(proxy):
+    _, base = proxy
+    ris = exportar_ris_http_sage(_cliente(), base + "/action/doSearch?AllField=ai", 2, page_size=10)
+    registros = parse_ris_text(ris.decode("utf-8"), source_db="SAGE", source_file="p2.ris")
+    assert len(registros) == 10
+    assert registros[0]["doi_norm"] == "10.9999/sage.000010"
+
+def test_export_sd_devuelve_ris_parseable(proxy):
+    _, base = proxy
+    ris = exportar_ris_http_sd(_cliente(), base + "/search?qs=ai", 3, show=10)
+    registros = parse_ris_text(ris.decode("utf-8"), source_db="ScienceDirect", source_file="p3.ris")
+    assert len(registros) == 5     # 25 resultados: la p3 trae los últimos 5
+    assert all(r["doi_norm"].startswith("10.9999/sd.") for r in registros)
+
+def test_pagina_vacia_devuelve_bytes_vacios(proxy):
+    _, base = proxy
+    assert exportar_ris_http_sage(_cliente(), base + "/action/doSearch?AllField=ai", 4, page_size=10) == b""
+
+def test_keep_alive_reutiliza_la_conexion(proxy):
+    srv, base = proxy
+    cliente = _cliente()
+    for pagina in (1, 2, 3):
+        exportar_ris_http_sage(cliente, base + "/action/doSearch?AllField=ai", pagina, page_size=10)
+    assert srv.peticiones == 6      # SRP + export por página
+    assert srv.conexiones == 1
+
+def test_timeout_no_deja_la_conexion_en_el_pool():
+    srv, base = iniciar_proxy_local(latencia=0.5)
+    try:
+        cliente = _cliente()
+        cliente.timeout = 0.1
+        with pytest.raises((socket.timeout, TimeoutError)):
+            cliente.get(base + "/search?qs=ai")
+        assert not any(cliente._pool.values())
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+def test_planificador_reintenta_429_con_retry_after(tmp_path):
+    srv, base = iniciar_proxy_local(total_sage=30, cada_429=3)
+    try:
+        trabajos = trabajos_paginas("SAGE", exportar_ris_http_sage, base + "/action/doSearch?AllField=ai",
+                                    str(tmp_path), "sage", "ai", 3, page_size=10)
+        plan = PlanificadorExport(_cliente(), concurrencia_por_host=2, tasa_por_host=100, rafaga=100,
+                                  backoff_base=0.01)
+        resultados = asyncio.run(plan.ejecutar(trabajos))
+        assert [r["error"] for r in resultados] == [None, None, None]
+        assert sorted(len(r["registros"]) for r in resultados) == [10, 10, 10]
+        assert srv.peticiones > 6       # hubo 429 y se reintentaron
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+def test_planificador_aborta_sin_sesion(proxy, tmp_path):
+    _, base = proxy
+    trabajos = trabajos_paginas("SAGE", exportar_ris_http_sage, base + "/action/doSearch?AllField=ai",
+                                str(tmp_path), "sage", "ai", 3, page_size=10)
+    with pytest.raises(SesionVencida):
+        asyncio.run(PlanificadorExport(ClienteHTTP(timeout=5), backoff_base=0.01).ejecutar(trabajos))
+
+def test_archivo_bloqueado_no_aborta_el_lote(proxy, tmp_path, monkeypatch):
+    """Un PermissionError del sistema al guardar (antivirus, indexador) es un fallo de esa página, no sesión vencida."""
+    import utils.planificador as planificador
+    guardar = planificador.guardar_ris
+
+    def guardar_bloqueado(contenido, carpeta, nombre):
+        if "_p1_" in nombre:
+            raise PermissionError(13, "archivo en uso", nombre)
+        return guardar(contenido, carpeta, nombre)
+    monkeypatch.setattr(planificador, "guardar_ris", guardar_bloqueado)
+
+    _, base = proxy
+    trabajos = trabajos_paginas("SAGE", exportar_ris_http_sage, base + "/action/doSearch?AllField=ai",
+                                str(tmp_path), "sage", "ai", 3, page_size=10)
+    resultados = asyncio.run(PlanificadorExport(_cliente(), backoff_base=0.01).ejecutar(trabajos))
+    errores = {r["trabajo"].pagina: r["error"] for r in resultados}
+    assert errores[1].startswith("PermissionError")
+    assert errores[2] is None and errores[3] is None
@@ -0,0 +1,37 @@
+# tests/test_totales.py
+# Lectura del total de resultados de la SRP (sage.total_resultados_sage / sciencedirect.total_resultados_sd)
+# y el plan de páginas que sale de él, con un driver mínimo que devuelve la sonda de utils.sondas.
+
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sage import total_resultados_sage
+from utils.sciencedirect import total_resultados_sd
+from utils.plan import plan_paginas
+
+class DriverSonda:
+    """Solo execute_script: responde lo que devolvería la sonda de estado de la SRP."""
+    def __init__(self, estado):
+        self.estado = estado
+
+    def execute_script(self, *args):
+        return dict(self.estado)
+
+def test_cero_resultados_sd_es_cero_sin_esperar_el_timeout():
+    t0 = time.perf_counter()
+    assert total_resultados_sd(DriverSonda({"total": "0 results"}), timeout=3) == 0
+    assert time.perf_counter() - t0 < 1
+
+def test_cero_resultados_sage_es_cero():
+    assert total_resultados_sage(DriverSonda({"total": "0"}), timeout=3) == 0
+
+def test_total_con_separadores():
+    assert total_resultados_sd(DriverSonda({"total": "12,345 results"}), timeout=1) == 12345
+
+def test_sin_total_es_none():
+    assert total_resultados_sage(DriverSonda({}), timeout=0.2) is None
+
+def test_cero_resultados_no_planifica_paginas():
+    assert plan_paginas(0, 25, 5) == []
+    assert plan_paginas(None, 25, 5) == [1, 2, 3, 4, 5]
@@ -7,12 +7,19 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from .esperas import esperar, esperar_hasta
+from .trazas import trazar
+from .grabacion import grabar_descarga
+from .metricas import observar
 
-def crear_navegador(ruta_driver, carpeta_descargas):
+def crear_navegador(ruta_driver, carpeta_descargas, headless=None):
     """
     Crea un navegador Chrome usando Selenium Manager (sin Service/driver manual).
     El parámetro ruta_driver se mantiene por compatibilidad, pero NO se usa.
+    headless=True (o BIBLIO_HEADLESS=1): sin ventana, p. ej. para los benchmarks contra utils.reproductor.
     """
+    if headless is None:
+        headless = os.environ.get("BIBLIO_HEADLESS", "") not in ("", "0")
     os.makedirs(carpeta_descargas, exist_ok=True)
 
     opciones = Options()
@@ -30,48 +37,97 @@ def crear_navegador(ruta_driver, carpeta_descargas):
     opciones.add_argument("--no-default-browser-check")
     opciones.add_argument("--disable-sync")
 
+    if headless:
+        opciones.add_argument("--headless=new")
+        opciones.add_argument("--window-size=1920,1080")
+
     # ✅ Usar Selenium Manager (deja que Selenium encuentre/descargue el driver correcto)
     # Antes: service = Service(ruta_driver); webdriver.Chrome(service=service, options=opciones)
     return webdriver.Chrome(options=opciones)
 
-def cerrar_banners(driver):
+def en_login(driver):
+    """True si el navegador está en el login del proxy / Google (la sesión no vale)."""
+    try:
+        url = (driver.current_url or "").lower()
+        if "accounts.google.com" in url or "/login" in url.split("?")[0]:
+            return True
+        return bool(driver.find_elements(By.CSS_SELECTOR, '#btn-google, input[type="password"]'))
+    except Exception:
+        return False
+
+def clonar_sesion(driver, carpeta_descargas, url=None):
+    """
+    Abre otro Chrome (con su propia carpeta de descargas) que reutiliza la sesión
+    autenticada de 'driver' copiando sus cookies del proxy. Evita repetir el login SSO.
+    Lanza RuntimeError si el clon no quedó logueado (cae en el login del proxy).
+    """
+    url = url or driver.current_url
+    cookies = driver.get_cookies()
+    nuevo = crear_navegador(None, carpeta_descargas)
+    try:
+        # add_cookie exige estar en el dominio de la cookie
+        nuevo.get(url)
+        for c in cookies:
+            c = {k: v for k, v in c.items() if k in ("name", "value", "domain", "path", "secure", "httpOnly", "expiry", "sameSite")}
+            try:
+                nuevo.add_cookie(c)
+            except Exception:
+                pass  # cookie de otro dominio (p. ej. Google): no hace falta
+        nuevo.get(url)
+        if en_login(nuevo):
+            raise RuntimeError(f"el clon no heredó la sesión (quedó en {nuevo.current_url})")
+    except Exception:
+        nuevo.quit()
+        raise
+    return nuevo
+
+def cerrar_banners(driver, timeout=3):
     posibles = [
         (By.CSS_SELECTOR, 'button#onetrust-accept-btn-handler'),
         (By.XPATH, '//button[contains(., "Aceptar") or contains(., "Accept")]'),
         (By.XPATH, '//button[contains(., "De acuerdo") or contains(., "Agree")]'),
     ]
+    # Una sola espera para "aparece algún banner" (antes: 3 s fijos por cada selector)
+    if not esperar(driver, lambda d: any(d.find_elements(c, q) for c, q in posibles),
+                   timeout=timeout, paso="banners", ignorar_timeout=True):
+        return
     for como, que in posibles:
         try:
-            WebDriverWait(driver, 3).until(EC.element_to_be_clickable((como, que))).click()
-            time.sleep(0.5)
+            boton = driver.find_element(como, que)
+            if not boton.is_displayed():
+                continue
+            boton.click()
+            esperar(driver, EC.invisibility_of_element_located((como, que)),
+                    timeout=3, paso="banners", ignorar_timeout=True)
         except Exception:
             pass
 
+@trazar("download_wait")
 def esperar_descarga_por_extension(carpeta_descargas, extension=".ris", timeout=60):
     """
     Espera hasta que aparezca un archivo con la extensión dada (p. ej. .ris)
     creado/actualizado durante la ventana de espera. Devuelve la ruta del más reciente o None.
     """
     inicio = time.time()
-    fin = inicio + timeout
     ya_existentes = set(glob.glob(os.path.join(carpeta_descargas, f"*{extension}")))
-    ultimo = None
 
-    while time.time() < fin:
+    def _nuevo():
         candidatos = set(glob.glob(os.path.join(carpeta_descargas, f"*{extension}")))
         nuevos = [p for p in candidatos if p not in ya_existentes and os.path.getmtime(p) >= inicio - 1]
         if nuevos:
             nuevos.sort(key=os.path.getmtime, reverse=True)
-            ultimo = nuevos[0]
-            break
+            return nuevos[0]
         # si no hay nuevos, a veces el botón descarga un data:URI muy rápido; revisa cambios de mtime
         if candidatos:
             ordenados = sorted(list(candidatos), key=os.path.getmtime, reverse=True)
             if os.path.getmtime(ordenados[0]) >= inicio:
-                ultimo = ordenados[0]
-                break
-        time.sleep(0.3)
-    return ultimo
+                return ordenados[0]
+        return None
+
+    ruta = esperar_hasta(_nuevo, timeout=timeout, paso="descarga")
+    observar("biblio_espera_descarga_segundos", time.time() - inicio)
+    grabar_descarga(ruta)
+    return ruta
 
 def renombrar_si_es_necesario(ruta_archivo, nombre_final_sugerido):
     """
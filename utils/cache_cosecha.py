@@ -0,0 +1,101 @@
+# utils/cache_cosecha.py
+# Caché de cosechas: los RIS de una búsqueda ya hecha se guardan con su fecha y un TTL,
+# con clave (fuente, consulta normalizada, filtros, tamaño de página). Relanzar la misma
+# búsqueda dentro del TTL (otro script, o tras un fallo aguas abajo) devuelve esos archivos
+# sin abrir el navegador; forzar=True ignora la caché y la vuelve a llenar.
+
+import os, json, time, shutil, hashlib, threading
+from datetime import datetime
+
+TTL_POR_DEFECTO = 24 * 3600     # segundos
+
+def _normalizar(consulta):
+    return " ".join((consulta or "").split()).lower()
+
+class CacheCosecha:
+    """
+    carpeta/indice.json + carpeta/<clave>/*.ris. Cada entrada guarda las páginas que cubre
+    (N = páginas 1..N; None = la búsqueda completa), de modo que una cosecha de 10 páginas
+    sirve para un pedido de 5 pero no al revés.
+    """
+    def __init__(self, carpeta, ttl=TTL_POR_DEFECTO, forzar=False):
+        self.carpeta = carpeta
+        self.ttl = ttl
+        self.forzar = forzar
+        self._lock = threading.Lock()
+        self._ruta_indice = os.path.join(carpeta, "indice.json")
+        os.makedirs(carpeta, exist_ok=True)
+        self._indice = self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self._ruta_indice, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _escribir(self):
+        tmp = self._ruta_indice + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._indice, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self._ruta_indice)
+
+    @staticmethod
+    def clave(fuente, consulta, filtros=None, tam=None):
+        datos = json.dumps([fuente, _normalizar(consulta), filtros or {}, tam], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(datos.encode("utf-8")).hexdigest()[:16]
+
+    def buscar(self, fuente, consulta, filtros=None, tam=None, paginas=None):
+        """Rutas (en la caché) de una cosecha vigente que cubre 'paginas', o None."""
+        if self.forzar:
+            return None
+        with self._lock:
+            e = self._indice.get(self.clave(fuente, consulta, filtros, tam))
+        if not e or time.time() - e["guardado"] > e.get("ttl", self.ttl):
+            return None
+        if e["paginas"] is not None and (paginas is None or e["paginas"] < paginas):
+            return None
+        rutas = [os.path.join(self.carpeta, e["clave"], n) for n in e["archivos"]]
+        return rutas if rutas and all(os.path.isfile(r) for r in rutas) else None
+
+    def guardar(self, fuente, consulta, rutas, filtros=None, tam=None, paginas=None):
+        """Copia 'rutas' a la caché (reemplaza la entrada anterior de esa clave)."""
+        rutas = [r for r in dict.fromkeys(rutas) if r and os.path.isfile(r)]
+        if not rutas:
+            return
+        clave = self.clave(fuente, consulta, filtros, tam)
+        destino = os.path.join(self.carpeta, clave)
+        shutil.rmtree(destino, ignore_errors=True)
+        os.makedirs(destino)
+        for r in rutas:
+            shutil.copy2(r, destino)
+        with self._lock:
+            self._indice[clave] = {
+                "clave": clave, "fuente": fuente, "consulta": _normalizar(consulta), "filtros": filtros or {},
+                "tam": tam, "paginas": paginas, "archivos": [os.path.basename(r) for r in rutas],
+                "guardado": time.time(), "fecha": datetime.now().isoformat(timespec="seconds"), "ttl": self.ttl,
+            }
+            self._escribir()
+
+    def vencidas(self):
+        """Borra del disco y del índice las entradas con el TTL vencido; devuelve cuántas."""
+        ahora = time.time()
+        with self._lock:
+            viejas = [k for k, e in self._indice.items() if ahora - e["guardado"] > e.get("ttl", self.ttl)]
+            for k in viejas:
+                shutil.rmtree(os.path.join(self.carpeta, k), ignore_errors=True)
+                del self._indice[k]
+            if viejas:
+                self._escribir()
+        return len(viejas)
+
+def restaurar(rutas, carpeta):
+    """Copia los RIS de la caché a 'carpeta' (si no están ya) y devuelve las rutas en 'carpeta'."""
+    os.makedirs(carpeta, exist_ok=True)
+    out = []
+    for r in rutas:
+        destino = os.path.join(carpeta, os.path.basename(r))
+        if not os.path.isfile(destino):
+            shutil.copy2(r, destino)
+        out.append(destino)
+    return out
@@ -0,0 +1,125 @@
+# utils/capturas.py
+# Política de capturas de pantalla (antes: PNG síncrono en casi cada paso).
+#
+# Modos (BIBLIO_CAPTURAS o configurar_capturas):
+#   - "always":     guarda todas las capturas pedidas
+#   - "sampled":    guarda 1 de cada N (BIBLIO_CAPTURAS_MUESTREO, por defecto 5)
+#   - "on_failure": guarda solo en memoria un anillo de las últimas capturas y
+#                   las vuelca a disco únicamente si un paso lanza excepción
+#
+# Decodificar y escribir el PNG ocurre en un hilo de fondo: el hilo que hace
+# scraping solo paga la llamada a WebDriver (base64) y sigue.
+
+import os, base64, queue, atexit, threading
+from collections import deque
+from contextlib import contextmanager
+from .grabacion import grabar_pagina
+
+MODOS = ("always", "sampled", "on_failure")
+
+_modo = os.environ.get("BIBLIO_CAPTURAS", "on_failure")
+_muestreo = int(os.environ.get("BIBLIO_CAPTURAS_MUESTREO", "5") or 5)
+_tam_anillo = 8
+
+_lock = threading.Lock()
+_contador = 0
+_ctx = threading.local()     # anillo por hilo (cada hilo maneja su propio driver)
+_cola = queue.Queue()
+_hilo = None
+
+def configurar_capturas(modo=None, muestreo=None, tam_anillo=None):
+    global _modo, _muestreo, _tam_anillo
+    if modo is not None:
+        if modo not in MODOS:
+            raise ValueError(f"Modo de capturas inválido: {modo!r} (usa {', '.join(MODOS)})")
+        _modo = modo
+    if muestreo is not None:
+        _muestreo = max(1, int(muestreo))
+    if tam_anillo is not None:
+        _tam_anillo = max(1, int(tam_anillo))
+
+# ---------------- escritor en segundo plano ----------------
+
+def _escritor():
+    while True:
+        ruta, b64 = _cola.get()
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, "wb") as f:
+                f.write(base64.b64decode(b64))
+        except Exception:
+            pass
+        finally:
+            _cola.task_done()
+
+def _encolar(ruta, b64):
+    global _hilo
+    if _hilo is None:
+        with _lock:
+            if _hilo is None:
+                _hilo = threading.Thread(target=_escritor, name="capturas", daemon=True)
+                _hilo.start()
+    _cola.put((ruta, b64))
+
+def esperar_capturas():
+    """Bloquea hasta que el hilo de fondo haya escrito todas las capturas pendientes."""
+    if _hilo is not None:
+        _cola.join()
+
+atexit.register(esperar_capturas)
+
+# ---------------- API ----------------
+
+def _anillo():
+    an = getattr(_ctx, "anillo", None)
+    if an is None or an.maxlen != _tam_anillo:
+        an = _ctx.anillo = deque(an or (), maxlen=_tam_anillo)
+    return an
+
+def _screenshot_b64(driver):
+    try:
+        return driver.get_screenshot_as_base64()
+    except Exception:
+        return None
+
+def capturar(driver, carpeta, nombre_png):
+    """Punto único para las capturas de pasos (reemplaza a los _guardar locales)."""
+    global _contador
+    grabar_pagina(driver)   # modo grabación (utils.grabacion); no hace nada si está apagado
+    if _modo == "sampled":
+        with _lock:
+            _contador += 1
+            toca = (_contador % _muestreo) == 1 or _muestreo == 1
+        if not toca:
+            return
+
+    b64 = _screenshot_b64(driver)
+    if not b64:
+        return
+    ruta = os.path.join(carpeta, nombre_png)
+    if _modo == "on_failure":
+        _anillo().append((ruta, b64))
+    else:
+        _encolar(ruta, b64)
+
+def volcar_anillo():
+    """Envía a disco las capturas retenidas en memoria del hilo actual."""
+    an = _anillo()
+    while an:
+        _encolar(*an.popleft())
+
+@contextmanager
+def paso_capturado(driver, carpeta, nombre_paso):
+    """
+    Si el bloque lanza excepción: toma una captura del estado de error y, en modo
+    on_failure, vuelca el anillo de capturas recientes. Luego re-lanza.
+    """
+    try:
+        yield
+    except BaseException:
+        b64 = _screenshot_b64(driver)
+        if b64:
+            _encolar(os.path.join(carpeta, f"error_{nombre_paso}.png"), b64)
+        if _modo == "on_failure":
+            volcar_anillo()
+        raise
@@ -0,0 +1,72 @@
+# utils/consultas.py
+# Lotes de consultas: una lista (o un archivo, una consulta por línea) que se cosecha
+# en una sola ejecución reutilizando el login de cada fuente. Dentro de los cosechadores
+# cada consulta es un objeto Consulta (texto + rango de años opcional).
+
+import re
+
+def leer_consultas(ruta):
+    """Lee un archivo de consultas: una por línea; ignora líneas vacías y las que empiezan con '#'."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        return normalizar_consultas(ln for ln in f if not ln.lstrip().startswith("#"))
+
+def normalizar_consultas(query):
+    """str o iterable -> lista sin vacíos ni repetidos (respeta el orden)."""
+    if isinstance(query, str):
+        query = [query]
+    consultas = [" ".join(q.split()) for q in query if q and q.strip()]
+    return list(dict.fromkeys(consultas))
+
+def slug_consulta(query):
+    """Fragmento de nombre de archivo para la consulta (mismo formato de siempre: espacios -> '-')."""
+    return re.sub(r'[<>:"/\\|?*]+', "", query).strip().replace(" ", "-")
+
+class Consulta:
+    """
+    Una consulta y, opcionalmente, un rango de años [desde, hasta] (fragmento de una consulta
+    más amplia; ver utils.fragmentos). 'total' es el número de resultados si ya se contó.
+    str(consulta) es la etiqueta legible (p. ej. 'ai [2020-2021]'), que también usa el diario.
+    """
+    __slots__ = ("texto", "desde", "hasta", "total")
+
+    def __init__(self, texto, desde=None, hasta=None, total=None):
+        self.texto = texto
+        self.desde = desde
+        self.hasta = hasta
+        self.total = total
+
+    @property
+    def rango(self):
+        if self.desde is None and self.hasta is None:
+            return ""
+        if self.desde == self.hasta:
+            return str(self.desde)
+        return f"{self.desde if self.desde is not None else ''}-{self.hasta if self.hasta is not None else ''}"
+
+    @property
+    def slug(self):
+        return slug_consulta(self.texto) + (f"_{self.rango}" if self.rango else "")
+
+    def __str__(self):
+        return f"{self.texto} [{self.rango}]" if self.rango else self.texto
+
+    def __repr__(self):
+        return f"Consulta({str(self)!r}, total={self.total})"
+
+    def __eq__(self, otra):
+        return isinstance(otra, Consulta) and (self.texto, self.desde, self.hasta) == (otra.texto, otra.desde, otra.hasta)
+
+    def __hash__(self):
+        return hash((self.texto, self.desde, self.hasta))
+
+def como_consultas(query):
+    """str, lista de str o de Consulta -> lista de Consulta (sin vacíos ni repetidos)."""
+    if isinstance(query, (str, Consulta)):
+        query = [query]
+    out = []
+    for q in query:
+        if isinstance(q, Consulta):
+            out.append(q)
+        else:
+            out += [Consulta(t) for t in normalizar_consultas(q)]
+    return list(dict.fromkeys(out))
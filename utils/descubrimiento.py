@@ -0,0 +1,158 @@
+# utils/descubrimiento.py
+# Descubrimiento acotado de archivos de exportación (RIS) para la unificación.
+# En vez de un os.walk sin límite (que recorría .git, entornos virtuales, node_modules...):
+#   - os.scandir (el tipo de cada entrada sale del listado, sin un stat por archivo)
+#   - carpetas ignoradas por glob (IGNORAR) y profundidad máxima
+#   - patrones de nombre (p. ej. 'sage_*.ris', 'sd_*.ris') además de las extensiones
+#   - varias raíces en paralelo; una raíz anidada dentro de otra se recorre una sola vez
+#   - manifiesto de mtimes de carpetas: una carpeta cuyo mtime no cambió desde la última
+#     corrida no se vuelve a listar (se reutiliza su lista de archivos y subcarpetas)
+# Así el tiempo de descubrimiento depende de las carpetas relevantes, no de cuántos
+# archivos ajenos haya debajo de las raíces.
+
+import os, json, time, fnmatch, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
+
+IGNORAR = (
+    ".*", "__pycache__", "node_modules", "venv", "env", "site-packages", "*.egg-info",
+    "AppData", "$RECYCLE.BIN", "System Volume Information",
+    "cache_cosecha",    # copias de RIS de utils.cache_cosecha (se restauran a las carpetas de descarga)
+)
+
+# Nombres con los que sage.py / sciencedirect.py / http_export.py guardan las exportaciones
+PATRONES_EXPORT = ("sage_*.ris", "sd_*.ris", "sage_*.txt", "sd_*.txt")
+
+# Un mtime más reciente que esto (s) no se cachea: podría cambiar dentro del mismo tic del reloj
+_MARGEN_MTIME = 2.0
+
+def _filtro(exts=None, patrones=None):
+    exts_l = tuple(e.lower() for e in exts) if exts else None
+    pats_l = tuple(p.lower() for p in patrones) if patrones else None
+
+    def ok(nombre):
+        n = nombre.lower()
+        if exts_l and not n.endswith(exts_l):
+            return False
+        return not pats_l or any(fnmatch.fnmatchcase(n, p) for p in pats_l)
+    return ok
+
+def _ignorado(nombre, ignorar):
+    n = nombre.lower()
+    return any(fnmatch.fnmatchcase(n, g.lower()) for g in ignorar)
+
+class Manifiesto:
+    """
+    JSON {config: {carpeta: {"mtime": ns, "archivos": [...], "subdirs": [...]}}}. 'config' resume
+    filtros e ignorados: con otros filtros la lista de archivos de una carpeta es otra.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                self._datos = json.load(f)
+        except (OSError, ValueError):
+            self._datos = {}
+
+    @staticmethod
+    def config(exts, patrones, ignorar):
+        datos = json.dumps([sorted(exts or []), sorted(patrones or []), sorted(ignorar or [])])
+        return hashlib.sha1(datos.encode("utf-8")).hexdigest()[:12]
+
+    def carpetas(self, config):
+        with self._lock:
+            return dict(self._datos.get(config, {}))
+
+    def actualizar(self, config, carpetas):
+        with self._lock:
+            self._datos.setdefault(config, {}).update(carpetas)
+
+    def guardar(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+            tmp = self.ruta + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._datos, f, ensure_ascii=False)
+            os.replace(tmp, self.ruta)
+
+def recorrer(raiz, exts=None, patrones=None, ignorar=IGNORAR, max_profundidad=None, excluir=(), previas=None):
+    """
+    Archivos de 'raiz' que pasan el filtro (ordenados) y las entradas de manifiesto visitadas.
+    max_profundidad: 0 = solo la raíz. excluir: rutas absolutas que no se recorren (otras raíces).
+    previas: {carpeta: entrada} del manifiesto; si el mtime coincide no se lista la carpeta.
+    """
+    ok = _filtro(exts, patrones)
+    previas = previas or {}
+    visitadas, out = {}, []
+    limite = time.time_ns() - int(_MARGEN_MTIME * 1e9)
+    pila = [(raiz, 0)]      # las rutas salen con la misma forma que 'raiz' (claves de caché de parseo)
+    while pila:
+        carpeta, prof = pila.pop()
+        clave = os.path.abspath(carpeta)
+        try:
+            mtime = os.stat(carpeta).st_mtime_ns
+        except OSError:
+            continue
+        e = previas.get(clave)
+        if e and e["mtime"] == mtime:
+            archivos, subdirs = e["archivos"], e["subdirs"]
+        else:
+            archivos, subdirs = [], []
+            try:
+                with os.scandir(carpeta) as it:
+                    for ent in it:
+                        try:
+                            if ent.is_dir(follow_symlinks=False):
+                                if not _ignorado(ent.name, ignorar):
+                                    subdirs.append(ent.name)
+                            elif ent.is_file() and ok(ent.name):
+                                archivos.append(ent.name)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        if mtime < limite:
+            visitadas[clave] = {"mtime": mtime, "archivos": archivos, "subdirs": subdirs}
+        out += [os.path.join(carpeta, a) for a in archivos]
+        if max_profundidad is None or prof < max_profundidad:
+            for s in subdirs:
+                sub = os.path.join(carpeta, s)
+                if os.path.join(clave, s) not in excluir:
+                    pila.append((sub, prof + 1))
+    return sorted(out), visitadas
+
+def descubrir(raices, exts=None, patrones=None, ignorar=IGNORAR, max_profundidad=None, manifiesto=None, hilos=None):
+    """
+    raices: lista de rutas o de (ruta, opciones), donde opciones puede cambiar exts / patrones /
+    ignorar / max_profundidad para esa raíz. Devuelve {ruta: [archivos]} en el orden de 'raices';
+    un archivo que ya aparece en una raíz anterior no se repite en las siguientes.
+    manifiesto: ruta del JSON de mtimes (None = sin caché entre corridas).
+    """
+    norm = []
+    for r in raices:
+        ruta, opciones = (r if isinstance(r, tuple) else (r, {}))
+        norm.append((ruta, {"exts": exts, "patrones": patrones, "ignorar": ignorar,
+                            "max_profundidad": max_profundidad, **(opciones or {})}))
+    norm = [(r, o) for r, o in norm if r and os.path.isdir(r)]
+    absolutas = {os.path.abspath(r) for r, _ in norm}
+    man = Manifiesto(manifiesto) if manifiesto else None
+
+    def una(ruta, o):
+        cfg = Manifiesto.config(o["exts"], o["patrones"], o["ignorar"])
+        archivos, visitadas = recorrer(ruta, o["exts"], o["patrones"], o["ignorar"], o["max_profundidad"],
+                                       excluir=absolutas - {os.path.abspath(ruta)},
+                                       previas=man.carpetas(cfg) if man else None)
+        if man:
+            man.actualizar(cfg, visitadas)
+        return archivos
+
+    with ThreadPoolExecutor(max_workers=hilos or max(1, len(norm)), thread_name_prefix="descubrir") as pool:
+        futuros = [(r, pool.submit(una, r, o)) for r, o in norm]
+    out, vistos = {}, set()
+    for ruta, fut in futuros:
+        archivos = [a for a in fut.result() if a not in vistos]
+        vistos.update(archivos)
+        out[ruta] = archivos
+    if man:
+        man.guardar()
+    return out
@@ -0,0 +1,81 @@
+# utils/diario.py
+# Diario de cosecha (checkpoint): una línea JSON por página exportada, con la fuente,
+# la consulta, el tamaño de página y el archivo que produjo. Se escribe apenas aterriza
+# cada RIS, así que sobrevive a un corte a mitad de la cosecha; al relanzar con
+# reanudar=True se saltan las páginas ya hechas (si su archivo sigue en disco).
+
+import os, re, json, threading
+from datetime import datetime
+
+# Todos los exportadores nombran igual: <prefijo>_<consulta>_p<N>_<AAAAMMDD_HHMM>.ris
+# (un export de varias páginas seguidas, p. ej. la selección acumulada de SAGE: _p<A>-<B>_)
+_RE_PAGINA = re.compile(r"_p(\d+)(?:-(\d+))?_\d{8}_\d{4}\.ris$", re.I)
+
+def pagina_de_archivo(ruta):
+    m = _RE_PAGINA.search(os.path.basename(ruta or ""))
+    return int(m.group(1)) if m else None
+
+def paginas_de_archivo(ruta):
+    """Páginas que cubre un archivo: [N] o [A..B] para un export de varias páginas."""
+    m = _RE_PAGINA.search(os.path.basename(ruta or ""))
+    if not m:
+        return []
+    a = int(m.group(1))
+    return list(range(a, int(m.group(2) or a) + 1))
+
+class DiarioCosecha:
+    def __init__(self, ruta, reanudar=True):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._hechas = {}       # (fuente, consulta, tam, pagina) -> ruta
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        if reanudar:
+            self._cargar()
+        else:
+            open(ruta, "w", encoding="utf-8").close()
+
+    @staticmethod
+    def _clave(fuente, consulta, tam, pagina):
+        return (fuente, " ".join((consulta or "").split()).lower(), int(tam or 0), int(pagina))
+
+    def _cargar(self):
+        if not os.path.isfile(self.ruta):
+            return
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            for ln in f:
+                try:
+                    e = json.loads(ln)
+                    self._hechas[self._clave(e["fuente"], e["consulta"], e.get("tam"), e["pagina"])] = e["ruta"]
+                except (ValueError, KeyError, TypeError):
+                    continue    # línea a medio escribir si el proceso murió
+
+    def registrar(self, fuente, consulta, tam, ruta, pagina=None):
+        """
+        Anota una página exportada (o todas las que cubre el archivo, si es un export de varias).
+        Sin número de página (ni explícito ni en el nombre) no se anota.
+        """
+        paginas = [pagina] if pagina else paginas_de_archivo(ruta)
+        if not ruta or not paginas:
+            return
+        fecha = datetime.now().isoformat(timespec="seconds")
+        lineas = [json.dumps({"fuente": fuente, "consulta": consulta, "tam": tam, "pagina": p, "ruta": ruta,
+                              "fecha": fecha}, ensure_ascii=False) for p in paginas]
+        with self._lock:
+            for p in paginas:
+                self._hechas[self._clave(fuente, consulta, tam, p)] = ruta
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write("\n".join(lineas) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def hecha(self, fuente, consulta, tam, pagina):
+        """Ruta del RIS ya exportado para esa página, o None si falta (o el archivo ya no existe)."""
+        with self._lock:
+            ruta = self._hechas.get(self._clave(fuente, consulta, tam, pagina))
+        return ruta if ruta and os.path.isfile(ruta) else None
+
+    def pendientes(self, fuente, consulta, tam, paginas):
+        """(páginas por exportar, {página: ruta} ya hechas) para un entero 1..N o una lista de páginas."""
+        lista = list(range(1, paginas + 1)) if isinstance(paginas, int) else list(paginas)
+        hechas = {p: r for p in lista if (r := self.hecha(fuente, consulta, tam, p))}
+        return [p for p in lista if p not in hechas], hechas
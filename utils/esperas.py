@@ -0,0 +1,229 @@
+# utils/esperas.py
+# Esperas por condición (en vez de time.sleep fijos) + "presupuesto de esperas":
+# cuánto tiempo se va esperando vs. trabajando, por paso y por página.
+
+import time, threading
+from contextlib import contextmanager
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Frecuencia de sondeo por defecto (WebDriverWait usa 0.5 s si no se indica)
+POLL = 0.1
+
+_lock = threading.Lock()
+_ctx = threading.local()      # página en curso (por hilo)
+_esperas = {}                 # (pagina, paso) -> [segundos, n]
+_paginas = {}                 # pagina -> segundos totales
+
+# ---------------- registro ----------------
+
+def _pagina_actual():
+    return getattr(_ctx, "pagina", "-")
+
+def registrar_espera(paso, segundos):
+    """Suma 'segundos' de espera al paso indicado dentro de la página en curso."""
+    key = (_pagina_actual(), paso)
+    with _lock:
+        acc = _esperas.setdefault(key, [0.0, 0])
+        acc[0] += segundos
+        acc[1] += 1
+
+@contextmanager
+def en_pagina(etiqueta):
+    """
+    Marca el bloque como trabajo de una página (p. ej. "sage:p3").
+    Todo lo que se espere dentro se imputa a esa página.
+    """
+    previa = getattr(_ctx, "pagina", None)
+    _ctx.pagina = etiqueta
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        with _lock:
+            _paginas[etiqueta] = _paginas.get(etiqueta, 0.0) + dt
+        if previa is None:
+            del _ctx.pagina
+        else:
+            _ctx.pagina = previa
+
+def reiniciar_esperas():
+    with _lock:
+        _esperas.clear()
+        _paginas.clear()
+
+# ---------------- primitivas de espera ----------------
+
+def esperar(driver, condicion, timeout=10, paso="espera", poll=POLL, ignorar_timeout=False):
+    """
+    WebDriverWait(...).until(condicion) con sondeo fino y contabilidad.
+    Si ignorar_timeout=True, devuelve False en lugar de lanzar TimeoutException.
+    """
+    t0 = time.perf_counter()
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll).until(condicion)
+    except TimeoutException:
+        if ignorar_timeout:
+            return False
+        raise
+    finally:
+        registrar_espera(paso, time.perf_counter() - t0)
+
+def esperar_hasta(predicado, timeout=10, paso="espera", poll=POLL):
+    """
+    Igual que 'esperar' pero sin driver (p. ej. archivos en disco).
+    Devuelve el primer valor truthy del predicado o None si vence el timeout.
+    """
+    t0 = time.perf_counter()
+    fin = t0 + timeout
+    try:
+        while True:
+            valor = predicado()
+            if valor:
+                return valor
+            if time.perf_counter() >= fin:
+                return None
+            time.sleep(poll)
+    finally:
+        registrar_espera(paso, time.perf_counter() - t0)
+
+# ---------------- transiciones de página (MutationObserver) ----------------
+# En vez de sondear "¿cambió la URL / el DOM?" cada POLL segundos, se arma un MutationObserver
+# (más popstate/pushState) ANTES del clic y un execute_async_script queda bloqueado en el
+# navegador hasta que la lista de resultados se vuelve a pintar. Si el clic provoca una
+# navegación completa, el documento nuevo no tiene el observador: se espera a que la lista
+# exista en él.
+
+_JS_ARMAR = """
+const sel = arguments[0];
+const previo = window.__biblioObs;
+if (previo && previo.obs) previo.obs.disconnect();
+const est = window.__biblioObs = {cambio: false, avisar: null};
+est.marcar = () => { est.cambio = true; if (est.avisar) est.avisar(); };
+const toca = n => n.nodeType === 1 && (n.matches(sel) || n.querySelector(sel));
+est.obs = new MutationObserver(muts => {
+    for (const m of muts)
+        for (const n of [...m.addedNodes, ...m.removedNodes])
+            if (toca(n)) return est.marcar();
+});
+est.obs.observe(document.body || document.documentElement, {childList: true, subtree: true});
+if (!window.__biblioHistoria) {
+    window.__biblioHistoria = true;
+    const avisar = () => window.__biblioObs && window.__biblioObs.marcar();
+    window.addEventListener('popstate', avisar);
+    for (const f of ['pushState', 'replaceState']) {
+        const orig = history[f];
+        history[f] = function () { const r = orig.apply(this, arguments); avisar(); return r; };
+    }
+}
+"""
+
+_JS_ESPERAR = """
+const sel = arguments[0], ms = arguments[1], listo = arguments[arguments.length - 1];
+const hay = () => document.querySelector(sel) !== null;
+let fin = false;
+const terminar = v => { if (!fin) { fin = true; listo(v); } };
+setTimeout(() => terminar(null), ms);
+const est = window.__biblioObs;
+if (!est) {
+    // documento nuevo: hubo navegación completa; basta con que la lista exista
+    if (document.readyState !== 'loading' && hay()) return terminar('navegacion');
+    const obs = new MutationObserver(() => { if (hay()) { obs.disconnect(); terminar('navegacion'); } });
+    obs.observe(document.documentElement, {childList: true, subtree: true});
+    document.addEventListener('DOMContentLoaded', () => { if (hay()) terminar('navegacion'); });
+    return;
+}
+if (est.cambio && hay()) return terminar('dom');
+est.avisar = () => { if (hay()) { est.obs.disconnect(); terminar('dom'); } };
+"""
+
+def esperar_transicion(driver, disparar, css_lista, timeout=20, paso="transicion", condicion=None):
+    """
+    Ejecuta disparar() (clic en 'Siguiente', per-page, ...) y espera a que la lista de resultados
+    (css_lista) se vuelva a pintar, sin sondear desde Python: la espera la resuelve el navegador
+    con un MutationObserver. Devuelve True si hubo transición, False si venció el timeout.
+    Con 'condicion' (URL u offset distintos...), una mutación de la lista no basta: también tiene
+    que cumplirse la condición (un widget que se carga tarde o un repintado parcial no son otra página).
+    Si el observador no se puede armar, dispara igual y cae a esperar(condicion) por sondeo.
+    Las excepciones de disparar() se propagan.
+    """
+    t0 = time.perf_counter()
+    try:
+        driver.execute_script(_JS_ARMAR, css_lista)
+    except WebDriverException:
+        disparar()
+        if condicion is None:
+            return True
+        return bool(esperar(driver, condicion, timeout=timeout, paso=paso, ignorar_timeout=True))
+
+    disparar()
+    fin = t0 + timeout
+    try:
+        previo = driver.timeouts.script     # el script timeout es del driver: se restaura al salir
+    except (WebDriverException, AttributeError):
+        previo = None
+    try:
+        while True:
+            restante = fin - time.perf_counter()
+            if restante <= 0:
+                return False
+            try:
+                driver.set_script_timeout(restante + 2)
+                if not driver.execute_async_script(_JS_ESPERAR, css_lista, int(restante * 1000)):
+                    return False
+                if condicion is None:
+                    return True
+                resto = max(1.0, fin - time.perf_counter())
+                return bool(WebDriverWait(driver, resto, poll_frequency=POLL).until(condicion))
+            except TimeoutException:
+                return False
+            except WebDriverException:
+                # el documento se descargó a mitad de la espera (navegación completa): se reintenta en el nuevo
+                time.sleep(POLL)
+    finally:
+        if previo is not None:
+            try:
+                driver.set_script_timeout(previo)
+            except WebDriverException:
+                pass
+        registrar_espera(paso, time.perf_counter() - t0)
+
+# ---------------- reporte ----------------
+
+def resumen_esperas():
+    """
+    Devuelve (por_pagina, por_paso):
+      por_pagina: {pagina: {"total": s, "espera": s, "trabajo": s}}
+      por_paso:   {paso: {"espera": s, "n": veces}}
+    """
+    with _lock:
+        esperas = {k: list(v) for k, v in _esperas.items()}
+        paginas = dict(_paginas)
+
+    por_pagina = {}
+    for pag, total in paginas.items():
+        espera = sum(v[0] for (p, _), v in esperas.items() if p == pag)
+        por_pagina[pag] = {"total": total, "espera": espera, "trabajo": max(total - espera, 0.0)}
+
+    por_paso = {}
+    for (_, paso), (seg, n) in esperas.items():
+        acc = por_paso.setdefault(paso, {"espera": 0.0, "n": 0})
+        acc["espera"] += seg
+        acc["n"] += n
+    return por_pagina, por_paso
+
+def imprimir_resumen_esperas():
+    por_pagina, por_paso = resumen_esperas()
+    if not por_pagina and not por_paso:
+        return
+    print("\n⏱️  Presupuesto de esperas")
+    if por_pagina:
+        print(f"   {'página':<16}{'total s':>10}{'espera s':>10}{'trabajo s':>11}{'% espera':>10}")
+        for pag, r in por_pagina.items():
+            pct = 100.0 * r["espera"] / r["total"] if r["total"] else 0.0
+            print(f"   {pag:<16}{r['total']:>10.2f}{r['espera']:>10.2f}{r['trabajo']:>11.2f}{pct:>9.0f}%")
+    if por_paso:
+        print(f"\n   {'paso':<24}{'esperas':>8}{'total s':>10}")
+        for paso, r in sorted(por_paso.items(), key=lambda kv: -kv[1]["espera"]):
+            print(f"   {paso:<24}{r['n']:>8}{r['espera']:>10.2f}")
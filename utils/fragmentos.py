@@ -0,0 +1,78 @@
+# utils/fragmentos.py
+# Planificador de consultas por rangos de años. SAGE y ScienceDirect solo dejan paginar
+# hasta cierto número de resultados por búsqueda; una consulta amplia se parte en rangos
+# de años disjuntos, cada uno bajo el tope de la plataforma. Los fragmentos se cosechan
+# como consultas independientes (en paralelo si hay varios navegadores o en modo HTTP)
+# y la unión se deduplica en merge_records como siempre.
+
+from datetime import datetime
+from .consultas import Consulta
+from .http_export import SesionVencida
+
+# Resultados máximos que se pueden recorrer en una búsqueda.
+# ScienceDirect muestra como mucho 6.000; para SAGE usamos un tope conservador.
+TOPE_RESULTADOS = {"SAGE": 2000, "ScienceDirect": 6000}
+
+ANIO_MIN = 1900
+
+class _TotalDesconocido(Exception):
+    """Un rango de años no se pudo contar: no se sabe si cabe bajo el tope."""
+
+def fragmentar_por_anios(consulta, contar, tope, desde=ANIO_MIN, hasta=None):
+    """
+    Parte 'consulta' (Consulta sin filtro de años) en rangos [desde, hasta] con <= tope resultados,
+    bisecando el rango mientras se pase del tope. contar(Consulta) -> total (None si no se sabe).
+    Los rangos con 0 resultados se descartan. Devuelve la consulta tal cual si ya cabe bajo el tope
+    o si no se puede contar (la consulta o, tras un reintento, alguno de sus rangos).
+    """
+    hasta = hasta or datetime.now().year + 1    # incluye 'in press' del año próximo
+    total = contar(consulta)
+    if total is None or total <= tope:
+        consulta.total = total
+        return [consulta]
+
+    fragmentos = []
+
+    def partir(a, b):
+        c = Consulta(consulta.texto, a, b)
+        n = contar(c)
+        if n is None:
+            n = contar(c)       # un reintento: suele ser una SRP que tardó en pintar el total
+        if n is None:
+            raise _TotalDesconocido(str(c))
+        if n == 0:
+            return
+        if n <= tope or a == b:
+            if n > tope:
+                print(f"⚠️ '{c}': {n:,} resultados en un solo año (> tope {tope:,}); la cobertura será parcial.")
+            c.total = n
+            fragmentos.append(c)
+            return
+        m = (a + b) // 2
+        partir(a, m)
+        partir(m + 1, b)
+
+    try:
+        partir(desde, hasta)
+    except _TotalDesconocido as e:
+        print(f"⚠️ '{consulta.texto}': no se pudo contar '{e}'; se cosecha sin fragmentar "
+              f"(hasta el tope de {tope:,} resultados).")
+        consulta.total = total
+        return [consulta]
+    cubiertos = sum(f.total or 0 for f in fragmentos)
+    print(f"🧩 '{consulta.texto}': {total:,} resultados > tope {tope:,} -> {len(fragmentos)} fragmento(s) por años "
+          f"({cubiertos:,} resultados cubiertos).")
+    return fragmentos
+
+def fragmentar_consultas(consultas, contar, tope, **kwargs):
+    """Aplica fragmentar_por_anios a cada consulta del lote; mantiene el orden."""
+    out = []
+    for c in consultas:
+        try:
+            out += fragmentar_por_anios(c, contar, tope, **kwargs)
+        except SesionVencida:
+            raise
+        except Exception as e:
+            print(f"⚠️ No se pudo fragmentar '{c}': {e}; se cosecha sin fragmentar.")
+            out.append(c)
+    return out
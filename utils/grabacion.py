@@ -0,0 +1,100 @@
+# utils/grabacion.py
+# Modo grabación: guarda el HTML de las páginas visitadas y los RIS descargados para poder
+# reproducir los flujos de SAGE / ScienceDirect sin el proxy CRAI (utils.reproductor).
+#
+# Activación (opt-in):
+#   - variable de entorno BIBLIO_GRABAR=<carpeta>
+#   - o activar_grabacion(carpeta) / flag --grabar en main_pipeline.py
+#
+# Estructura: <carpeta>/<host>/indice.json + paginas/*.html + ris/*.ris. Cada página se indexa
+# por ruta + query normalizada; cada RIS queda asociado a la última página grabada en ese hilo
+# (la página cuyos resultados se estaban exportando).
+
+import os, json, shutil, hashlib, threading
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+_lock = threading.Lock()
+_ctx = threading.local()     # última página grabada (por hilo: cada hilo tiene su driver)
+_carpeta = None
+_indices = {}                # host -> índice en memoria
+
+# Parámetros que valen lo mismo presentes o ausentes (primera página / tamaño por defecto)
+_POR_DEFECTO = {("startPage", "0"), ("offset", "0")}
+
+def clave_url(url):
+    """'/ruta?b=2&a=1' -> '/ruta?a=1&b=2' (sin host, sin parámetros por defecto)."""
+    u = urlparse(url)
+    q = sorted((k, v) for k, v in parse_qsl(u.query, keep_blank_values=True) if (k, v) not in _POR_DEFECTO)
+    return (u.path or "/") + ("?" + urlencode(q) if q else "")
+
+def activar_grabacion(carpeta):
+    global _carpeta
+    with _lock:
+        _carpeta = carpeta
+        _indices.clear()
+    os.makedirs(carpeta, exist_ok=True)
+    print(f"🎙️ Grabando páginas y RIS en {carpeta}")
+    return carpeta
+
+def grabacion_activa():
+    return _carpeta is not None
+
+if os.environ.get("BIBLIO_GRABAR"):
+    activar_grabacion(os.environ["BIBLIO_GRABAR"])
+
+def _indice(host):
+    ind = _indices.get(host)
+    if ind is None:
+        ruta = os.path.join(_carpeta, host, "indice.json")
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                ind = json.load(f)
+        except (OSError, ValueError):
+            ind = {"origen": None, "paginas": {}, "descargas": {}}
+        _indices[host] = ind
+    return ind
+
+def _escribir_indice(host):
+    ruta = os.path.join(_carpeta, host, "indice.json")
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(_indices[host], f, ensure_ascii=False, indent=1)
+    os.replace(ruta + ".tmp", ruta)
+
+def grabar_pagina(driver):
+    """Guarda el HTML actual de 'driver' (no hace nada si la grabación está apagada)."""
+    if _carpeta is None:
+        return
+    try:
+        url, html = driver.current_url, driver.page_source
+    except Exception:
+        return
+    u = urlparse(url)
+    if u.scheme not in ("http", "https") or "google." in u.netloc:
+        return      # las pantallas del IdP no se graban (datos de la cuenta); se reproducen con un stub
+    host, clave = u.netloc.replace(":", "_"), clave_url(url)
+    nombre = hashlib.sha1(clave.encode("utf-8")).hexdigest()[:16] + ".html"
+    with _lock:
+        carpeta = os.path.join(_carpeta, host, "paginas")
+        os.makedirs(carpeta, exist_ok=True)
+        with open(os.path.join(carpeta, nombre), "w", encoding="utf-8") as f:
+            f.write(html)
+        ind = _indice(host)
+        ind["origen"] = f"{u.scheme}://{u.netloc}"
+        ind["paginas"][clave] = f"paginas/{nombre}"
+        _escribir_indice(host)
+    _ctx.ultima = (host, clave)
+
+def grabar_descarga(ruta):
+    """Copia el RIS descargado y lo asocia a la última página grabada en este hilo."""
+    ultima = getattr(_ctx, "ultima", None)
+    if _carpeta is None or not ruta or not ultima:
+        return
+    host, clave = ultima
+    with _lock:
+        carpeta = os.path.join(_carpeta, host, "ris")
+        os.makedirs(carpeta, exist_ok=True)
+        ind = _indice(host)
+        nombre = f"{len(sum(ind['descargas'].values(), [])):05d}_{os.path.basename(ruta)}"
+        shutil.copy2(ruta, os.path.join(carpeta, nombre))
+        ind["descargas"].setdefault(clave, []).append(f"ris/{nombre}")
+        _escribir_indice(host)
@@ -0,0 +1,324 @@
+# utils/http_export.py
+# Modo híbrido: Selenium solo para el login SSO; después las cookies del proxy CRAI
+# se pasan a un cliente HTTP con conexiones keep-alive que llama directo a los
+# endpoints de cita/export. El RIS llega en memoria (sin diálogo ni carpeta de descargas).
+#
+# Solo stdlib (http.client) para no sumar dependencias.
+
+import os, re, ssl, threading, http.client
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlparse, urljoin, urlencode
+from .sage import _url_busqueda_sage, PAGE_SIZE_MAX_SAGE
+from .sciencedirect import _url_con_offset
+from .trazas import span
+from .plan import entero_de_texto
+from .metricas import contar, FUENTES
+
+class ErrorHTTP(RuntimeError):
+    """Respuesta inesperada del proxy; 'status' y 'retry_after' (s) sirven para decidir reintentos."""
+    def __init__(self, mensaje, status=None, retry_after=None):
+        super().__init__(mensaje)
+        self.status = status
+        self.retry_after = retry_after
+
+class SesionVencida(Exception):
+    """El proxy devolvió el login: la sesión CRAI no vale. No es un OSError (no se confunde con
+    un archivo bloqueado al guardar) y no tiene sentido reintentarla."""
+
+def _retry_after(resp):
+    try:
+        return float(resp.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+class Respuesta:
+    def __init__(self, status, headers, body, url):
+        self.status = status
+        self.headers = headers      # dict con claves en minúscula
+        self.body = body            # bytes
+        self.url = url
+
+    @property
+    def texto(self):
+        return self.body.decode("utf-8", errors="replace")
+
+class ClienteHTTP:
+    """
+    Pool de conexiones http.client por host (keep-alive) con un cookie jar simple.
+    Seguro para usar desde varios hilos: cada petición toma una conexión libre del pool.
+    """
+    def __init__(self, cookies=None, user_agent=None, timeout=60, max_por_host=8):
+        self.timeout = timeout
+        self.max_por_host = max_por_host
+        self.user_agent = user_agent or "Mozilla/5.0 (bibliometria)"
+        self._cookies = {}          # (dominio, nombre) -> valor
+        self._pool = {}             # (scheme, host, port) -> [conexiones libres]
+        self._lock = threading.Lock()
+        self._ssl = ssl.create_default_context()
+        for c in cookies or []:
+            self.set_cookie(c["name"], c["value"], c.get("domain", ""))
+
+    @classmethod
+    def desde_driver(cls, driver, **kwargs):
+        """Cliente con las cookies y el User-Agent del navegador ya autenticado."""
+        try:
+            ua = driver.execute_script("return navigator.userAgent;")
+        except Exception:
+            ua = None
+        return cls(cookies=driver.get_cookies(), user_agent=ua, **kwargs)
+
+    # ---------------- cookies ----------------
+
+    def set_cookie(self, nombre, valor, dominio=""):
+        with self._lock:
+            self._cookies[(dominio.lstrip(".").lower(), nombre)] = valor
+
+    def _cookie_header(self, host):
+        host = host.lower()
+        with self._lock:
+            pares = [f"{n}={v}" for (dom, n), v in self._cookies.items()
+                     if not dom or host == dom or host.endswith("." + dom)]
+        return "; ".join(pares)
+
+    def _guardar_set_cookie(self, host, valores):
+        for raw in valores:
+            sc = SimpleCookie()
+            try:
+                sc.load(raw)
+            except Exception:
+                continue
+            for nombre, morsel in sc.items():
+                self.set_cookie(nombre, morsel.value, morsel["domain"] or host)
+
+    # ---------------- conexiones ----------------
+
+    def _tomar(self, clave):
+        with self._lock:
+            libres = self._pool.setdefault(clave, [])
+            if libres:
+                return libres.pop(), True
+        scheme, host, port = clave
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    def _devolver(self, clave, conn):
+        with self._lock:
+            libres = self._pool.setdefault(clave, [])
+            if len(libres) < self.max_por_host:
+                libres.append(conn)
+                return
+        conn.close()
+
+    def cerrar(self):
+        with self._lock:
+            conns = [c for libres in self._pool.values() for c in libres]
+            self._pool.clear()
+        for c in conns:
+            c.close()
+
+    # ---------------- peticiones ----------------
+
+    def request(self, metodo, url, body=None, headers=None, max_redirecciones=5):
+        for _ in range(max_redirecciones + 1):
+            resp = self._una_peticion(metodo, url, body, headers)
+            if resp.status in (301, 302, 303, 307, 308) and "location" in resp.headers:
+                url = urljoin(url, resp.headers["location"])
+                if resp.status == 303 or (resp.status in (301, 302) and metodo == "POST"):
+                    metodo, body = "GET", None
+                continue
+            return resp
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, datos, **kwargs):
+        """POST de formulario; 'datos' puede ser dict o lista de pares (para claves repetidas)."""
+        body = urlencode(datos, doseq=True).encode("utf-8")
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        headers.update(kwargs.pop("headers", None) or {})
+        return self.request("POST", url, body=body, headers=headers, **kwargs)
+
+    def _una_peticion(self, metodo, url, body, headers):
+        u = urlparse(url)
+        port = u.port or (443 if u.scheme == "https" else 80)
+        clave = (u.scheme, u.hostname, port)
+        ruta = u.path or "/"
+        if u.query:
+            ruta += "?" + u.query
+
+        h = {"User-Agent": self.user_agent, "Accept": "*/*", "Connection": "keep-alive"}
+        cookie = self._cookie_header(u.hostname)
+        if cookie:
+            h["Cookie"] = cookie
+        h.update(headers or {})
+
+        for intento in (1, 2):
+            conn, reusada = self._tomar(clave)
+            try:
+                conn.request(metodo, ruta, body=body, headers=h)
+                r = conn.getresponse()
+                data = r.read()
+            except (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionError, BrokenPipeError):
+                conn.close()
+                # el servidor cerró una conexión ociosa del pool: reintentamos con una nueva
+                if reusada and intento == 1:
+                    continue
+                raise
+            except BaseException:
+                # timeout u otro error a mitad de la respuesta: la conexión queda en un estado
+                # desconocido, no vuelve al pool
+                conn.close()
+                raise
+            hdrs = {k.lower(): v for k, v in r.getheaders()}
+            self._guardar_set_cookie(u.hostname, r.headers.get_all("Set-Cookie") or [])
+            if r.will_close:
+                conn.close()
+            else:
+                self._devolver(clave, conn)
+            return Respuesta(r.status, hdrs, data, url)
+
+# ---------------- utilidades comunes ----------------
+
+def _es_ris(body):
+    return bool(re.search(rb"^TY\s*-\s", body[:2000], re.M))
+
+def es_login(resp):
+    """El proxy devuelve el formulario de login (o redirige a Google) si la sesión no vale."""
+    if "accounts.google.com" in resp.url or "/login" in urlparse(resp.url).path:
+        return True
+    return b'id="btn-google"' in resp.body[:20000]
+
+def guardar_ris(contenido, carpeta, nombre):
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, nombre)
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+    return ruta
+
+def _unicos(seq):
+    return list(dict.fromkeys(seq))
+
+def _total_de_html(regex, html):
+    m = regex.search(html)
+    return entero_de_texto(m.group(1)) if m else None
+
+# ---------------- SAGE ----------------
+
+_RE_DOI_SAGE = re.compile(r'href="[^"]*?/doi/(?:abs/|full/|pdf/|epdf/)?(10\.\d{4,9}/[^"?#\s]+)"')
+
+_RE_TOTAL_SAGE = re.compile(r'class="[^"]*\bresult__count\b[^"]*"[^>]*>([^<]+)<')
+
+def dois_de_html_sage(html):
+    return _unicos(_RE_DOI_SAGE.findall(html))
+
+def total_resultados_http_sage(cliente, url_resultados, page_size=PAGE_SIZE_MAX_SAGE, query=None, orden=None,
+                               desde=None, hasta=None):
+    """Total de resultados de la búsqueda (lee la p1 de la SRP); None si la página no lo trae."""
+    r = cliente.get(_url_busqueda_sage(url_resultados, query=query, page_size=page_size, start_page=0, orden=orden,
+                                       desde=desde, hasta=hasta))
+    if es_login(r):
+        raise SesionVencida("La sesión CRAI no es válida (el proxy pidió login).")
+    return _total_de_html(_RE_TOTAL_SAGE, r.texto) if r.status == 200 else None
+
+def exportar_ris_http_sage(cliente, url_resultados, pagina, page_size=PAGE_SIZE_MAX_SAGE, query=None, orden=None,
+                           desde=None, hasta=None):
+    """
+    RIS (bytes) de la página N de resultados SAGE: GET de la SRP -> DOIs -> POST /action/downloadCitation.
+    Devuelve b"" si la página no trae resultados. orden: sortBy (p. ej. sage.ORDEN_FECHA_SAGE);
+    desde/hasta: filtro por año.
+    """
+    url = _url_busqueda_sage(url_resultados, query=query, page_size=page_size, start_page=pagina - 1, orden=orden,
+                             desde=desde, hasta=hasta)
+    with span("sage.http_search", pagina=pagina):
+        r = cliente.get(url)
+    if es_login(r):
+        raise SesionVencida("La sesión CRAI no es válida (el proxy pidió login).")
+    if r.status != 200:
+        raise ErrorHTTP(f"SAGE SRP p{pagina}: HTTP {r.status}", r.status, _retry_after(r))
+    dois = dois_de_html_sage(r.texto)
+    if not dois:
+        return b""
+
+    datos = [("doi", d) for d in dois] + [
+        ("downloadFileName", f"sage_p{pagina}"), ("include", "abs"), ("format", "ris"), ("direct", "true"),
+    ]
+    with span("sage.http_export", pagina=pagina, registros=len(dois)):
+        r = cliente.post(urljoin(url, "/action/downloadCitation"), datos)
+    if r.status != 200 or not _es_ris(r.body):
+        raise ErrorHTTP(f"SAGE export p{pagina}: HTTP {r.status}, no devolvió RIS", r.status, _retry_after(r))
+    return r.body
+
+# ---------------- ScienceDirect ----------------
+
+_RE_PII_SD = re.compile(r'/science/article/(?:abs/)?pii/(S?[0-9X]{15,17})')
+
+_RE_TOTAL_SD = re.compile(r'class="[^"]*\bsearch-body-results-text\b[^"]*"[^>]*>([^<]+)<')
+
+def piis_de_html_sd(html):
+    return _unicos(_RE_PII_SD.findall(html))
+
+def total_resultados_http_sd(cliente, url_resultados, show=100):
+    """Total de resultados de la búsqueda ('12,345 results' en la SRP); None si no aparece."""
+    r = cliente.get(_url_con_offset(url_resultados, 0, show))
+    if es_login(r):
+        raise SesionVencida("La sesión CRAI no es válida (el proxy pidió login).")
+    return _total_de_html(_RE_TOTAL_SD, r.texto) if r.status == 200 else None
+
+def exportar_ris_http_sd(cliente, url_resultados, pagina, show=100):
+    """
+    RIS (bytes) de la página N de resultados SD: GET de la SRP -> PIIs -> GET /sdfe/arp/cite (RIS con abstract).
+    """
+    url = _url_con_offset(url_resultados, (pagina - 1) * show, show)
+    with span("sd.http_search", pagina=pagina):
+        r = cliente.get(url)
+    if es_login(r):
+        raise SesionVencida("La sesión CRAI no es válida (el proxy pidió login).")
+    if r.status != 200:
+        raise ErrorHTTP(f"SD SRP p{pagina}: HTTP {r.status}", r.status, _retry_after(r))
+    piis = piis_de_html_sd(r.texto)
+    if not piis:
+        return b""
+
+    params = urlencode({"pii": ",".join(piis), "format": "application/x-research-info-systems", "withabstract": "true"})
+    with span("sd.http_export", pagina=pagina, registros=len(piis)):
+        r = cliente.get(urljoin(url, "/sdfe/arp/cite?" + params))
+    if r.status != 200 or not _es_ris(r.body):
+        raise ErrorHTTP(f"SD export p{pagina}: HTTP {r.status}, no devolvió RIS", r.status, _retry_after(r))
+    return r.body
+
+# ---------------- bucles ----------------
+
+def descargar_paginas_http(exportar, cliente, url_resultados, carpeta_descargas, prefijo, consulta_slug, paginas,
+                           al_descargar=None, detener=None, **kwargs):
+    """
+    Llama exportar(cliente, url_resultados, pagina, **kwargs) para cada página y guarda el RIS
+    como <prefijo>_<consulta>_p<N>_<fecha>.ris. Se detiene en la primera página vacía, o cuando
+    detener(ruta) devuelve True (modo incremental: página ya conocida).
+    Si exportar lanza, la excepción sale con los atributos 'pagina' (la que falló) y 'rutas'
+    (lo ya guardado hasta ahí).
+    """
+    lista = list(range(1, paginas + 1)) if isinstance(paginas, int) else list(paginas)
+    fecha = datetime.now().strftime("%Y%m%d_%H%M")
+    rutas = []
+    for pagina in lista:
+        try:
+            contenido = exportar(cliente, url_resultados, pagina, **kwargs)
+        except Exception as e:
+            e.pagina, e.rutas = pagina, rutas     # para el dead-letter de quien llama
+            raise
+        if not contenido:
+            print(f"ℹ️  {prefijo} p{pagina}: sin resultados (fin).")
+            break
+        ruta = guardar_ris(contenido, carpeta_descargas, f"{prefijo}_{consulta_slug}_p{pagina}_{fecha}.ris")
+        contar("biblio_paginas_exportadas_total", fuente=FUENTES.get(prefijo, prefijo), modo="http")
+        print(f"✅ {prefijo} p{pagina} (HTTP): {len(contenido)/1024:.0f} KB -> {ruta}")
+        rutas.append(ruta)
+        if al_descargar:
+            al_descargar(ruta)
+        if detener and detener(ruta):
+            print(f"⏹️  {prefijo} p{pagina}: todos los registros ya estaban en el corpus; fin.")
+            break
+    return rutas
@@ -0,0 +1,63 @@
+# utils/incremental.py
+# Modo incremental ("desde la última cosecha"): con los resultados ordenados por fecha,
+# las novedades están en las primeras páginas. Cada página exportada se compara contra
+# un índice de DOIs y títulos canónicos del corpus unificado anterior; cuando una página
+# viene entera de registros conocidos, se deja de paginar.
+
+import os, json
+from .ris_merge import parse_ris_file
+
+class IndiceConocidos:
+    """DOIs normalizados y títulos canónicos (las mismas claves que usa merge_records)."""
+    def __init__(self):
+        self.dois = set()
+        self.titulos = set()
+
+    def __len__(self):
+        return len(self.dois | self.titulos)
+
+    @classmethod
+    def desde_registros(cls, registros):
+        ind = cls()
+        for r in registros:
+            ind.agregar(r)
+        return ind
+
+    @classmethod
+    def desde_jsonl(cls, ruta):
+        """Índice a partir del JSONL unificado que deja export_outputs (None si no existe)."""
+        if not ruta or not os.path.isfile(ruta):
+            return None
+        ind = cls()
+        with open(ruta, "r", encoding="utf-8") as f:
+            for ln in f:
+                try:
+                    ind.agregar(json.loads(ln))
+                except ValueError:
+                    continue
+        return ind
+
+    def agregar(self, r):
+        if r.get("doi_norm"):
+            self.dois.add(r["doi_norm"])
+        if r.get("title_canon"):
+            self.titulos.add(r["title_canon"])
+
+    def conocido(self, r):
+        return (bool(r.get("doi_norm")) and r["doi_norm"] in self.dois) or \
+               (bool(r.get("title_canon")) and r["title_canon"] in self.titulos)
+
+    def nuevos(self, registros):
+        return [r for r in registros if not self.conocido(r)]
+
+def detener_si_conocida(indice, fuente=""):
+    """
+    Callback detener(ruta) para los paginadores: parsea el RIS recién exportado y devuelve
+    True si todos sus registros ya están en el índice (página vacía o ilegible: no detiene).
+    """
+    def detener(ruta):
+        recs = parse_ris_file(ruta, source_db=fuente)
+        nuevos = indice.nuevos(recs)
+        print(f"🆕 {os.path.basename(ruta)}: {len(nuevos)}/{len(recs)} registro(s) nuevos")
+        return bool(recs) and not nuevos
+    return detener
@@ -2,7 +2,8 @@
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time, os
+import os
+from .esperas import esperar
 
 def login_revista(driver, url_revista, usuario, contrasena, carpeta_descargas):
     """Abre la URL de una revista y hace login con usuario/contraseña CRAI"""
@@ -28,7 +29,8 @@ def login_revista(driver, url_revista, usuario, contrasena, carpeta_descargas):
         boton.click()
 
         print("✅ Login en revista realizado, esperando redirección...")
-        time.sleep(8)
+        # En vez de 8 s fijos: esperamos a que el formulario desaparezca (redirección hecha)
+        esperar(driver, EC.staleness_of(boton), timeout=15, paso="login_redireccion", ignorar_timeout=True)
 
         # Captura de pantalla después del login
         driver.save_screenshot(os.path.join(carpeta_descargas, "revista_post_login.png"))
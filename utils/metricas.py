@@ -0,0 +1,166 @@
+# utils/metricas.py
+# Registro de métricas (contadores, gauges e histogramas) de la cosecha y la unificación,
+# expuesto en formato de texto de Prometheus:
+#   - archivo .prom (para el textfile collector de node_exporter): se reescribe de forma atómica
+#     al terminar cada corrida (y en modo vigilancia tras cada export)
+#   - o un endpoint HTTP local: GET /metrics
+#
+# Activación de la exposición (el registro en memoria está siempre activo, cuesta un lock):
+#   - BIBLIO_METRICAS=<ruta.prom> y/o BIBLIO_METRICAS_PUERTO=<puerto>
+#   - o activar_metricas(ruta, puerto) / flags --metricas / --metricas-puerto
+
+import os, time, atexit, threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Límites (segundos) de los histogramas de duración
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# nombre -> (tipo, ayuda)
+METRICAS = {
+    "biblio_paginas_exportadas_total": ("counter", "Páginas de resultados exportadas a RIS, por fuente y modo"),
+    "biblio_espera_descarga_segundos": ("histogram", "Espera hasta que aparece el .ris descargado por el navegador"),
+    "biblio_bytes_parseados_total": ("counter", "Bytes de archivos RIS parseados, por fuente"),
+    "biblio_registros_parseados_total": ("counter", "Registros RIS parseados, por fuente"),
+    "biblio_errores_parseo_total": ("counter", "Archivos que fallaron al parsear"),
+    "biblio_duplicados_total": ("counter", "Registros descartados como duplicados, por tipo de clave (doi / title)"),
+    "biblio_registros_unificados": ("gauge", "Registros en la última salida unificada"),
+    "biblio_export_segundos": ("histogram", "Duración de cada salida de export_outputs (csv, csv_duplicados, jsonl)"),
+}
+
+# Prefijos de archivo -> etiqueta de fuente
+FUENTES = {"sage": "SAGE", "sd": "ScienceDirect"}
+
+_lock = threading.Lock()
+_valores = {}       # (nombre, etiquetas) -> número (counter / gauge)
+_histos = {}        # (nombre, etiquetas) -> [conteos por bucket..., suma, n]
+_ruta = None
+_servidor = None
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+# ---------------- registro ----------------
+
+def contar(nombre, valor=1, **etiquetas):
+    k = _clave(nombre, etiquetas)
+    with _lock:
+        _valores[k] = _valores.get(k, 0) + valor
+
+def fijar(nombre, valor, **etiquetas):
+    with _lock:
+        _valores[_clave(nombre, etiquetas)] = valor
+
+def observar(nombre, valor, **etiquetas):
+    k = _clave(nombre, etiquetas)
+    with _lock:
+        h = _histos.get(k)
+        if h is None:
+            h = _histos[k] = [0] * (len(BUCKETS) + 2)
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                h[i] += 1
+                break
+        h[-2] += valor
+        h[-1] += 1
+
+@contextmanager
+def cronometrar(nombre, **etiquetas):
+    """with cronometrar("biblio_export_segundos", salida="csv"): ..."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nombre, time.perf_counter() - t0, **etiquetas)
+
+def reiniciar_metricas():
+    with _lock:
+        _valores.clear()
+        _histos.clear()
+
+# ---------------- exposición ----------------
+
+def _escapar(v):
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _etiquetas(pares, extra=()):
+    pares = list(pares) + list(extra)
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}" if pares else ""
+
+def _num(x):
+    return repr(float(x)) if isinstance(x, float) else str(x)
+
+def texto_prometheus():
+    """Todas las métricas registradas en el formato de texto de Prometheus (0.0.4)."""
+    with _lock:
+        valores = dict(_valores)
+        histos = {k: list(v) for k, v in _histos.items()}
+    lineas = []
+    for nombre in sorted({k[0] for k in valores} | {k[0] for k in histos}):
+        tipo, ayuda = METRICAS.get(nombre, ("untyped", ""))
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+        for (n, etq), v in sorted(valores.items()):
+            if n == nombre:
+                lineas.append(f"{nombre}{_etiquetas(etq)} {_num(v)}")
+        for (n, etq), h in sorted(histos.items()):
+            if n != nombre:
+                continue
+            acumulado = 0
+            for limite, c in zip(BUCKETS, h):
+                acumulado += c
+                lineas.append(f"{nombre}_bucket{_etiquetas(etq, [('le', _num(float(limite)))])} {acumulado}")
+            lineas.append(f"{nombre}_bucket{_etiquetas(etq, [('le', '+Inf')])} {h[-1]}")
+            lineas.append(f"{nombre}_sum{_etiquetas(etq)} {_num(float(h[-2]))}")
+            lineas.append(f"{nombre}_count{_etiquetas(etq)} {h[-1]}")
+    return "\n".join(lineas) + "\n"
+
+def volcar_metricas():
+    """Reescribe el archivo .prom (si hay uno configurado). Atómico: escribe y reemplaza."""
+    if not _ruta:
+        return None
+    carpeta = os.path.dirname(os.path.abspath(_ruta))
+    os.makedirs(carpeta, exist_ok=True)
+    tmp = f"{_ruta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(texto_prometheus())
+    os.replace(tmp, _ruta)
+    return _ruta
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def activar_metricas(ruta=None, puerto=None):
+    """
+    ruta: archivo .prom que se reescribe con volcar_metricas() y al salir.
+    puerto: sirve GET /metrics en 127.0.0.1:<puerto> (0 = puerto libre). Devuelve la URL o None.
+    """
+    global _ruta, _servidor
+    if ruta:
+        _ruta = ruta
+        print(f"📈 Métricas -> {ruta}")
+    if puerto is not None and _servidor is None:
+        _servidor = ThreadingHTTPServer(("127.0.0.1", int(puerto)), _Handler)
+        _servidor.daemon_threads = True
+        threading.Thread(target=_servidor.serve_forever, name="metricas", daemon=True).start()
+        url = f"http://127.0.0.1:{_servidor.server_address[1]}/metrics"
+        print(f"📈 Métricas en {url}")
+        return url
+    return None
+
+atexit.register(volcar_metricas)
+
+if os.environ.get("BIBLIO_METRICAS") or os.environ.get("BIBLIO_METRICAS_PUERTO"):
+    activar_metricas(os.environ.get("BIBLIO_METRICAS") or None, os.environ.get("BIBLIO_METRICAS_PUERTO") or None)
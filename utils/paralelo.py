@@ -0,0 +1,121 @@
+# utils/paralelo.py
+# Reparte trabajo por páginas entre varios navegadores que comparten la misma sesión CRAI.
+# Cada navegador tiene su carpeta de descargas (así no se confunden los .ris entre sí)
+# y corre en su propio hilo; una página que falla se reintenta sola, sin rehacer las demás.
+# Un navegador que falla varias veces seguidas (se colgó, perdió la sesión) se retira y
+# deja el trabajo a los demás en vez de gastar los reintentos de todas las páginas.
+
+import os, queue, threading
+from contextlib import contextmanager
+from .browser import clonar_sesion
+
+MAX_FALLOS_SEGUIDOS = 3
+
+@contextmanager
+def navegadores_clonados(driver, n, carpeta_descargas, url=None):
+    """
+    Devuelve [(driver, carpeta_descargas), (clon1, carpeta/_w1), ...] con n navegadores en total.
+    Los clones se cierran al salir; el driver original queda abierto.
+    """
+    navegadores = [(driver, carpeta_descargas)]
+    try:
+        for w in range(1, max(1, n)):
+            carpeta_w = os.path.join(carpeta_descargas, f"_w{w}")
+            try:
+                navegadores.append((clonar_sesion(driver, carpeta_w, url), carpeta_w))
+            except Exception as e:
+                print(f"⚠️ No se pudo abrir el navegador extra #{w}: {e}")
+                break
+        yield navegadores
+    finally:
+        for drv, _ in navegadores[1:]:
+            try:
+                drv.quit()
+            except Exception:
+                pass
+
+def mover_descarga(ruta, carpeta_destino):
+    """Mueve un archivo descargado en la carpeta de un clon a la carpeta final de la fuente."""
+    if not ruta:
+        return None
+    destino = os.path.join(carpeta_destino, os.path.basename(ruta))
+    if os.path.abspath(ruta) != os.path.abspath(destino):
+        os.replace(ruta, destino)
+    return destino
+
+def repartir_en_navegadores(navegadores, items, tarea, reintentos=1, max_fallos_seguidos=MAX_FALLOS_SEGUIDOS):
+    """
+    Ejecuta tarea(driver, carpeta_descargas, item) para cada item, con un hilo por navegador
+    tomando items de una cola común. Si una tarea lanza, el item vuelve a la cola hasta
+    'reintentos' veces (lo puede tomar otro navegador).
+    Un navegador con 'max_fallos_seguidos' fallos seguidos se retira: su último item vuelve a
+    la cola sin gastar un reintento. Si se retiran todos, lo que quede en cola se da por fallido.
+    Devuelve (resultados {item: valor}, fallidos {item: "error"}).
+    """
+    cola = queue.Queue()
+    for it in items:
+        cola.put((it, 0))
+
+    resultados, fallidos = {}, {}
+    lock = threading.Lock()
+    pendientes = [len(items)]   # items sin resultado definitivo (incluye reintentos en vuelo)
+    activos = [len(navegadores)]
+
+    def retirar(nombre, it, intento, error):
+        """El navegador deja de tomar items; el suyo vuelve a la cola (o falla si no queda nadie)."""
+        with lock:
+            activos[0] -= 1
+            if activos[0] > 0:
+                cola.put((it, intento))
+                print(f"🛑 {nombre}: {max_fallos_seguidos} fallos seguidos; se retira ({error}).")
+                return
+            fallidos[it] = error
+            while True:
+                try:
+                    resto, _ = cola.get_nowait()
+                except queue.Empty:
+                    break
+                fallidos.setdefault(resto, "sin navegadores sanos")
+            pendientes[0] = 0
+        print(f"🛑 {nombre}: {max_fallos_seguidos} fallos seguidos y no quedan navegadores sanos.")
+
+    def trabajador(driver, carpeta):
+        nombre = threading.current_thread().name
+        seguidos = 0
+        while True:
+            try:
+                it, intento = cola.get(timeout=0.2)
+            except queue.Empty:
+                with lock:
+                    if pendientes[0] == 0:
+                        return
+                continue  # otro hilo puede devolver un item a la cola para reintento
+            try:
+                valor = tarea(driver, carpeta, it)
+                with lock:
+                    resultados[it] = valor
+                    fallidos.pop(it, None)
+                    pendientes[0] -= 1
+                seguidos = 0
+            except Exception as e:
+                seguidos += 1
+                if max_fallos_seguidos and seguidos >= max_fallos_seguidos:
+                    retirar(nombre, it, intento, f"{type(e).__name__}: {e}")
+                    return
+                with lock:
+                    fallidos[it] = f"{type(e).__name__}: {e}"
+                    if intento >= reintentos:
+                        pendientes[0] -= 1
+                if intento < reintentos:
+                    print(f"↻ Reintentando {it} (intento {intento + 2}): {e}")
+                    cola.put((it, intento + 1))
+
+    hilos = [
+        threading.Thread(target=trabajador, args=(drv, carpeta), name=f"pagina-w{i}", daemon=True)
+        for i, (drv, carpeta) in enumerate(navegadores)
+    ]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return resultados, fallidos
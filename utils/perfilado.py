@@ -0,0 +1,126 @@
+# utils/perfilado.py
+# Modo --profile de main_unificar.py y main_pipeline.py: perfil por etapa (parse, merge,
+# export) sin tener que envolver la corrida a mano en cProfile.
+#   - CPU: cProfile por etapa (también se guarda <informe>_<etapa>.prof para pstats/snakeviz)
+#   - memoria: tracemalloc, mayores asignadores de cada etapa (diferencia antes/después)
+#   - muestreo (opcional): pyinstrument si está instalado -> <informe>_<etapa>.html
+# El informe de texto queda junto a las salidas (OUTPUT_DIR_BIBLIO) y nombra las funciones
+# más calientes de cada etapa.
+# cProfile solo ve el hilo que lo activa: con el perfil activo, main_pipeline parsea en la
+# etapa 'parse' en vez de hacerlo en segundo plano mientras descarga.
+
+import io, os, time, pstats, cProfile, tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+TOP = 15
+
+class Perfilador:
+    """
+    with perfil.etapa("parse"): ...
+    perfil.informe(carpeta) -> ruta del informe de texto.
+    """
+    def __init__(self, muestreo=False, top=TOP):
+        self.top = top
+        self.etapas = []        # [(nombre, segundos, pstats.Stats, bytes netos, top asignadores, muestreador)]
+        self.muestreo = muestreo
+        if muestreo:
+            try:
+                import pyinstrument  # noqa: F401  (dependencia opcional)
+            except ImportError:
+                print("⚠️ --profile-muestreo necesita 'pyinstrument' (pip install pyinstrument); solo cProfile.")
+                self.muestreo = False
+
+    @contextmanager
+    def etapa(self, nombre):
+        muestreador = None
+        if self.muestreo:
+            from pyinstrument import Profiler
+            muestreador = Profiler()
+        # tracemalloc solo durante la etapa (fuera de ellas no frena la cosecha)
+        propio = not tracemalloc.is_tracing()
+        if propio:
+            tracemalloc.start()
+        antes = tracemalloc.take_snapshot()
+        prof = cProfile.Profile()
+        t0 = time.perf_counter()
+        if muestreador:
+            muestreador.start()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            if muestreador:
+                muestreador.stop()
+            dt = time.perf_counter() - t0
+            despues = tracemalloc.take_snapshot()
+            if propio:
+                tracemalloc.stop()
+            filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+            diferencias = despues.filter_traces(filtros).compare_to(antes.filter_traces(filtros), "lineno")
+            neto = sum(d.size_diff for d in diferencias)
+            self.etapas.append((nombre, dt, pstats.Stats(prof), neto, diferencias[:self.top], muestreador))
+
+    def _texto_cpu(self, stats, orden):
+        buf = io.StringIO()
+        stats.stream = buf
+        stats.sort_stats(orden).print_stats(self.top)
+        # print_stats arranca con el encabezado de pstats; desde la tabla en adelante
+        texto = buf.getvalue()
+        return texto[texto.find("   ncalls"):] if "   ncalls" in texto else texto
+
+    def informe(self, carpeta, base_nombre="perfil"):
+        """Escribe el informe (y los .prof / .html por etapa) en 'carpeta'. Devuelve la ruta del .txt."""
+        os.makedirs(carpeta, exist_ok=True)
+        base = os.path.join(carpeta, f"{base_nombre}_perfil_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        lineas = [f"Perfil por etapas — {datetime.now().isoformat(timespec='seconds')}", ""]
+        lineas.append(f"{'etapa':<12}{'s':>10}{'memoria neta MB':>18}")
+        for nombre, dt, _, neto, _, _ in self.etapas:
+            lineas.append(f"{nombre:<12}{dt:>10.2f}{neto / (1024 * 1024):>18.1f}")
+        lineas.append("")
+
+        for nombre, dt, stats, _, asignadores, muestreador in self.etapas:
+            stats.dump_stats(f"{base}_{nombre}.prof")
+            calientes = sorted(stats.stats.items(), key=lambda kv: -kv[1][2])[:5]   # por tiempo propio
+            lineas += [
+                "=" * 100,
+                f"Etapa '{nombre}': {dt:.2f} s",
+                "Funciones más calientes (tiempo propio): " + ", ".join(
+                    f"{pstats.func_std_string(f)} {v[2]:.2f}s" for f, v in calientes),
+                "",
+                "-- CPU por tiempo propio (tottime) --",
+                self._texto_cpu(stats, "tottime"),
+                "-- CPU acumulado (cumtime) --",
+                self._texto_cpu(stats, "cumulative"),
+                "-- Mayores asignadores (tracemalloc, diferencia en la etapa) --",
+            ]
+            for a in asignadores:
+                marco = a.traceback[0]
+                lineas.append(f"   {a.size_diff / 1024:>12,.1f} KB  {a.count_diff:>+10,} bloques  {marco.filename}:{marco.lineno}")
+            if muestreador:
+                ruta_html = f"{base}_{nombre}.html"
+                with open(ruta_html, "w", encoding="utf-8") as f:
+                    f.write(muestreador.output_html())
+                lineas += ["", f"-- Muestreo (pyinstrument): {ruta_html} --",
+                           muestreador.output_text(unicode=True, color=False)]
+            lineas.append("")
+
+        ruta = base + ".txt"
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write("\n".join(lineas))
+        print(f"🔬 Informe de perfil -> {ruta}")
+        for nombre, dt, stats, _, _, _ in self.etapas:
+            f, v = max(stats.stats.items(), key=lambda kv: kv[1][2], default=(None, None))
+            if f:
+                print(f"   {nombre:<8} {dt:>7.2f} s  más caliente: {pstats.func_std_string(f)} ({v[2]:.2f} s propios)")
+        return ruta
+
+@contextmanager
+def etapa(perfil, nombre):
+    """Como perfil.etapa(nombre), pero sin perfil activo (None) no hace nada."""
+    if perfil is None:
+        yield
+    else:
+        with perfil.etapa(nombre):
+            yield
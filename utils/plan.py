@@ -0,0 +1,62 @@
+# utils/plan.py
+# Plan de páginas a partir del total de resultados que informa cada fuente:
+# en vez de paginar "a ciegas" hasta que falle el 'Siguiente', se sabe de antemano
+# cuántas páginas hay (ceil(total / por_página)) y se puede informar avance y ETA.
+
+import re, math, time, threading
+
+def entero_de_texto(texto):
+    """'12,345 results' / '1.234' -> 12345 / 1234 (None si no hay número)."""
+    m = re.search(r"\d[\d.,\u00a0\u202f]*", texto or "")
+    if not m:
+        return None
+    return int(re.sub(r"\D", "", m.group(0)))
+
+def plan_paginas(total, por_pagina, paginas=None):
+    """
+    Páginas 1..ceil(total/por_pagina). 'paginas' (entero N o lista) es lo que pidió el usuario:
+    se recorta a las que existen. Si el total es desconocido (None) se devuelve lo pedido tal cual.
+    """
+    pedidas = None if paginas is None else (list(range(1, paginas + 1)) if isinstance(paginas, int) else list(paginas))
+    if total is None or not por_pagina:
+        return pedidas or []
+    existentes = max(0, math.ceil(total / por_pagina))
+    if pedidas is None:
+        return list(range(1, existentes + 1))
+    return [p for p in pedidas if 1 <= p <= existentes]
+
+def informar_plan(fuente, consulta, total, por_pagina, plan, pedidas):
+    if total is None:
+        print(f"🔢 {fuente} '{consulta}': total de resultados desconocido; se piden {len(plan)} página(s).")
+        return
+    n = len(pedidas) if isinstance(pedidas, (list, tuple)) else pedidas
+    print(f"🔢 {fuente} '{consulta}': {total:,} resultado(s) = {math.ceil(total / por_pagina)} página(s) de "
+          f"{por_pagina}; se exportan {len(plan)}" + (f" (pedidas {n})" if n != len(plan) else "") + ".")
+
+def _fmt_segundos(s):
+    s = int(round(s))
+    if s >= 3600:
+        return f"{s // 3600}h{s % 3600 // 60:02d}m"
+    if s >= 60:
+        return f"{s // 60}m{s % 60:02d}s"
+    return f"{s}s"
+
+class Progreso:
+    """Avance de un plan de páginas con ETA (ritmo medio desde el inicio). Seguro entre hilos."""
+    def __init__(self, total, etiqueta):
+        self.total = total
+        self.etiqueta = etiqueta
+        self.hechas = 0
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+
+    def avanzar(self, n=1):
+        with self._lock:
+            self.hechas += n
+            hechas = self.hechas
+        if not self.total:
+            return
+        transcurrido = time.monotonic() - self._t0
+        eta = transcurrido / hechas * max(0, self.total - hechas)
+        print(f"📈 {self.etiqueta}: {hechas}/{self.total} página(s) ({100 * hechas // self.total}%) · "
+              f"{_fmt_segundos(transcurrido)} · ETA {_fmt_segundos(eta)}")
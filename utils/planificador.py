@@ -0,0 +1,177 @@
+# utils/planificador.py
+# Planificador asyncio para los exports HTTP (utils.http_export) de muchas páginas/consultas
+# a la vez sin que crai.referencistas.com nos corte:
+#   - semáforo por host (concurrencia máxima)
+#   - token bucket por host (peticiones por segundo + ráfaga)
+#   - backoff exponencial con jitter ante 429/5xx/errores de conexión (respeta Retry-After)
+#   - cola con prioridad (menor número = antes)
+#   - cada RIS completado se guarda y se pasa directo al parser de utils.ris_merge
+
+import time, random, asyncio, itertools
+from datetime import datetime
+from urllib.parse import urlparse
+from .http_export import ErrorHTTP, SesionVencida, guardar_ris
+from .ris_merge import parse_ris_text
+from .trazas import span
+from .metricas import contar
+
+REINTENTABLES = (429, 500, 502, 503, 504)
+
+class TokenBucket:
+    """'tasa' tokens por segundo, hasta 'capacidad' acumulados (ráfaga)."""
+    def __init__(self, tasa, capacidad):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad)
+        self._tokens = float(capacidad)
+        self._t = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self, n=1):
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._t) * self.tasa)
+                self._t = ahora
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                await asyncio.sleep((n - self._tokens) / self.tasa)
+
+class TrabajoExport:
+    """
+    Una página a exportar:
+      exportar(cliente, url_resultados, pagina, **kwargs) -> bytes RIS  (p. ej. http_export.exportar_ris_http_sage)
+    'costo' = peticiones HTTP que hace (SRP + export = 2) para el token bucket.
+    'consulta' solo identifica el trabajo en lotes de varias consultas (no se pasa a exportar).
+    """
+    def __init__(self, fuente, exportar, url_resultados, pagina, carpeta, nombre, prioridad=0, costo=2,
+                 prefijo="http", consulta=None, **kwargs):
+        self.fuente = fuente
+        self.prefijo = prefijo
+        self.consulta = consulta
+        self.exportar = exportar
+        self.url_resultados = url_resultados
+        self.pagina = pagina
+        self.carpeta = carpeta
+        self.nombre = nombre
+        self.prioridad = prioridad
+        self.costo = costo
+        self.kwargs = kwargs
+        self.host = urlparse(url_resultados).hostname
+
+    def __repr__(self):
+        if self.consulta:
+            return f"<{self.fuente} '{self.consulta}' p{self.pagina}>"
+        return f"<{self.fuente} p{self.pagina}>"
+
+class PlanificadorExport:
+    def __init__(self, cliente, concurrencia_por_host=4, tasa_por_host=2.0, rafaga=4,
+                 reintentos=4, backoff_base=1.0, backoff_max=30.0, trabajadores=None):
+        self.cliente = cliente
+        self.concurrencia_por_host = concurrencia_por_host
+        self.tasa_por_host = tasa_por_host
+        self.rafaga = rafaga
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.trabajadores = trabajadores
+        self._semaforos = {}
+        self._buckets = {}
+        self._abortado = None       # SesionVencida: corta el lote entero
+
+    def _backoff(self, intento, retry_after=None):
+        """Full jitter: uniforme en [0, min(max, base*2^intento)], o Retry-After si el servidor lo pide."""
+        if retry_after:
+            return min(self.backoff_max, retry_after) + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** intento)))
+
+    async def _una(self, t):
+        sem = self._semaforos.setdefault(t.host, asyncio.Semaphore(self.concurrencia_por_host))
+        bucket = self._buckets.setdefault(t.host, TokenBucket(self.tasa_por_host, self.rafaga))
+        for intento in range(self.reintentos + 1):
+            async with sem:
+                await bucket.adquirir(t.costo)
+                try:
+                    return await asyncio.to_thread(t.exportar, self.cliente, t.url_resultados, t.pagina, **t.kwargs)
+                except ErrorHTTP as e:
+                    if e.status not in REINTENTABLES or intento == self.reintentos:
+                        raise
+                    espera = self._backoff(intento, e.retry_after)
+                except (ConnectionError, TimeoutError, OSError) as e:
+                    if intento == self.reintentos:
+                        raise
+                    espera = self._backoff(intento)
+            # fuera del semáforo: no ocupamos un cupo del host mientras esperamos
+            print(f"↻ {t}: reintento {intento + 1}/{self.reintentos} en {espera:.1f} s")
+            await asyncio.sleep(espera)
+
+    async def _trabajador(self, cola, al_completar, resultados):
+        while True:
+            _, _, t = await cola.get()
+            if self._abortado:
+                cola.task_done()
+                continue
+            res = {"trabajo": t, "ruta": None, "registros": [], "error": None}
+            try:
+                with span(f"{t.prefijo}.export_page", pagina=t.pagina, modo="async"):
+                    contenido = await self._una(t)
+                if contenido:
+                    res["ruta"] = guardar_ris(contenido, t.carpeta, t.nombre)
+                    contar("biblio_paginas_exportadas_total", fuente=t.fuente, modo="http")
+                    with span("parse", archivo=res["ruta"]):
+                        res["registros"] = parse_ris_text(contenido.decode("utf-8", errors="replace"),
+                                                          source_db=t.fuente, source_file=res["ruta"])
+                    contar("biblio_bytes_parseados_total", len(contenido), fuente=t.fuente)
+                    contar("biblio_registros_parseados_total", len(res["registros"]), fuente=t.fuente)
+            except SesionVencida as e:
+                self._abortado = e
+                cola.task_done()
+                continue
+            except Exception as e:
+                res["error"] = f"{type(e).__name__}: {e}"
+            resultados.append(res)
+            if al_completar:
+                try:
+                    al_completar(res)
+                except Exception as e:
+                    print(f"⚠️ al_completar({t}): {e}")
+            cola.task_done()
+
+    async def ejecutar(self, trabajos, al_completar=None):
+        """
+        Ejecuta todos los trabajos respetando prioridad y límites por host.
+        al_completar(res) se llama apenas termina cada página (res: trabajo, ruta, registros, error).
+        Devuelve la lista de resultados en orden de finalización.
+        Si el proxy pide login (SesionVencida) se descarta lo que quede en cola y se relanza.
+        """
+        cola = asyncio.PriorityQueue()
+        seq = itertools.count()
+        for t in trabajos:
+            cola.put_nowait((t.prioridad, next(seq), t))
+
+        hosts = {t.host for t in trabajos} or {None}
+        n = self.trabajadores or max(1, self.concurrencia_por_host * len(hosts))
+        resultados = []
+        tareas = [asyncio.create_task(self._trabajador(cola, al_completar, resultados)) for _ in range(n)]
+        await cola.join()
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        if self._abortado:
+            raise self._abortado
+        return resultados
+
+def trabajos_paginas(fuente, exportar, url_resultados, carpeta, prefijo, consulta_slug, paginas, prioridad=0,
+                     consulta=None, **kwargs):
+    """Un TrabajoExport por página (paginas: entero 1..N o lista), con el mismo nombre de archivo que el modo secuencial."""
+    lista = list(range(1, paginas + 1)) if isinstance(paginas, int) else list(paginas)
+    fecha = datetime.now().strftime("%Y%m%d_%H%M")
+    return [
+        TrabajoExport(fuente, exportar, url_resultados, p, carpeta, f"{prefijo}_{consulta_slug}_p{p}_{fecha}.ris",
+                      prioridad=prioridad, prefijo=prefijo, consulta=consulta, **kwargs)
+        for p in lista
+    ]
+
+def exportar_concurrente(cliente, trabajos, al_completar=None, **opciones):
+    """Atajo síncrono: asyncio.run(PlanificadorExport(cliente, **opciones).ejecutar(trabajos))."""
+    return asyncio.run(PlanificadorExport(cliente, **opciones).ejecutar(trabajos, al_completar=al_completar))
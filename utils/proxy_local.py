@@ -0,0 +1,160 @@
+# utils/proxy_local.py
+# Servidor local que imita al proxy CRAI para SAGE y ScienceDirect (resultados + export RIS).
+# Sirve para probar el modo HTTP (utils.http_export) sin credenciales ni red:
+#
+#   python -m utils.proxy_local --puerto 8765
+#
+# Reglas que imita:
+#   - sin la cookie de sesión -> 302 a /login (formulario con id="btn-google")
+#   - GET  /action/doSearch?pageSize=&startPage=   (SAGE, startPage 0-based)
+#   - POST /action/downloadCitation  doi=...&format=ris
+#   - GET  /search?qs=&offset=&show=               (ScienceDirect)
+#   - GET  /sdfe/arp/cite?pii=S1,S2&format=...
+#   - GET  /__login  -> fija la cookie de sesión (atajo para pruebas)
+#   - cada_429=N     -> una de cada N peticiones responde 429 (para probar backoff)
+
+import time, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+COOKIE_SESION = "ezproxy"
+VALOR_SESION = "sesion-local"
+
+def ris_sintetico(fuente, i):
+    """Registro RIS determinista para el artículo i de la fuente ('sage' o 'sd')."""
+    doi = f"10.9999/{fuente}.{i:06d}"
+    return (
+        "TY  - JOUR\n"
+        f"TI  - Synthetic {fuente.upper()} article {i}\n"
+        f"AU  - Author {i % 97}, A.\n"
+        f"PY  - {2015 + i % 10}\n"
+        f"T2  - Journal of {fuente.upper()} Studies\n"
+        f"DO  - {doi}\n"
+        f"AB  - Abstract of article {i}.\n"
+        "ER  - \n"
+    )
+
+def _pii(i):
+    return f"S{i:016d}"
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    # ---------------- helpers ----------------
+
+    def _enviar(self, status, body=b"", tipo="text/html; charset=utf-8", extra=None):
+        srv = self.server
+        if srv.latencia:
+            time.sleep(srv.latencia)
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _autenticado(self):
+        return f"{COOKIE_SESION}={VALOR_SESION}" in (self.headers.get("Cookie") or "")
+
+    def _rango(self, inicio, n, total):
+        return range(inicio, min(inicio + n, total))
+
+    def _limitar(self):
+        """Cuenta la petición y, si cada_429=N, responde 429 a una de cada N (para probar backoff)."""
+        srv = self.server
+        with srv.lock:
+            srv.peticiones += 1
+            toca = srv.cada_429 and srv.peticiones % srv.cada_429 == 0
+        if toca:
+            self._enviar(429, b"too many requests", extra={"Retry-After": "0"})
+        return bool(toca)
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.conexiones += 1
+
+    # ---------------- rutas ----------------
+
+    def do_GET(self):
+        u = urlparse(self.path)
+        q = parse_qs(u.query)
+        srv = self.server
+        if self._limitar():
+            return
+
+        if u.path == "/__login":
+            return self._enviar(302, extra={"Location": "/", "Set-Cookie": f"{COOKIE_SESION}={VALOR_SESION}; Path=/"})
+        if u.path == "/login":
+            return self._enviar(200, b'<html><body><button id="btn-google">Iniciar sesion con Google</button></body></html>')
+        if not self._autenticado():
+            return self._enviar(302, extra={"Location": "/login"})
+
+        if u.path == "/action/doSearch":
+            size = int(q.get("pageSize", ["10"])[0])
+            start = int(q.get("startPage", ["0"])[0])
+            items = "".join(
+                f'<div class="search__item"><a class="issue-item__title" href="/doi/full/10.9999/sage.{i:06d}">Article {i}</a></div>'
+                for i in self._rango(start * size, size, srv.total_sage)
+            )
+            return self._enviar(200, f'<html><body><span class="result__count">{srv.total_sage}</span>{items}</body></html>'.encode())
+
+        if u.path == "/search":
+            show = int(q.get("show", ["25"])[0])
+            offset = int(q.get("offset", ["0"])[0])
+            items = "".join(
+                f'<li><a class="result-list-title-link" href="/science/article/pii/{_pii(i)}">Article {i}</a></li>'
+                for i in self._rango(offset, show, srv.total_sd)
+            )
+            return self._enviar(200, f'<html><body><span class="search-body-results-text">{srv.total_sd:,} results</span>'
+                                     f'<ol class="search-results">{items}</ol></body></html>'.encode())
+
+        if u.path == "/sdfe/arp/cite":
+            piis = (q.get("pii", [""])[0]).split(",")
+            ris = "".join(ris_sintetico("sd", int(p[1:])) for p in piis if p[1:].isdigit())
+            return self._enviar(200, ris.encode(), tipo="application/x-research-info-systems")
+
+        return self._enviar(404, b"not found")
+
+    def do_POST(self):
+        u = urlparse(self.path)
+        largo = int(self.headers.get("Content-Length") or 0)
+        datos = parse_qs(self.rfile.read(largo).decode("utf-8"))
+        if self._limitar():
+            return
+        if not self._autenticado():
+            return self._enviar(302, extra={"Location": "/login"})
+
+        if u.path == "/action/downloadCitation":
+            ris = "".join(ris_sintetico("sage", int(d.rsplit(".", 1)[1])) for d in datos.get("doi", []))
+            return self._enviar(200, ris.encode(), tipo="application/x-research-info-systems")
+        return self._enviar(404, b"not found")
+
+def iniciar_proxy_local(puerto=0, total_sage=250, total_sd=250, latencia=0.0, cada_429=0):
+    """
+    Arranca el servidor en un hilo de fondo. Devuelve (servidor, url_base).
+    servidor.conexiones / servidor.peticiones permiten verificar el keep-alive.
+    """
+    srv = ThreadingHTTPServer(("127.0.0.1", puerto), _Handler)
+    srv.daemon_threads = True
+    srv.total_sage, srv.total_sd, srv.latencia, srv.cada_429 = total_sage, total_sd, latencia, cada_429
+    srv.lock = threading.Lock()
+    srv.conexiones = srv.peticiones = 0
+    threading.Thread(target=srv.serve_forever, name="proxy-local", daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Proxy CRAI simulado (SAGE + ScienceDirect)")
+    ap.add_argument("--puerto", type=int, default=8765)
+    ap.add_argument("--latencia", type=float, default=0.0, help="segundos extra por respuesta")
+    args = ap.parse_args()
+    srv, url = iniciar_proxy_local(args.puerto, latencia=args.latencia)
+    print(f"Proxy local en {url}  (cookie {COOKIE_SESION}={VALOR_SESION} o visita /__login)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,54 @@
+# utils/reintentos.py
+# Reintentos por página para los bucles de paginación: backoff exponencial acotado,
+# una "preparación" antes de cada reintento (recargar resultados y volver a seleccionar)
+# y una lista de páginas fallidas (dead-letter) para informar los huecos al final
+# en vez de cortar toda la cosecha.
+
+import json, time, random
+from datetime import datetime
+
+def backoff(intento, base=2.0, maximo=30.0):
+    """Segundos antes del reintento número 'intento' (0-based): base*2^intento con ±25% de jitter, hasta 'maximo'."""
+    return min(maximo, base * (2 ** intento)) * random.uniform(0.75, 1.25)
+
+def con_reintentos(fn, reintentos=2, base=2.0, maximo=30.0, preparar=None, etiqueta="paso"):
+    """
+    Llama fn() hasta reintentos+1 veces. Antes de cada reintento espera el backoff y llama
+    preparar() (p. ej. recargar la página). Si todos los intentos fallan, re-lanza el último error.
+    """
+    for intento in range(reintentos + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if intento >= reintentos:
+                raise
+            espera = backoff(intento, base, maximo)
+            print(f"↻ {etiqueta}: {type(e).__name__}: {e} — reintento {intento + 1}/{reintentos} en {espera:.1f} s")
+            time.sleep(espera)
+            if preparar:
+                try:
+                    preparar()
+                except Exception as e2:
+                    print(f"⚠️ {etiqueta}: no se pudo preparar el reintento: {e2}")
+
+def pagina_fallida(fuente, consulta_slug, pagina, error):
+    return {
+        "fuente": fuente,
+        "consulta": str(consulta_slug),
+        "pagina": pagina,
+        "error": f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def informar_fallidas(fallidas, ruta=None):
+    """Imprime los huecos de la cosecha y, si se da 'ruta', los guarda como JSON-lines."""
+    if not fallidas:
+        return
+    print(f"\n⚠️ Páginas sin exportar tras los reintentos: {len(fallidas)}")
+    for f in fallidas:
+        print(f"   - {f['fuente']} {f['consulta']} p{f['pagina']}: {f['error']}")
+    if ruta:
+        with open(ruta, "w", encoding="utf-8") as fh:
+            for f in fallidas:
+                fh.write(json.dumps(f, ensure_ascii=False) + "\n")
+        print(f"   Lista guardada en {ruta}")
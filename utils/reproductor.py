@@ -0,0 +1,284 @@
+# utils/reproductor.py
+# Reproduce offline una grabación hecha con utils.grabacion (o una sintética): sirve el HTML
+# grabado de SAGE / ScienceDirect y los RIS descargados, sin proxy CRAI ni red. Sirve para
+# medir y depurar los scrapers con Selenium de punta a punta (benchmarks/bench_scraping.py).
+#
+#   python -m utils.reproductor <carpeta>/<host> --puerto 8766
+#
+# Reglas:
+#   - sin la cookie de sesión -> 302 a /login (botón id="btn-google", igual que proxy_local)
+#   - /__idp/...  stub del login de Google (identifierId / Passwd); al final fija la cookie.
+#                 Las pantallas de Google no se graban (datos de la cuenta), por eso se simulan.
+#   - /__login    fija la cookie directamente (atajo)
+#   - /__ris?p=<ruta+query>  RIS grabado para esa página (como adjunto)
+#   - el resto: página grabada por ruta + query normalizada (grabacion.clave_url); si no hay
+#     clave exacta, la de la misma ruta con más parámetros coincidentes.
+# El HTML grabado se sirve sin sus <script> (apuntan al sitio real) y con un shim que imita la
+# parte de la UI que usan los scrapers: select-all habilita Export, Export abre el modal / menú
+# y el botón RIS descarga /__ris.
+
+import os, re, json, time, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, parse_qsl
+from .grabacion import clave_url
+from .proxy_local import COOKIE_SESION, VALOR_SESION, ris_sintetico
+
+_RE_SCRIPT = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.I | re.S)
+
+# UI de export de ambas fuentes (los scripts reales no se sirven)
+_SHIM_JS = """
+<script>
+(function () {
+  const $ = s => document.querySelector(s);
+  const ris = '/__ris?p=' + encodeURIComponent(location.pathname + location.search);
+  const descargar = () => { const a = document.createElement('a'); a.href = ris; a.download = ''; document.body.appendChild(a); a.click(); a.remove(); };
+  const habilitar = (el, si) => { if (!el) return; el.classList.toggle('disabled', !si); si ? el.removeAttribute('disabled') : el.setAttribute('disabled', '');
+                                  el.setAttribute('aria-disabled', String(!si)); };
+
+  // SAGE: #action-bar-select-all -> a[data-id=srp-export-citations] -> #exportCitation -> a.download__btn
+  const saSage = $('#action-bar-select-all'), exSage = $('a[data-id="srp-export-citations"]');
+  if (exSage) {
+    let modal = $('#exportCitation');
+    if (!modal) { modal = document.createElement('div'); modal.id = 'exportCitation'; modal.className = 'modal'; document.body.appendChild(modal); }
+    if (!modal.querySelector('a.download__btn'))
+      modal.insertAdjacentHTML('beforeend', '<select><option>RIS</option></select><a class="download__btn" href="#">Download citation</a>');
+    if (!modal.querySelector('button.close'))
+      modal.insertAdjacentHTML('afterbegin', '<button type="button" class="close" data-dismiss="modal">Close</button>');
+    modal.style.display = 'none'; modal.classList.remove('show');
+    const cerrar = () => { modal.style.display = 'none'; modal.classList.remove('show'); };
+    habilitar(exSage, saSage && saSage.checked);
+    if (saSage) saSage.addEventListener('change', () => habilitar(exSage, saSage.checked));
+    exSage.addEventListener('click', ev => { ev.preventDefault(); if (exSage.classList.contains('disabled')) return;
+                                           modal.style.display = 'block'; modal.classList.add('show'); });
+    modal.querySelectorAll('button.close').forEach(b => b.addEventListener('click', cerrar));
+    modal.querySelector('a.download__btn').addEventListener('click', ev => { ev.preventDefault(); descargar(); });
+  }
+
+  // ScienceDirect: #select-all-results -> srp-export-multi-expand -> srp-export-multi-ris
+  const saSd = $('#select-all-results'), exSd = $('button[data-aa-button="srp-export-multi-expand"]');
+  if (exSd) {
+    let btnRis = $('button[data-aa-button="srp-export-multi-ris"]');
+    if (!btnRis) { exSd.insertAdjacentHTML('afterend', '<button type="button" data-aa-button="srp-export-multi-ris">Export citation to RIS</button>');
+                   btnRis = $('button[data-aa-button="srp-export-multi-ris"]'); }
+    btnRis.style.display = 'none';
+    habilitar(exSd, saSd && saSd.checked);
+    if (saSd) saSd.addEventListener('change', () => habilitar(exSd, saSd.checked));
+    exSd.addEventListener('click', ev => { ev.preventDefault(); if (!exSd.hasAttribute('disabled')) btnRis.style.display = ''; });
+    btnRis.addEventListener('click', ev => { ev.preventDefault(); btnRis.style.display = 'none'; descargar(); });
+  }
+})();
+</script>
+"""
+
+_LOGIN = b'<html><body><button id="btn-google" onclick="location.href=\'/__idp/\'">Iniciar sesion con Google</button></body></html>'
+_IDP_CORREO = (b'<html><body><input id="identifierId" type="email">'
+               b'<button id="identifierNext" onclick="location.href=\'/__idp/clave\'">Siguiente</button></body></html>')
+_IDP_CLAVE = (b'<html><body><input name="Passwd" type="password">'
+              b'<button id="passwordNext" onclick="location.href=\'/__idp/ok\'">Siguiente</button></body></html>')
+
+def _puntaje(pedidos, candidatos):
+    """Parámetros que coinciden menos los del candidato que faltan o difieren."""
+    return sum(1 if pedidos.get(k) == v else -1 for k, v in candidatos.items())
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _enviar(self, status, body=b"", tipo="text/html; charset=utf-8", extra=None):
+        srv = self.server
+        if srv.latencia:
+            time.sleep(srv.latencia)
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _autenticado(self):
+        return f"{COOKIE_SESION}={VALOR_SESION}" in (self.headers.get("Cookie") or "")
+
+    def _resolver(self, ruta):
+        """Clave grabada para 'ruta' (exacta o la más parecida de la misma ruta), o None."""
+        paginas = self.server.indice["paginas"]
+        clave = clave_url(ruta)
+        if clave in paginas:
+            return clave
+        u = urlparse(clave)
+        pedidos = dict(parse_qsl(u.query, keep_blank_values=True))
+        candidatas = [c for c in paginas if urlparse(c).path == u.path]
+        if not candidatas:
+            return None
+        return max(candidatas, key=lambda c: _puntaje(pedidos, dict(parse_qsl(urlparse(c).query, keep_blank_values=True))))
+
+    def _pagina(self, clave):
+        srv = self.server
+        with open(os.path.join(srv.carpeta, srv.indice["paginas"][clave]), "r", encoding="utf-8") as f:
+            html = f.read()
+        origen = srv.indice.get("origen")
+        if origen:
+            html = html.replace(origen, "").replace("//" + urlparse(origen).netloc, "")
+        html = _RE_SCRIPT.sub("", html)
+        if "</body>" in html:
+            html = html.replace("</body>", _SHIM_JS + "</body>", 1)
+        else:
+            html += _SHIM_JS
+        return html.encode("utf-8")
+
+    def do_GET(self):
+        u = urlparse(self.path)
+        srv = self.server
+        with srv.lock:
+            srv.peticiones += 1
+
+        if u.path in ("/__login", "/__idp/ok"):
+            return self._enviar(302, extra={"Location": "/", "Set-Cookie": f"{COOKIE_SESION}={VALOR_SESION}; Path=/"})
+        if u.path == "/login":
+            return self._enviar(200, _LOGIN)
+        if u.path == "/__idp/":
+            return self._enviar(200, _IDP_CORREO)
+        if u.path == "/__idp/clave":
+            return self._enviar(200, _IDP_CLAVE)
+        if not self._autenticado():
+            return self._enviar(302, extra={"Location": "/login"})
+
+        if u.path == "/__ris":
+            clave = self._resolver(parse_qs(u.query).get("p", ["/"])[0])
+            archivos = srv.indice["descargas"].get(clave) if clave else None
+            if not archivos:
+                return self._enviar(404, b"sin RIS grabado para esta pagina")
+            with open(os.path.join(srv.carpeta, archivos[0]), "rb") as f:
+                datos = f.read()
+            nombre = os.path.basename(archivos[0]).split("_", 1)[-1]
+            return self._enviar(200, datos, tipo="application/x-research-info-systems",
+                                extra={"Content-Disposition": f'attachment; filename="{nombre}"'})
+
+        clave = self._resolver(self.path)
+        if clave is None:
+            return self._enviar(404, b"pagina no grabada")
+        return self._enviar(200, self._pagina(clave))
+
+def iniciar_reproductor(carpeta_host, puerto=0, latencia=0.0):
+    """
+    Sirve la grabación de un host (<carpeta>/<host> con indice.json) en un hilo de fondo.
+    Devuelve (servidor, url_base); servidor.peticiones cuenta las peticiones atendidas.
+    """
+    with open(os.path.join(carpeta_host, "indice.json"), "r", encoding="utf-8") as f:
+        indice = json.load(f)
+    srv = ThreadingHTTPServer(("127.0.0.1", puerto), _Handler)
+    srv.daemon_threads = True
+    srv.carpeta, srv.indice, srv.latencia = carpeta_host, indice, latencia
+    srv.lock = threading.Lock()
+    srv.peticiones = 0
+    threading.Thread(target=srv.serve_forever, name="reproductor", daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+# ---------------- grabación sintética ----------------
+
+def _html(cuerpo):
+    return f"<html><head><title>Grabación sintética</title></head><body>{cuerpo}</body></html>"
+
+def _srp_sage(inicio, fin, total, siguiente):
+    items = "".join(
+        f'<div class="search__item"><input type="checkbox"><a class="issue-item__title" '
+        f'href="/doi/full/10.9999/sage.{i:06d}">Article {i}</a></div>'
+        for i in range(inicio, fin)
+    )
+    sig = f'<a class="next hvr-forward pagination__link" href="{siguiente}">next</a>' if siguiente else ""
+    return _html(
+        f'<span class="result__count">{total}</span>'
+        '<div class="action-bar"><input type="checkbox" id="action-bar-select-all">'
+        '<a href="#" data-id="srp-export-citations">Export selected citations</a></div>'
+        f"{items}<nav>{sig}</nav>"
+    )
+
+def _srp_sd(inicio, fin, total, show, tamanios, siguiente):
+    items = "".join(
+        f'<li><div class="result-item-content"><a class="result-list-title-link" '
+        f'href="/science/article/pii/S{i:016d}">Article {i}</a></div></li>'
+        for i in range(inicio, fin)
+    )
+    por_pagina = "".join(
+        f'<li aria-current="true"><span class="active-per-page">{t}</span></li>' if t == show
+        else f'<li><a href="/search?show={t}"><span>{t}</span></a></li>'
+        for t in tamanios
+    )
+    sig = (f'<li class="pagination-link next-link"><a class="anchor" data-aa-name="srp-next-page" '
+           f'href="{siguiente}"><span>next</span></a></li>') if siguiente else ""
+    return _html(
+        f'<span class="search-body-results-text">{total:,} results</span>'
+        '<input type="checkbox" class="checkbox-input" id="select-all-results" aria-label="Select all articles">'
+        '<label class="checkbox-label" for="select-all-results">Select all articles</label>'
+        '<button type="button" data-aa-button="srp-export-multi-expand">Export</button>'
+        f'<ol class="search-results">{items}</ol><ol class="ResultsPerPage">{por_pagina}</ol><ul>{sig}</ul>'
+    )
+
+def grabacion_sintetica(carpeta, fuente="SAGE", total=250, por_pagina=None):
+    """
+    Escribe en 'carpeta' (una carpeta de host) una grabación determinista de 'fuente'
+    ('SAGE' o 'ScienceDirect'): home con el buscador, SRPs paginadas con los selectores reales
+    y un RIS por página (proxy_local.ris_sintetico). Devuelve 'carpeta'.
+    SAGE pagina con startPage (por_pagina resultados, 10 por defecto); ScienceDirect con
+    offset/show en 25, 50 y 100 (la SRP por defecto es show=25).
+    """
+    paginas, descargas = {}, {}
+    os.makedirs(os.path.join(carpeta, "paginas"), exist_ok=True)
+    os.makedirs(os.path.join(carpeta, "ris"), exist_ok=True)
+
+    def guardar(clave, html, ris=None):
+        n = len(paginas)
+        paginas[clave] = f"paginas/{n:05d}.html"
+        with open(os.path.join(carpeta, paginas[clave]), "w", encoding="utf-8") as f:
+            f.write(html)
+        if ris is not None:
+            descargas[clave] = [f"ris/{n:05d}_pagina.ris"]
+            with open(os.path.join(carpeta, descargas[clave][0]), "w", encoding="utf-8") as f:
+                f.write(ris)
+
+    if fuente == "SAGE":
+        tam = por_pagina or 10
+        guardar("/", _html(
+            '<div role="search" aria-label="Search Sage Journals"><form class="quick-search__form" action="/action/doSearch">'
+            '<input class="quick-search__input" type="search" name="AllField">'
+            '<button type="submit" class="quick-search__button">Search</button></form></div>'
+        ))
+        n_paginas = max(1, -(-total // tam))
+        for p in range(n_paginas):
+            inicio, fin = p * tam, min((p + 1) * tam, total)
+            siguiente = f"/action/doSearch?startPage={p + 1}" if p + 1 < n_paginas else None
+            guardar(clave_url(f"/action/doSearch?startPage={p}"), _srp_sage(inicio, fin, total, siguiente),
+                    "".join(ris_sintetico("sage", i) for i in range(inicio, fin)))
+    else:
+        tamanios = (25, 50, 100)
+        guardar("/", _html(
+            '<form action="/search"><input id="qs" name="qs" class="search-input-field" aria-label="Find articles">'
+            '<button type="submit" aria-label="Submit quick search">Search</button></form>'
+        ))
+        for show in tamanios:
+            n_paginas = max(1, -(-total // show))
+            for p in range(n_paginas):
+                inicio, fin = p * show, min((p + 1) * show, total)
+                siguiente = f"/search?show={show}&offset={fin}" if p + 1 < n_paginas else None
+                clave = "/search" if (show, p) == (25, 0) else clave_url(f"/search?show={show}&offset={inicio}")
+                guardar(clave, _srp_sd(inicio, fin, total, show, tamanios, siguiente),
+                        "".join(ris_sintetico("sd", i) for i in range(inicio, fin)))
+
+    with open(os.path.join(carpeta, "indice.json"), "w", encoding="utf-8") as f:
+        json.dump({"origen": None, "paginas": paginas, "descargas": descargas}, f, ensure_ascii=False, indent=1)
+    return carpeta
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Reproduce una grabación de utils.grabacion (un host)")
+    ap.add_argument("carpeta", help="carpeta del host (la que contiene indice.json)")
+    ap.add_argument("--puerto", type=int, default=8766)
+    ap.add_argument("--latencia", type=float, default=0.0, help="segundos extra por respuesta")
+    args = ap.parse_args()
+    srv, url = iniciar_reproductor(args.carpeta, args.puerto, latencia=args.latencia)
+    print(f"Reproduciendo {args.carpeta} en {url}  (cookie {COOKIE_SESION}={VALOR_SESION} o visita /__login)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -1,7 +1,10 @@
 # utils/ris_merge.py
 import os, re, unicodedata, json
-from typing import List, Dict, Tuple, Iterable
+from typing import List, Dict, Tuple, Iterable, Optional
 import pandas as pd
+from .trazas import span, trazar
+from .descubrimiento import descubrir, recorrer, IGNORAR
+from .metricas import contar, fijar, cronometrar
 
 # -------------------- utilidades --------------------
 
@@ -121,33 +124,58 @@ def parse_ris_text(txt: str, source_db: str, source_file: str) -> List[Dict]:
 
     return recs
 
+@trazar("parse")
 def parse_ris_file(path: str, source_db: str = "") -> List[Dict]:
     txt = _read_text(path)
     if not _looks_like_ris(txt):
         return []
-    return parse_ris_text(txt, source_db=source_db or "unknown", source_file=path)
+    recs = parse_ris_text(txt, source_db=source_db or "unknown", source_file=path)
+    contar("biblio_bytes_parseados_total", os.path.getsize(path), fuente=source_db or "unknown")
+    contar("biblio_registros_parseados_total", len(recs), fuente=source_db or "unknown")
+    return recs
+
+def tag_query(records: List[Dict], query: Optional[str]) -> List[Dict]:
+    """Anota en cada registro la consulta que lo produjo (campo 'queries'; se une al deduplicar)."""
+    if query:
+        for r in records:
+            r["queries"] = _merge_lists(r.get("queries", []), [query])
+    return records
 
 # -------------------- DISCOVERY --------------------
 
 def _iter_candidate_files(folder: str, exts: Iterable[str]) -> Iterable[str]:
-    exts_l = tuple(e.lower() for e in exts)
-    for root, _, files in os.walk(folder):
-        for fn in files:
-            if fn.lower().endswith(exts_l):
-                yield os.path.join(root, fn)
+    # os.scandir, sin bajar a carpetas ignoradas (.git, venv, node_modules...; ver utils.descubrimiento)
+    return recorrer(folder, exts=exts)[0]
 
-def load_ris_from_dirs(dirs: List[Tuple[str, str]], exts: Iterable[str]=(".ris",".RIS",".txt",".TXT"), verbose: bool=True) -> List[Dict]:
+def load_ris_from_dirs(dirs: List[Tuple], exts: Iterable[str]=(".ris",".RIS",".txt",".TXT"), verbose: bool=True,
+                       cache: Optional[Dict[str, List[Dict]]]=None, ignorar: Iterable[str]=IGNORAR,
+                       manifiesto: Optional[str]=None) -> List[Dict]:
     """
-    dirs: lista de (ruta_carpeta, etiqueta_source_db)
+    dirs: lista de (ruta_carpeta, etiqueta_source_db) o (ruta_carpeta, etiqueta, opciones), donde
+          opciones acota el descubrimiento de esa carpeta: patrones (p. ej. PATRONES_EXPORT),
+          max_profundidad, exts, ignorar (ver utils.descubrimiento.descubrir).
+    cache: {ruta: registros} ya parseados (p. ej. mientras se descargaban); esos archivos no se releen.
+    manifiesto: JSON de mtimes de carpetas; las que no cambiaron desde la corrida anterior no se relistan.
+    Las carpetas se recorren en paralelo; el parseo sigue el orden de 'dirs'.
     """
+    cache = cache or {}
     out = []
-    for folder, source in dirs:
+    validas = []
+    for d in dirs:
+        folder = d[0]
         if not folder or not os.path.isdir(folder):
             if verbose:
                 print(f"⚠️ Carpeta no existe o no es válida: {folder}")
             continue
+        validas.append(d)
+
+    with span("discovery", carpetas=len(validas)):
+        candidatos = descubrir([(d[0], d[2] if len(d) > 2 else {}) for d in validas], exts=exts, ignorar=ignorar,
+                               manifiesto=manifiesto)
 
-        cand = list(_iter_candidate_files(folder, exts))
+    for d in validas:
+        folder, source = d[0], d[1]
+        cand = candidatos.get(folder, [])
         if verbose:
             print(f"📂 {source:<13} -> {folder}")
             print(f"   Archivos candidatos ({', '.join(exts)}): {len(cand)}")
@@ -157,10 +185,13 @@ def load_ris_from_dirs(dirs: List[Tuple[str, str]], exts: Iterable[str]=(".ris",
         count_before = len(out)
         for path in cand:
             try:
-                recs = parse_ris_file(path, source_db=source)
+                recs = cache.get(path)
+                if recs is None:
+                    recs = parse_ris_file(path, source_db=source)
                 out.extend(recs)
             except Exception as e:
                 print(f"⚠️ Error parseando {path}: {e}")
+                contar("biblio_errores_parseo_total")
 
         if verbose:
             print(f"   Registros RIS válidos añadidos: {len(out)-count_before}")
@@ -183,51 +214,90 @@ def _merge_lists(a: List[str], b: List[str]) -> List[str]:
             seen.add(key.lower()); merged.append(key)
     return merged
 
-def merge_records(records: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
-    by_key, dups = {}, []
+def _year_num(x):
+    try: return int((x.get("year") or "0")[:4])
+    except: return 0
+
+def _merge_two(dst: Dict, src: Dict):
+    for k in ["title","journal","year","date","abstract","doi","url","issn","volume","issue","page_start","page_end"]:
+        dst[k] = _prefer(dst.get(k, ""), src.get(k, ""))
+    dst["authors"]     = _merge_lists(dst.get("authors", []), src.get("authors", []))
+    dst["keywords"]    = _merge_lists(dst.get("keywords", []), src.get("keywords", []))
+    dst["sources"]     = _merge_lists(dst.get("sources", []), src.get("sources", []))
+    dst["source_files"]= _merge_lists(dst.get("source_files", []), src.get("source_files", []))
+    dst["queries"]     = _merge_lists(dst.get("queries", []), src.get("queries", []))
+    dst["doi_norm"]    = _norm_doi(dst.get("doi", "") or dst.get("doi_norm",""))
+    dst["title_canon"] = _canon_title(dst.get("title","")) or dst.get("title_canon","")
+
+class IndiceDedup:
+    """
+    Índice de deduplicación incremental (el de merge_records): clave DOI normalizado o, sin DOI,
+    título canónico. agregar() pliega registros nuevos sobre los ya vistos; resultado() devuelve
+    (unificados ordenados, duplicados) como merge_records.
+    copiar=True no modifica los registros de entrada (el que se conserva es una copia), para
+    poder rehacer el índice desde los mismos registros (modo vigilancia).
+    """
+    def __init__(self, copiar: bool=False):
+        self.copiar = copiar
+        self.by_key: Dict[Tuple, Dict] = {}
+        self.dups: List[Dict] = []
 
-    def key_for(r):
+    def __len__(self):
+        return len(self.by_key)
+
+    @staticmethod
+    def key_for(r: Dict) -> Tuple:
         if r.get("doi_norm"): return ("doi", r["doi_norm"])
         return ("title", r.get("title_canon", ""))
 
-    def merge_two(dst: Dict, src: Dict):
-        for k in ["title","journal","year","date","abstract","doi","url","issn","volume","issue","page_start","page_end"]:
-            dst[k] = _prefer(dst.get(k, ""), src.get(k, ""))
-        dst["authors"]     = _merge_lists(dst.get("authors", []), src.get("authors", []))
-        dst["keywords"]    = _merge_lists(dst.get("keywords", []), src.get("keywords", []))
-        dst["sources"]     = _merge_lists(dst.get("sources", []), src.get("sources", []))
-        dst["source_files"]= _merge_lists(dst.get("source_files", []), src.get("source_files", []))
-        dst["doi_norm"]    = _norm_doi(dst.get("doi", "") or dst.get("doi_norm",""))
-        dst["title_canon"] = _canon_title(dst.get("title","")) or dst.get("title_canon","")
-
-    for r in records:
-        k = key_for(r)
-        if not k[1]:
-            by_key[("row", id(r))] = r
-            continue
-        if k not in by_key:
-            by_key[k] = r
-        else:
-            kept = by_key[k]
-            dups.append({
-                "dedupe_key_type": k[0],
-                "dedupe_key_value": k[1],
-                "kept_title": kept.get("title",""),
-                "kept_doi": kept.get("doi",""),
-                "kept_sources": "; ".join(kept.get("sources", [])),
-                "dropped_title": r.get("title",""),
-                "dropped_doi": r.get("doi",""),
-                "dropped_sources": "; ".join(r.get("sources", [])),
-                "dropped_file": "; ".join(r.get("source_files", [])),
-            })
-            merge_two(kept, r)
-
-    result = list(by_key.values())
-    def _year_num(x):
-        try: return int((x.get("year") or "0")[:4])
-        except: return 0
-    result.sort(key=lambda x: (-_year_num(x), x.get("title","").lower()))
-    return result, dups
+    def agregar(self, records: Iterable[Dict]) -> int:
+        """Pliega 'records' en el índice; devuelve cuántos fueron nuevos (no duplicados)."""
+        nuevos = 0
+        by_key = self.by_key
+        n_dups = len(self.dups)
+        for r in records:
+            k = self.key_for(r)
+            if self.copiar:
+                r = {c: (list(v) if isinstance(v, list) else v) for c, v in r.items()}
+            if not k[1]:
+                by_key[("row", id(r))] = r
+                nuevos += 1
+                continue
+            if k not in by_key:
+                by_key[k] = r
+                nuevos += 1
+            else:
+                kept = by_key[k]
+                self.dups.append({
+                    "dedupe_key_type": k[0],
+                    "dedupe_key_value": k[1],
+                    "kept_title": kept.get("title",""),
+                    "kept_doi": kept.get("doi",""),
+                    "kept_sources": "; ".join(kept.get("sources", [])),
+                    "dropped_title": r.get("title",""),
+                    "dropped_doi": r.get("doi",""),
+                    "dropped_sources": "; ".join(r.get("sources", [])),
+                    "dropped_file": "; ".join(r.get("source_files", [])),
+                })
+                _merge_two(kept, r)
+        # una actualización de métrica por tipo de clave (no una por duplicado)
+        por_tipo = {}
+        for d in self.dups[n_dups:]:
+            por_tipo[d["dedupe_key_type"]] = por_tipo.get(d["dedupe_key_type"], 0) + 1
+        for tipo, n in por_tipo.items():
+            contar("biblio_duplicados_total", n, tipo_clave=tipo)
+        return nuevos
+
+    def resultado(self) -> Tuple[List[Dict], List[Dict]]:
+        result = list(self.by_key.values())
+        result.sort(key=lambda x: (-_year_num(x), x.get("title","").lower()))
+        return result, list(self.dups)
+
+@trazar("merge")
+def merge_records(records: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    indice = IndiceDedup()
+    indice.agregar(records)
+    return indice.resultado()
 
 def records_to_dataframe(records: List[Dict]) -> pd.DataFrame:
     rows = []
@@ -249,6 +319,7 @@ def records_to_dataframe(records: List[Dict]) -> pd.DataFrame:
             "page_end": r.get("page_end",""),
             "sources": "; ".join(r.get("sources", [])),
             "source_files": "; ".join(r.get("source_files", [])),
+            "queries": "; ".join(r.get("queries", [])),
         })
     return pd.DataFrame(rows)
 
@@ -257,18 +328,24 @@ def duplicates_to_dataframe(dups: List[Dict]) -> pd.DataFrame:
 
 def export_outputs(unified: List[Dict], duplicates: List[Dict], out_dir: str, base_name: str="unificado"):
     os.makedirs(out_dir, exist_ok=True)
-    df_u = records_to_dataframe(unified)
-    df_d = duplicates_to_dataframe(duplicates)
+    with span("export.dataframe", registros=len(unified)):
+        df_u = records_to_dataframe(unified)
+        df_d = duplicates_to_dataframe(duplicates)
 
     csv_u = os.path.join(out_dir, f"{base_name}.csv")
     csv_d = os.path.join(out_dir, f"{base_name}_duplicados_eliminados.csv")
     jsonl_u = os.path.join(out_dir, f"{base_name}.jsonl")
 
-    df_u.to_csv(csv_u, index=False, encoding="utf-8-sig")
-    df_d.to_csv(csv_d, index=False, encoding="utf-8-sig")
-    with open(jsonl_u, "w", encoding="utf-8") as f:
-        for r in unified:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    with span("export.csv", registros=len(unified)), cronometrar("biblio_export_segundos", salida="csv"):
+        df_u.to_csv(csv_u, index=False, encoding="utf-8-sig")
+    with span("export.csv_duplicados", registros=len(duplicates)), \
+            cronometrar("biblio_export_segundos", salida="csv_duplicados"):
+        df_d.to_csv(csv_d, index=False, encoding="utf-8-sig")
+    with span("export.jsonl", registros=len(unified)), cronometrar("biblio_export_segundos", salida="jsonl"):
+        with open(jsonl_u, "w", encoding="utf-8") as f:
+            for r in unified:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    fijar("biblio_registros_unificados", len(unified))
 
     print(f"✅ Unificado deduplicado -> {csv_u}")
     print(f"✅ Duplicados eliminados -> {csv_d}")
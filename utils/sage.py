@@ -1,37 +1,53 @@
 # utils/sage.py
 # Automatiza búsqueda y exportación por páginas en SAGE Journals (robusto contra modal/backdrop).
 
-import os, time
+import os
 from datetime import datetime
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qs, urlencode
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
-    TimeoutException, NoSuchElementException, ElementClickInterceptedException
+    TimeoutException, NoSuchElementException, ElementClickInterceptedException,
+    StaleElementReferenceException, WebDriverException
 )
 from .browser import esperar_descarga_por_extension, renombrar_si_es_necesario
+from .esperas import esperar, esperar_transicion, en_pagina
+from .trazas import trazar
+from .capturas import capturar, paso_capturado
+from .paralelo import navegadores_clonados, repartir_en_navegadores, mover_descarga
+from .reintentos import con_reintentos, pagina_fallida, informar_fallidas
+from .plan import entero_de_texto, plan_paginas, informar_plan, Progreso
+from .grabacion import grabar_pagina
+from .metricas import contar
+from .diario import paginas_de_archivo
+from .sondas import estado_pagina, cuando, resultados_sage, sin_modal, SELECTORES
 
 # ---------------- utilidades ----------------
 
 def _guardar(driver, carpeta, nombre_png):
-    try:
-        os.makedirs(carpeta, exist_ok=True)
-        driver.save_screenshot(os.path.join(carpeta, nombre_png))
-    except Exception:
-        pass
+    # según la política de utils.capturas (always / sampled / on_failure), escrita en segundo plano
+    capturar(driver, carpeta, nombre_png)
 
-def _cerrar_banners_sage(driver):
+def _cerrar_banners_sage(driver, timeout=3):
     """Intenta cerrar el banner de cookies de SAGE (OneTrust u otros)."""
     candidatos = [
         (By.CSS_SELECTOR, "#onetrust-accept-btn-handler"),
         (By.XPATH, '//button[contains(., "Accept") or contains(., "Aceptar")]'),
         (By.XPATH, '//button[contains(., "Agree") or contains(., "De acuerdo")]'),
     ]
+    # Una sola espera combinada: si no aparece ningún banner, no pagamos 3 s por selector
+    if not esperar(driver, lambda d: any(d.find_elements(how, what) for how, what in candidatos),
+                   timeout=timeout, paso="banners", ignorar_timeout=True):
+        return
     for how, what in candidatos:
         try:
-            WebDriverWait(driver, 3).until(EC.element_to_be_clickable((how, what))).click()
-            time.sleep(0.5)
+            boton = driver.find_element(how, what)
+            if not boton.is_displayed():
+                continue
+            boton.click()
+            esperar(driver, EC.invisibility_of_element_located((how, what)),
+                    timeout=3, paso="banners", ignorar_timeout=True)
             break
         except Exception:
             pass
@@ -47,11 +63,12 @@ def _ensure_no_modal(driver):
     Cierra/oculta el modal de export y elimina cualquier 'modal-backdrop' residual
     que pueda bloquear la interacción con la paginación.
     """
-    # intentar cerrar con el botón Close si está visible
-    try:
-        _cerrar_modal_export(driver, timeout=2)
-    except Exception:
-        pass
+    # intentar cerrar con el botón Close si está visible (sin esperar a que aparezca)
+    if _modal_visible(driver):
+        try:
+            _cerrar_modal_export(driver, timeout=2)
+        except Exception:
+            pass
 
     # limpieza agresiva con JS
     try:
@@ -67,18 +84,33 @@ def _ensure_no_modal(driver):
         """)
     except Exception:
         pass
-    time.sleep(0.2)
+    esperar(driver, cuando("SAGE", sin_modal), timeout=2, paso="modal_cerrado", ignorar_timeout=True)
+
+def _modal_visible(d):
+    return bool(estado_pagina(d, "SAGE").get("modal"))
 
 def _lista_resultados_cargada(d):
     """Heurística simple: hay resultados listados (sin depender de selectores frágiles)."""
+    return resultados_sage(estado_pagina(d, "SAGE"))
+
+def total_resultados_sage(driver, timeout=5):
+    """Total de resultados que informa la SRP (span.result__count), o None si no aparece."""
+    def _total(e):
+        # (n,) y no n: WebDriverWait toma un 0 como "todavía no" y esperaría el timeout entero
+        n = entero_de_texto(e.get("total"))
+        return (n,) if n is not None else False
+    n = esperar(driver, cuando("SAGE", _total), timeout=timeout, paso="total_resultados", ignorar_timeout=True)
+    return n[0] if n else None
+
+def _page_size_actual_sage(driver):
     try:
-        items = d.find_elements(By.CSS_SELECTOR, 'a[href*="/doi/"], a.issue-item__title, div.search__item')
-        return len(items) > 0
+        return int(parse_qs(urlparse(driver.current_url).query).get("pageSize", [PAGE_SIZE_UI_SAGE])[0])
     except Exception:
-        return False
+        return PAGE_SIZE_UI_SAGE
 
 # ---------------- búsqueda ----------------
 
+@trazar("sage.search")
 def buscar_en_sage(driver, query, carpeta_descargas):
     """
     Desde la home de SAGE:
@@ -129,7 +161,7 @@ def buscar_en_sage(driver, query, carpeta_descargas):
         lambda d: ("/action/doSearch" in d.current_url) or ("/search" in d.current_url)
     )
 
-    time.sleep(1)
+    esperar(driver, _lista_resultados_cargada, timeout=15, paso="resultados", ignorar_timeout=True)
     _guardar(driver, carpeta_descargas, "06_sage_resultados.png")
     print("✅ Búsqueda enviada en SAGE. URL resultados:", driver.current_url)
     return True
@@ -137,15 +169,9 @@ def buscar_en_sage(driver, query, carpeta_descargas):
 # ---------------- export modal helpers ----------------
 
 def _export_habilitado(d):
-    """Devuelve True cuando el enlace 'Export selected citations' está habilitado."""
-    try:
-        a = d.find_element(By.CSS_SELECTOR, 'a[data-id="srp-export-citations"]')
-        cls = a.get_attribute("class") or ""
-        aria = (a.get_attribute("aria-disabled") or "").lower()
-        disabled = a.get_attribute("disabled")
-        return ("disabled" not in cls) and (aria != "true") and (disabled is None)
-    except Exception:
-        return False
+    """Devuelve el enlace 'Export selected citations' cuando está habilitado (False si no)."""
+    e = estado_pagina(d, "SAGE")
+    return e.get("export_habilitado") and e.get("export")
 
 def _cerrar_modal_export(driver, timeout=10):
     """Cierra el modal #exportCitation con el botón 'Close'."""
@@ -183,95 +209,80 @@ def _ir_a_siguiente_pagina(driver):
     """
     _ensure_no_modal(driver)
 
-    next_anchor = None
-    candidatos = [
-        (By.CSS_SELECTOR, 'a.next.hvr-forward.pagination__link'),
-        (By.CSS_SELECTOR, 'a.pagination__link.next'),
-        (By.CSS_SELECTOR, 'li.pagination-link.next-link > a.anchor'),
-        (By.XPATH, '//a[contains(@class,"pagination__link") and contains(@class,"next")]'),
-        (By.XPATH, '//a[contains(@data-aa-name,"next") or .//span[contains(., "next")]]'),
-    ]
-    for how, what in candidatos:
-        try:
-            next_anchor = driver.find_element(how, what)
-            break
-        except NoSuchElementException:
-            continue
-
+    # ancla, estado y href en una sola sonda (candidatos en utils.sondas.SELECTORES)
+    e = estado_pagina(driver, "SAGE")
+    next_anchor = e.get("siguiente")
     if not next_anchor:
         return False
 
     # ¿deshabilitado?
-    try:
-        aria = (next_anchor.get_attribute("aria-disabled") or "").lower()
-        cls = (next_anchor.get_attribute("class") or "")
-        if 'disabled' in cls or aria == 'true':
-            return False
-    except Exception:
-        pass
+    if not e.get("siguiente_habilitado"):
+        return False
 
-    href_before = driver.current_url
-    href = next_anchor.get_attribute("href")
+    href_before = e.get("url") or driver.current_url
+    href = e.get("siguiente_href")
 
-    _scroll_center(driver, next_anchor)
-    try:
-        WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, '.')))
-        next_anchor.click()
-    except Exception:
+    def _clic():
+        _scroll_center(driver, next_anchor)
         try:
-            driver.execute_script("arguments[0].click();", next_anchor)
+            WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, '.')))
+            next_anchor.click()
         except Exception:
-            if href:
+            try:
+                driver.execute_script("arguments[0].click();", next_anchor)
+            except Exception:
+                if not href:
+                    raise
                 driver.get(urljoin(href_before, href))
-            else:
-                return False
 
-    # esperar cambio
+    # respaldo por sondeo: URL distinta o el ancla 'next' anterior ya no está en el DOM
+    def _cambio(d):
+        if d.current_url != href_before:
+            return True
+        try:
+            next_anchor.is_enabled()
+            return False
+        except StaleElementReferenceException:
+            return True
+
+    # esperar cambio: el MutationObserver avisa en cuanto la lista se vuelve a pintar
     try:
-        WebDriverWait(driver, 15).until(
-            lambda d: (d.current_url != href_before) or _lista_resultados_cargada(d)
-        )
-        time.sleep(0.6)
+        if not esperar_transicion(driver, _clic, SELECTORES["SAGE"]["items"], timeout=15,
+                                  paso="siguiente_pagina", condicion=_cambio):
+            return False
+        esperar(driver, _lista_resultados_cargada, timeout=15, paso="resultados")
         _ensure_no_modal(driver)
         return True
-    except TimeoutException:
+    except (TimeoutException, WebDriverException):
+        # incluye el clic imposible sin href al que navegar
         return False
 
 # ---------------- exportar página actual ----------------
 
-def exportar_ris_pagina_actual(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", etiqueta="p1"):
-    """
-    Selecciona todos los resultados visibles, abre Export, descarga RIS y CIERRA el modal.
-      - Select all: #action-bar-select-all
-      - Export: a[data-id="srp-export-citations"]
-      - Modal: #exportCitation
-      - Descargar: a.download__btn
-    """
-    _cerrar_banners_sage(driver)
-    _ensure_no_modal(driver)  # por si quedó algo de una operación previa
-
-    # Select all
-    chk_all = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, '#action-bar-select-all'))
-    )
-    _scroll_center(driver, chk_all)
-    if not chk_all.is_selected():
+def _seleccionar_pagina_actual(driver, marcar=True):
+    """Marca (o desmarca) 'select all' de la página visible: #action-bar-select-all."""
+    e = esperar(driver, cuando("SAGE", lambda e: e if e.get("select_all") else False),
+                timeout=10, paso="select_all")
+    chk_all = e["select_all"]
+    if bool(e.get("seleccionado")) != marcar:
+        _scroll_center(driver, chk_all)
         chk_all.click()
-        time.sleep(0.3)
+        esperar(driver, cuando("SAGE", lambda e: bool(e.get("seleccionado")) == marcar),
+                timeout=3, paso="select_all", ignorar_timeout=True)
 
+def _exportar_seleccion(driver, carpeta_descargas, consulta_slug, etiqueta):
+    """Abre Export con lo que esté seleccionado, descarga el RIS y cierra el modal."""
+    grabar_pagina(driver)   # modo grabación: el RIS que baje queda asociado a esta página
     # Habilitar export
-    WebDriverWait(driver, 10).until(_export_habilitado)
-    export_link = driver.find_element(By.CSS_SELECTOR, 'a[data-id="srp-export-citations"]')
+    export_link = esperar(driver, _export_habilitado, timeout=10, paso="export_habilitado")
     try:
         export_link.click()
     except ElementClickInterceptedException:
         driver.execute_script("arguments[0].click();", export_link)
 
     # Modal visible
-    modal = WebDriverWait(driver, 10).until(
-        EC.visibility_of_element_located((By.CSS_SELECTOR, '#exportCitation'))
-    )
-    time.sleep(0.2)
+    modal = esperar(driver, EC.visibility_of_element_located((By.CSS_SELECTOR, '#exportCitation')),
+                    timeout=10, paso="modal_export")
 
     # (si hubiera un select de formato, forzamos RIS)
     try:
@@ -279,15 +290,14 @@ def exportar_ris_pagina_actual(driver, carpeta_descargas, consulta_slug="generat
         for opt in sel.find_elements(By.TAG_NAME, 'option'):
             if "RIS" in (opt.text or ""):
                 opt.click()
-                time.sleep(0.2)
+                esperar(driver, lambda d: opt.is_selected(), timeout=2, paso="formato_ris", ignorar_timeout=True)
                 break
     except Exception:
         pass
 
     # Descargar
-    btn_download = WebDriverWait(modal, 10).until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, 'a.download__btn'))
-    )
+    btn_download = esperar(modal, EC.element_to_be_clickable((By.CSS_SELECTOR, 'a.download__btn')),
+                           timeout=10, paso="boton_descarga")
     try:
         btn_download.click()
     except ElementClickInterceptedException:
@@ -299,35 +309,322 @@ def exportar_ris_pagina_actual(driver, carpeta_descargas, consulta_slug="generat
     nombre_final = f"sage_{consulta_slug}_{etiqueta}_{fecha}.ris"
     final_path = renombrar_si_es_necesario(ruta, nombre_final)
     print(f"✅ Página {etiqueta}: descargado -> {final_path}")
+    if final_path:
+        contar("biblio_paginas_exportadas_total", len(paginas_de_archivo(final_path)) or 1, fuente="SAGE", modo="selenium")
 
     # Cerrar/limpiar modal y backdrop
     _ensure_no_modal(driver)
     return final_path
 
+@trazar("sage.export_page")
+def exportar_ris_pagina_actual(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", etiqueta="p1"):
+    """
+    Selecciona todos los resultados visibles, abre Export, descarga RIS y CIERRA el modal.
+      - Select all: #action-bar-select-all
+      - Export: a[data-id="srp-export-citations"]
+      - Modal: #exportCitation
+      - Descargar: a.download__btn
+    """
+    _cerrar_banners_sage(driver, timeout=0.5)  # tras la primera página ya no suele haber banner
+    _ensure_no_modal(driver)  # por si quedó algo de una operación previa
+    _seleccionar_pagina_actual(driver)
+    return _exportar_seleccion(driver, carpeta_descargas, consulta_slug, etiqueta)
+
 # ---------------- loop de paginación ----------------
 
-def exportar_ris_paginando(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", max_paginas=5):
+def _recargar_resultados_sage(driver):
+    """Antes de reintentar: limpia modales y recarga la página de resultados (se vuelve a seleccionar todo)."""
+    _ensure_no_modal(driver)
+    driver.refresh()
+    esperar(driver, _lista_resultados_cargada, timeout=20, paso="resultados")
+    _cerrar_banners_sage(driver, timeout=0.5)
+
+def exportar_ris_paginando(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", max_paginas=5,
+                           al_descargar=None, reintentos=2, backoff_base=2.0, fallidas=None, detener=None):
     """
     Exporta RIS de varias páginas: página actual + 'Siguiente' hasta max_paginas o fin.
     Retorna lista de rutas de archivos descargados.
+    al_descargar(ruta): callback opcional por cada archivo (p. ej. para parsear mientras se sigue paginando).
+    Una página que falla se reintenta hasta 'reintentos' veces (backoff exponencial; recarga y
+    re-selección antes de cada intento). Si aun así falla, se anota en 'fallidas' y se sigue con la próxima.
+    Con el total de resultados de la SRP se recorta max_paginas a las páginas que existen (sin buscar
+    un 'Siguiente' que no está) y se informa avance/ETA.
+    detener(ruta) -> True corta la paginación tras esa página (modo incremental: página ya conocida).
     """
+    total, por_pagina = total_resultados_sage(driver), _page_size_actual_sage(driver)
+    plan = plan_paginas(total, por_pagina, max_paginas)
+    informar_plan("SAGE", consulta_slug, total, por_pagina, plan, max_paginas)
+    max_paginas = len(plan)
+    progreso = Progreso(max_paginas, f"SAGE {consulta_slug}")
+
     rutas = []
+    huecos = []
     for i in range(1, max_paginas + 1):
         etiqueta = f"p{i}"
         print(f"--- Procesando {etiqueta} ---")
-        try:
-            ruta = exportar_ris_pagina_actual(driver, carpeta_descargas, consulta_slug, etiqueta)
-            rutas.append(ruta)
-        except Exception as e:
-            print(f"⚠️  Falló exportación en {etiqueta}: {e}")
-            break
+        with en_pagina(f"sage:{etiqueta}"):
+            def intento():
+                with paso_capturado(driver, carpeta_descargas, f"sage_{etiqueta}"):
+                    ruta = exportar_ris_pagina_actual(driver, carpeta_descargas, consulta_slug, etiqueta)
+                if not ruta:
+                    raise RuntimeError(f"no llegó el .ris de {etiqueta}")
+                return ruta
+
+            try:
+                ruta = con_reintentos(intento, reintentos, backoff_base, preparar=lambda: _recargar_resultados_sage(driver),
+                                      etiqueta=f"SAGE {etiqueta}")
+                rutas.append(ruta)
+                if al_descargar:
+                    al_descargar(ruta)
+            except Exception as e:
+                print(f"⚠️  Falló exportación en {etiqueta} tras {reintentos + 1} intento(s): {e}")
+                huecos.append(pagina_fallida("SAGE", consulta_slug, i, e))
+                ruta = None
+            progreso.avanzar()
+
+            if detener and ruta and detener(ruta):
+                print(f"⏹️  {etiqueta}: todos los registros ya estaban en el corpus; fin de la paginación.")
+                break
 
-        # Intentar ir a siguiente
-        pudo = _ir_a_siguiente_pagina(driver)
+            if i == max_paginas:
+                break
+            # Intentar ir a siguiente
+            pudo = _ir_a_siguiente_pagina(driver)
         if not pudo:
             print("ℹ️  No hay más páginas (o no se encontró 'Siguiente').")
             break
-        time.sleep(0.6)
 
     print(f"✅ Descargas completadas: {len(rutas)} archivo(s).")
+    informar_fallidas(huecos)
+    if fallidas is not None:
+        fallidas.extend(huecos)
+    return rutas
+
+# ---------------- paginación por URL (pageSize grande + startPage) ----------------
+
+# Tamaños que acepta /action/doSearch en SAGE; por defecto la UI usa 10.
+PAGE_SIZES_SAGE = (10, 20, 50, 100)
+PAGE_SIZE_UI_SAGE = 10
+# sortBy de /action/doSearch para "más recientes primero" (fecha de publicación)
+ORDEN_FECHA_SAGE = "Ppub"
+PAGE_SIZE_MAX_SAGE = max(PAGE_SIZES_SAGE)
+
+def _url_busqueda_sage(url_resultados, query=None, page_size=PAGE_SIZE_MAX_SAGE, start_page=0, orden=None,
+                       desde=None, hasta=None):
+    """
+    URL de resultados con pageSize/startPage explícitos (startPage es 0-based en SAGE).
+    Conserva los demás parámetros de 'url_resultados' (filtros, orden...); si no es una
+    URL de /action/doSearch, arma una con AllField=query sobre el mismo host.
+    desde/hasta: filtro por año de publicación (AfterYear/BeforeYear, inclusivos).
+    """
+    partes = urlparse(url_resultados)
+    q = parse_qs(partes.query, keep_blank_values=True)
+    if "/action/doSearch" not in partes.path:
+        partes = partes._replace(path="/action/doSearch")
+        q = {}
+    if query is not None and not q.get("AllField"):
+        q["AllField"] = [f"\"{query}\"" if not (query.startswith('"') and query.endswith('"')) else query]
+    q["pageSize"] = [str(page_size)]
+    q["startPage"] = [str(start_page)]
+    if orden:
+        q["sortBy"] = [orden]
+    if desde is not None:
+        q["AfterYear"] = [str(desde)]
+    if hasta is not None:
+        q["BeforeYear"] = [str(hasta)]
+    return urlunparse(partes._replace(query=urlencode(q, doseq=True)))
+
+def ordenar_por_fecha_sage(driver, page_size=None, timeout=20):
+    """Recarga la búsqueda actual ordenada por fecha (más recientes primero), en la página 1."""
+    driver.get(_url_busqueda_sage(driver.current_url, page_size=page_size or _page_size_actual_sage(driver),
+                                  start_page=0, orden=ORDEN_FECHA_SAGE))
+    esperar(driver, _lista_resultados_cargada, timeout=timeout, paso="resultados")
+
+def abrir_busqueda_sage(driver, url_base, query, page_size=PAGE_SIZE_UI_SAGE, desde=None, hasta=None, timeout=20):
+    """Abre la búsqueda directo por URL (sin el buscador de la home), con filtro de años opcional."""
+    driver.get(_url_busqueda_sage(url_base, query=query, page_size=page_size, start_page=0, desde=desde, hasta=hasta))
+    esperar(driver, cuando("SAGE", lambda e: resultados_sage(e) or e.get("total") is not None),
+            timeout=timeout, paso="resultados")
+
+def contar_resultados_sage(driver, url_base, query, desde=None, hasta=None):
+    """Total de resultados de la consulta (con filtro de años opcional); navega el driver."""
+    abrir_busqueda_sage(driver, url_base, query, page_size=PAGE_SIZE_UI_SAGE, desde=desde, hasta=hasta)
+    return total_resultados_sage(driver)
+
+def ir_a_pagina_sage(driver, url_resultados, pagina, page_size=PAGE_SIZE_MAX_SAGE, timeout=20):
+    """Navega directo a la página N (1-based) sin buscar/clicar 'Siguiente'."""
+    driver.get(_url_busqueda_sage(url_resultados, page_size=page_size, start_page=pagina - 1))
+    esperar(driver, _lista_resultados_cargada, timeout=timeout, paso="resultados")
+
+def exportar_ris_por_url_sage(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", paginas=5,
+                              page_size=PAGE_SIZE_MAX_SAGE, navegadores=1, reintentos=1, al_descargar=None, query=None,
+                              fallidas=None):
+    """
+    Exporta RIS navegando por URL (pageSize grande + startPage) en vez de clicar 'Siguiente'.
+    Con page_size=100 son ~10x menos exportaciones por cada 1.000 registros que con la UI (10).
+    navegadores>1 reparte las páginas entre varios Chrome que comparten la sesión.
+    'paginas' puede ser un entero (1..N) o una lista de páginas.
+    """
+    if page_size not in PAGE_SIZES_SAGE:
+        raise ValueError(f"pageSize no soportado por SAGE: {page_size} (usa {PAGE_SIZES_SAGE})")
+    url_resultados = driver.current_url
+    total = total_resultados_sage(driver)
+    lista = plan_paginas(total, page_size, paginas)
+    informar_plan("SAGE", consulta_slug, total, page_size, lista, paginas)
+    progreso = Progreso(len(lista), f"SAGE {consulta_slug}")
+
+    def tarea(drv, carpeta_w, pagina):
+        etiqueta = f"p{pagina}"
+        with en_pagina(f"sage:{etiqueta}"), paso_capturado(drv, carpeta_descargas, f"sage_{etiqueta}"):
+            drv.get(_url_busqueda_sage(url_resultados, query=query, page_size=page_size, start_page=pagina - 1))
+            esperar(drv, _lista_resultados_cargada, timeout=20, paso="resultados")
+            ruta = exportar_ris_pagina_actual(drv, carpeta_w, consulta_slug, etiqueta)
+        if not ruta:
+            raise RuntimeError(f"no llegó el .ris de {etiqueta}")
+        ruta = mover_descarga(ruta, carpeta_descargas)
+        if al_descargar:
+            al_descargar(ruta)
+        progreso.avanzar()
+        return ruta
+
+    with navegadores_clonados(driver, navegadores, carpeta_descargas, url_resultados) as navs:
+        print(f"→ SAGE: {len(lista)} página(s) por URL (pageSize={page_size}) en {len(navs)} navegador(es)...")
+        resultados, fallidos = repartir_en_navegadores(navs, lista, tarea, reintentos=reintentos)
+
+    for pagina, err in sorted(fallidos.items()):
+        print(f"⚠️  SAGE p{pagina}: no se pudo exportar ({err})")
+        if fallidas is not None:
+            fallidas.append(pagina_fallida("SAGE", consulta_slug, pagina, err))
+    rutas = [resultados[p] for p in lista if p in resultados]
+    print(f"✅ Descargas completadas: {len(rutas)} archivo(s).")
+    return rutas
+
+# ---------------- selección acumulada entre páginas ("carrito") ----------------
+# SAGE recuerda lo seleccionado al cambiar de página: se marca 'select all' en N páginas
+# seguidas y se exporta UNA vez (un modal y una descarga por lote en vez de por página).
+# Si la plataforma no conservara la selección, el RIS del lote traería solo la última
+# página: se detecta por el número de registros y se sigue página a página.
+
+def _lotes_contiguos(lista, tam):
+    """[1,2,3,5,6] con tam=2 -> [[1,2],[3],[5,6]]: tramos de páginas seguidas de hasta 'tam'."""
+    lotes = []
+    for p in lista:
+        if lotes and len(lotes[-1]) < tam and lotes[-1][-1] == p - 1:
+            lotes[-1].append(p)
+        else:
+            lotes.append([p])
+    return lotes
+
+def _seleccionados_sage(driver):
+    """Registros seleccionados en total (contador de la barra de acciones); sin contador, 1/0 según la página visible."""
+    e = estado_pagina(driver, "SAGE")
+    n = entero_de_texto(e.get("seleccionados"))
+    if n is None:
+        return 1 if e.get("seleccionado") else 0
+    return n
+
+def _vaciar_seleccion(driver, url_resultados, grupo, page_size):
+    """
+    Deja la selección acumulada en 0: con el control 'limpiar selección' de la plataforma si está,
+    si no volviendo a cada página del lote y desmarcando su 'select all'. Devuelve lo que quedó seleccionado.
+    """
+    limpiar = estado_pagina(driver, "SAGE").get("limpiar_seleccion")
+    if limpiar:
+        try:
+            _scroll_center(driver, limpiar)
+            limpiar.click()
+        except WebDriverException:
+            driver.execute_script("arguments[0].click();", limpiar)
+        esperar(driver, lambda d: _seleccionados_sage(d) == 0, timeout=5, paso="limpiar_seleccion",
+                ignorar_timeout=True)
+    else:
+        for pagina in reversed(grupo):
+            ir_a_pagina_sage(driver, url_resultados, pagina, page_size=page_size)
+            _seleccionar_pagina_actual(driver, marcar=False)
+    return _seleccionados_sage(driver)
+
+def _registros_ris(ruta):
+    """Número de registros de un RIS (líneas 'ER  -')."""
+    with open(ruta, "r", encoding="utf-8", errors="ignore") as f:
+        return sum(1 for ln in f if ln.startswith("ER  -"))
+
+def exportar_ris_acumulando(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", paginas=5,
+                            page_size=None, paginas_por_lote=5, al_descargar=None, reintentos=2, backoff_base=2.0,
+                            fallidas=None):
+    """
+    Exporta RIS acumulando la selección de 'paginas_por_lote' páginas seguidas y descargando una vez
+    por lote (archivo ..._p<a>-<b>_...). Las páginas se recorren por URL (startPage) sobre la búsqueda
+    actual. 'paginas' puede ser un entero (1..N) o una lista de páginas.
+    Un lote que falla se reintenta (recarga y selección limpia); si sigue fallando, sus páginas se
+    anotan en 'fallidas'. Tras cada export se vacía la selección entera (no solo la página visible)
+    y antes de cada lote se comprueba que esté en 0: si no, el lote repetiría las páginas del anterior.
+    """
+    page_size = page_size or _page_size_actual_sage(driver)
+    url_resultados = driver.current_url
+    total = total_resultados_sage(driver)
+    lista = plan_paginas(total, page_size, paginas)
+    informar_plan("SAGE", consulta_slug, total, page_size, lista, paginas)
+    progreso = Progreso(len(lista), f"SAGE {consulta_slug}")
+    lote = max(1, paginas_por_lote)
+    print(f"→ SAGE: {len(lista)} página(s) acumulando la selección de a {lote} por export...")
+
+    rutas = []
+    huecos = []
+    pendientes = list(lista)
+    anterior = []       # páginas del último lote exportado (para vaciar su selección)
+    while pendientes:
+        grupo = _lotes_contiguos(pendientes, lote)[0]
+        etiqueta = f"p{grupo[0]}" if len(grupo) == 1 else f"p{grupo[0]}-{grupo[-1]}"
+        with en_pagina(f"sage:{etiqueta}"):
+            def intento():
+                with paso_capturado(driver, carpeta_descargas, f"sage_{etiqueta}"):
+                    _ensure_no_modal(driver)
+                    if _seleccionados_sage(driver) and _vaciar_seleccion(driver, url_resultados, anterior, page_size):
+                        raise RuntimeError(f"la selección no quedó vacía antes de {etiqueta}")
+                    for pagina in grupo:
+                        ir_a_pagina_sage(driver, url_resultados, pagina, page_size=page_size)
+                        _cerrar_banners_sage(driver, timeout=0.5)
+                        _seleccionar_pagina_actual(driver)
+                    ruta = _exportar_seleccion(driver, carpeta_descargas, consulta_slug, etiqueta)
+                    # vaciar toda la selección del lote (SAGE la conserva entre páginas)
+                    _vaciar_seleccion(driver, url_resultados, grupo, page_size)
+                if not ruta:
+                    raise RuntimeError(f"no llegó el .ris de {etiqueta}")
+                return ruta
+
+            try:
+                ruta = con_reintentos(intento, reintentos, backoff_base, preparar=lambda: _recargar_resultados_sage(driver),
+                                      etiqueta=f"SAGE {etiqueta}")
+            except Exception as e:
+                print(f"⚠️  Falló exportación en {etiqueta} tras {reintentos + 1} intento(s): {e}")
+                huecos += [pagina_fallida("SAGE", consulta_slug, p, e) for p in grupo]
+                anterior = grupo        # pudo quedar seleccionado a medias
+                pendientes = [p for p in pendientes if p not in grupo]
+                progreso.avanzar(len(grupo))
+                continue
+
+            hechas = grupo
+            n = _registros_ris(ruta)
+            if len(grupo) > 1 and n <= page_size:
+                # la selección no sobrevivió al cambio de página: el archivo es solo la última
+                print(f"⚠️  SAGE no conservó la selección entre páginas ({n} registro(s) en {etiqueta}); "
+                      f"se sigue exportando página a página.")
+                ruta = renombrar_si_es_necesario(ruta, os.path.basename(ruta).replace(f"_{etiqueta}_", f"_p{grupo[-1]}_"))
+                hechas = [grupo[-1]]
+                lote = 1
+            elif n > len(grupo) * page_size:
+                print(f"⚠️  {etiqueta}: {n} registros (> {len(grupo) * page_size}); la selección traía registros de "
+                      f"fuera del lote.")
+
+            anterior = grupo
+            rutas.append(ruta)
+            if al_descargar:
+                al_descargar(ruta)
+            pendientes = [p for p in pendientes if p not in hechas]
+            progreso.avanzar(len(hechas))
+
+    print(f"✅ Descargas completadas: {len(rutas)} archivo(s) para {len(lista)} página(s).")
+    informar_fallidas(huecos)
+    if fallidas is not None:
+        fallidas.extend(huecos)
     return rutas
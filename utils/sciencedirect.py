@@ -1,13 +1,20 @@
-import os, time
 from datetime import datetime
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urljoin, urlparse, parse_qs, urlencode, urlunparse
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
     TimeoutException, NoSuchElementException, ElementClickInterceptedException
 )
 from .browser import esperar_descarga_por_extension, renombrar_si_es_necesario
+from .esperas import esperar, esperar_transicion, en_pagina
+from .trazas import trazar
+from .capturas import capturar, paso_capturado
+from .paralelo import navegadores_clonados, repartir_en_navegadores, mover_descarga
+from .reintentos import con_reintentos, pagina_fallida, informar_fallidas
+from .plan import entero_de_texto, plan_paginas, informar_plan, Progreso
+from .grabacion import grabar_pagina
+from .metricas import contar
+from .sondas import estado_pagina, cuando, resultados_sd, SELECTORES
 
 # ---------------- utilidades pequeñas ----------------
 
@@ -18,7 +25,7 @@ def _scroll_into_view(driver, elem):
         pass
 
 def _click(driver, how, what, timeout=12, use_js_fallback=False):
-    el = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((how, what)))
+    el = esperar(driver, EC.element_to_be_clickable((how, what)), timeout=timeout, paso="clic")
     _scroll_into_view(driver, el)
     try:
         el.click()
@@ -30,18 +37,15 @@ def _click(driver, how, what, timeout=12, use_js_fallback=False):
     return el
 
 def _type(driver, how, what, text, timeout=12):
-    el = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((how, what)))
+    el = esperar(driver, EC.presence_of_element_located((how, what)), timeout=timeout, paso="escribir")
     _scroll_into_view(driver, el)
     el.clear()
     el.send_keys(text)
     return el
 
 def _guardar(driver, carpeta, nombre):
-    try:
-        os.makedirs(carpeta, exist_ok=True)
-        driver.save_screenshot(os.path.join(carpeta, nombre))
-    except Exception:
-        pass
+    # según la política de utils.capturas (always / sampled / on_failure), escrita en segundo plano
+    capturar(driver, carpeta, nombre)
 
 # ---------------- helpers específicos SD ----------------
 
@@ -51,15 +55,7 @@ def _esperar_resultados_listos(driver, timeout=20):
       - existe select-all (#select-all-results) o el botón Export
       - y hay resultados visibles
     """
-    def listo(d):
-        try:
-            hay_select_all = bool(d.find_elements(By.CSS_SELECTOR, '#select-all-results'))
-            hay_export = bool(d.find_elements(By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-expand"]'))
-            hay_items = bool(d.find_elements(By.CSS_SELECTOR, 'a.result-list-title-link, ol.search-results li, div.result-item-content'))
-            return (hay_select_all or hay_export) and hay_items
-        except Exception:
-            return False
-    WebDriverWait(driver, timeout).until(listo)
+    esperar(driver, cuando("ScienceDirect", resultados_sd), timeout=timeout, paso="resultados")
 
 def _marcar_select_all_robusto(driver):
     """
@@ -70,40 +66,18 @@ def _marcar_select_all_robusto(driver):
     """
     try:
         driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(0.2)
     except Exception:
         pass
 
-    inp = None
-    for sel in ['#select-all-results', 'input.checkbox-input#select-all-results', 'input.checkbox-input[aria-label*="Select all"]']:
-        try:
-            inp = driver.find_element(By.CSS_SELECTOR, sel)
-            break
-        except NoSuchElementException:
-            continue
-
-    lbl = None
-    for sel in ['label[for="select-all-results"]', 'label.checkbox-label[for="select-all-results"]']:
-        try:
-            lbl = driver.find_element(By.CSS_SELECTOR, sel)
-            break
-        except NoSuchElementException:
-            continue
+    # input y label salen de la misma sonda que luego dice si quedó marcado
+    e = estado_pagina(driver, "ScienceDirect")
+    inp, lbl = e.get("select_all"), e.get("select_all_label")
 
     if not inp and not lbl:
         raise TimeoutException("No encontré el checkbox ni su label para 'Select all articles'.")
 
     def _checked():
-        try:
-            if inp and getattr(inp, "is_selected", None):
-                if inp.is_selected():
-                    return True
-            if inp:
-                aria = (inp.get_attribute("aria-checked") or "").lower()
-                return aria == "true"
-            return False
-        except Exception:
-            return False
+        return bool(estado_pagina(driver, "ScienceDirect").get("seleccionado"))
 
     if not _checked() and inp:
         try:
@@ -112,7 +86,7 @@ def _marcar_select_all_robusto(driver):
                 inp.click()
             except ElementClickInterceptedException:
                 driver.execute_script("arguments[0].click();", inp)
-            time.sleep(0.25)
+            esperar(driver, lambda d: _checked(), timeout=2, paso="select_all", ignorar_timeout=True)
         except Exception:
             pass
 
@@ -123,7 +97,7 @@ def _marcar_select_all_robusto(driver):
                 lbl.click()
             except ElementClickInterceptedException:
                 driver.execute_script("arguments[0].click();", lbl)
-            time.sleep(0.25)
+            esperar(driver, lambda d: _checked(), timeout=2, paso="select_all", ignorar_timeout=True)
         except Exception:
             pass
 
@@ -136,7 +110,7 @@ def _marcar_select_all_robusto(driver):
                 el.setAttribute('aria-checked','true');
                 el.dispatchEvent(new Event('change', {bubbles:true}));
             """, inp)
-            time.sleep(0.25)
+            esperar(driver, lambda d: _checked(), timeout=2, paso="select_all", ignorar_timeout=True)
         except Exception:
             pass
 
@@ -144,31 +118,16 @@ def _marcar_select_all_robusto(driver):
         raise TimeoutException("No pude marcar 'Select all articles' (no quedó seleccionado).")
 
 def _esperar_export_habilitado(driver, timeout=10):
-    def habilitado(d):
-        try:
-            b = d.find_element(By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-expand"]')
-            aria = (b.get_attribute("aria-disabled") or "").lower()
-            disabled = b.get_attribute("disabled")
-            return (aria == "false") or (aria == "") and (disabled is None)
-        except Exception:
-            return False
-    WebDriverWait(driver, timeout).until(habilitado)
+    esperar(driver, cuando("ScienceDirect", lambda e: e.get("export_habilitado")),
+            timeout=timeout, paso="export_habilitado")
 
 def _get_per_page_actual(driver):
-    try:
-        li_activo = driver.find_element(By.CSS_SELECTOR, 'ol.ResultsPerPage li[aria-current="true"]')
-        txt = li_activo.text or li_activo.get_attribute("textContent") or ""
-        txt = txt.strip()
-        return int(''.join(ch for ch in txt if ch.isdigit()))
-    except Exception:
-        return None
+    return entero_de_texto(estado_pagina(driver, "ScienceDirect").get("por_pagina"))
 
 def _set_results_per_page(driver, per_page=100, timeout=20):
-    rp = WebDriverWait(driver, timeout).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "ol.ResultsPerPage"))
-    )
+    rp = esperar(driver, EC.presence_of_element_located((By.CSS_SELECTOR, "ol.ResultsPerPage")),
+                 timeout=timeout, paso="per_page")
     _scroll_into_view(driver, rp)
-    time.sleep(0.2)
 
     actual = _get_per_page_actual(driver)
     if actual == per_page:
@@ -184,26 +143,32 @@ def _set_results_per_page(driver, per_page=100, timeout=20):
         raise TimeoutException(f"No encontré el enlace para per-page = {per_page}.")
 
     href_before = driver.current_url
-    try:
-        _scroll_into_view(driver, a)
-        a.click()
-    except ElementClickInterceptedException:
-        driver.execute_script("arguments[0].click();", a)
 
-    def _recargo_ok(d):
-        if d.current_url != href_before:
-            return True
+    def _clic():
         try:
-            val = _get_per_page_actual(d)
-            return val == per_page
-        except Exception:
-            return False
+            _scroll_into_view(driver, a)
+            a.click()
+        except ElementClickInterceptedException:
+            driver.execute_script("arguments[0].click();", a)
 
-    WebDriverWait(driver, timeout).until(_recargo_ok)
+    def _recargo_ok(e):
+        return e.get("url", href_before) != href_before or entero_de_texto(e.get("por_pagina")) == per_page
+
+    if not esperar_transicion(driver, _clic, SELECTORES["ScienceDirect"]["items"], timeout=timeout, paso="per_page",
+                              condicion=cuando("ScienceDirect", _recargo_ok)):
+        raise TimeoutException(f"La SRP no se recargó con per-page = {per_page}.")
     _esperar_resultados_listos(driver, timeout=timeout)
-    time.sleep(0.3)
     return True
 
+def total_resultados_sd(driver, timeout=5):
+    """Total de resultados de la SRP ('12,345 results'), o None si no aparece."""
+    def _total(e):
+        # (n,) y no n: WebDriverWait toma un 0 como "todavía no" y esperaría el timeout entero
+        n = entero_de_texto(e.get("total"))
+        return (n,) if n is not None else False
+    n = esperar(driver, cuando("ScienceDirect", _total), timeout=timeout, paso="total_resultados", ignorar_timeout=True)
+    return n[0] if n else None
+
 def _get_offset_show_from_url(url):
     try:
         q = parse_qs(urlparse(url).query)
@@ -213,6 +178,17 @@ def _get_offset_show_from_url(url):
     except Exception:
         return 0, 10
 
+# sortBy de la SRP para "más recientes primero"
+ORDEN_FECHA_SD = "date"
+
+def _url_con_offset(url, offset, show):
+    """Misma búsqueda (qs, filtros...) apuntando directo a offset/show."""
+    partes = urlparse(url)
+    q = parse_qs(partes.query, keep_blank_values=True)
+    q["offset"] = [str(offset)]
+    q["show"] = [str(show)]
+    return urlunparse(partes._replace(query=urlencode(q, doseq=True)))
+
 # --------------- paso SD-1: abrir home autenticada ---------------
 
 def abrir_home_sciencedirect(driver, url, carpeta_descargas):
@@ -225,7 +201,7 @@ def abrir_home_sciencedirect(driver, url, carpeta_descargas):
     visible = False
     for how, what in candidatos:
         try:
-            WebDriverWait(driver, 15).until(EC.presence_of_element_located((how, what)))
+            esperar(driver, EC.presence_of_element_located((how, what)), timeout=15, paso="home")
             visible = True
             break
         except Exception:
@@ -238,18 +214,19 @@ def abrir_home_sciencedirect(driver, url, carpeta_descargas):
 
 # --------------- paso SD-2: buscar cadena ----------------
 
+@trazar("sd.search")
 def buscar_en_sciencedirect(driver, query, carpeta_descargas):
     text = f"\"{query}\"" if '"' not in query else query
     _type(driver, By.CSS_SELECTOR, 'input#qs[name="qs"]', text)
     _click(driver, By.CSS_SELECTOR, 'button[aria-label="Submit quick search"]', use_js_fallback=True)
     _esperar_resultados_listos(driver, timeout=25)
-    time.sleep(0.4)
     _guardar(driver, carpeta_descargas, "sd_resultados.png")
     print("✅ Resultados de ScienceDirect cargados:", driver.current_url)
     return True
 
 # --------------- SD-2b: forzar 100 por página ----------------
 
+@trazar("sd.per_page")
 def fijar_resultados_por_pagina(driver, per_page=100, carpeta_descargas=None):
     ok = _set_results_per_page(driver, per_page=per_page, timeout=25)
     if carpeta_descargas:
@@ -260,8 +237,10 @@ def fijar_resultados_por_pagina(driver, per_page=100, carpeta_descargas=None):
 
 # --------------- paso SD-3: exportar RIS de la página actual ---------------
 
+@trazar("sd.export_page")
 def exportar_ris_pagina_actual_sd(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", etiqueta="p1"):
     _esperar_resultados_listos(driver, timeout=25)
+    grabar_pagina(driver)   # modo grabación: el RIS que baje queda asociado a esta página
     _marcar_select_all_robusto(driver)
 
     try:
@@ -270,7 +249,7 @@ def exportar_ris_pagina_actual_sd(driver, carpeta_descargas, consulta_slug="gene
         pass
 
     _click(driver, By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-expand"]', use_js_fallback=True)
-    time.sleep(0.3)
+    # el menú se despliega: _click ya espera a que 'RIS' sea clicable
     _click(driver, By.CSS_SELECTOR, 'button[data-aa-button="srp-export-multi-ris"]', use_js_fallback=True)
 
     ruta = esperar_descarga_por_extension(carpeta_descargas, extension=".ris", timeout=120)
@@ -279,29 +258,33 @@ def exportar_ris_pagina_actual_sd(driver, carpeta_descargas, consulta_slug="gene
     final_path = renombrar_si_es_necesario(ruta, nombre_final)
 
     print(f"✅ SD {etiqueta}: descargado -> {final_path}")
+    if final_path:
+        contar("biblio_paginas_exportadas_total", fuente="ScienceDirect", modo="selenium")
     return final_path
 
 # --------------- NUEVO: paginación ----------------
 
 def ir_a_siguiente_pagina_sd(driver, timeout=20):
     """
-    Click en 'next' y espera a que la URL cambie o aumente el offset.
-    Devuelve True si avanzó, False si no hay siguiente.
+    Click en 'next' y espera a que la lista de resultados se vuelva a pintar (MutationObserver;
+    sondeo de URL/offset como respaldo). Devuelve True si avanzó; False si no hay siguiente o si el
+    clic no produjo transición.
     """
     _esperar_resultados_listos(driver, timeout=timeout)
-    old_url = driver.current_url
+    e = estado_pagina(driver, "ScienceDirect")
+    old_url = e.get("url") or driver.current_url
     old_offset, old_show = _get_offset_show_from_url(old_url)
 
-    try:
-        nxt = driver.find_element(By.CSS_SELECTOR, 'li.pagination-link.next-link a.anchor[data-aa-name="srp-next-page"]')
-    except NoSuchElementException:
+    nxt = e.get("siguiente")
+    if not nxt:
         return False  # no hay siguiente
 
-    _scroll_into_view(driver, nxt)
-    try:
-        nxt.click()
-    except ElementClickInterceptedException:
-        driver.execute_script("arguments[0].click();", nxt)
+    def _clic():
+        _scroll_into_view(driver, nxt)
+        try:
+            nxt.click()
+        except ElementClickInterceptedException:
+            driver.execute_script("arguments[0].click();", nxt)
 
     def avanzó(d):
         new_url = d.current_url
@@ -310,36 +293,157 @@ def ir_a_siguiente_pagina_sd(driver, timeout=20):
         new_offset, _ = _get_offset_show_from_url(new_url)
         return new_offset > old_offset
 
-    try:
-        WebDriverWait(driver, timeout).until(avanzó)
-    except TimeoutException:
-        # Si la URL no cambió pero la página recargó dinámicamente, revalidamos resultados.
-        pass
+    # Si la URL no cambió pero la página recargó dinámicamente, revalidamos resultados.
+    # Sin transición el clic no hizo nada: seguir exportaría la misma página con la etiqueta siguiente.
+    if not esperar_transicion(driver, _clic, SELECTORES["ScienceDirect"]["items"], timeout=timeout,
+                              paso="siguiente_pagina", condicion=avanzó):
+        return False
 
     _esperar_resultados_listos(driver, timeout=timeout)
-    time.sleep(0.3)
     return True
 
-def descargar_varias_paginas_sd(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", paginas=5, etiqueta_prefijo="p"):
+def _recargar_resultados_sd(driver):
+    """Antes de reintentar: recarga la SRP (conserva offset/show en la URL); la selección se rehace al exportar."""
+    driver.refresh()
+    _esperar_resultados_listos(driver, timeout=25)
+
+def descargar_varias_paginas_sd(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", paginas=5, etiqueta_prefijo="p",
+                                al_descargar=None, reintentos=2, backoff_base=2.0, fallidas=None, detener=None):
     """
     Descarga RIS de la página actual y avanza 'next' hasta 'paginas' veces.
     Asume que ya está fijado show=100 y en resultados.
+    al_descargar(ruta): callback opcional por cada archivo descargado.
+    Cada página se reintenta hasta 'reintentos' veces (backoff exponencial, recarga y re-selección);
+    si sigue fallando se anota en 'fallidas' y se pasa a la siguiente.
+    Con el total de resultados se recorta 'paginas' a las que existen y se informa avance/ETA.
+    detener(ruta) -> True corta la paginación tras esa página (modo incremental: página ya conocida).
     """
+    total = total_resultados_sd(driver)
+    _, show = _get_offset_show_from_url(driver.current_url)
+    plan = plan_paginas(total, show, paginas)
+    informar_plan("SD", consulta_slug, total, show, plan, paginas)
+    paginas = len(plan)
+    progreso = Progreso(paginas, f"SD {consulta_slug}")
+
     archivos = []
+    huecos = []
     for i in range(1, paginas + 1):
         etiqueta = f"{etiqueta_prefijo}{i}"
-        path = exportar_ris_pagina_actual_sd(
-            driver,
-            carpeta_descargas=carpeta_descargas,
-            consulta_slug=consulta_slug,
-            etiqueta=etiqueta
-        )
-        archivos.append(path)
-
-        if i < paginas:
-            moved = ir_a_siguiente_pagina_sd(driver, timeout=25)
-            if not moved:
-                print("ℹ️ No hay más páginas (se detiene la paginación).")
+        with en_pagina(f"sd:{etiqueta}"):
+            def intento():
+                with paso_capturado(driver, carpeta_descargas, f"sd_{etiqueta}"):
+                    path = exportar_ris_pagina_actual_sd(
+                        driver,
+                        carpeta_descargas=carpeta_descargas,
+                        consulta_slug=consulta_slug,
+                        etiqueta=etiqueta
+                    )
+                if not path:
+                    raise RuntimeError(f"no llegó el .ris de {etiqueta}")
+                return path
+
+            try:
+                path = con_reintentos(intento, reintentos, backoff_base, preparar=lambda: _recargar_resultados_sd(driver),
+                                      etiqueta=f"SD {etiqueta}")
+                archivos.append(path)
+                if al_descargar:
+                    al_descargar(path)
+            except Exception as e:
+                print(f"⚠️ SD {etiqueta}: sin exportar tras {reintentos + 1} intento(s): {e}")
+                huecos.append(pagina_fallida("ScienceDirect", consulta_slug, i, e))
+                path = None
+            progreso.avanzar()
+
+            if detener and path and detener(path):
+                print(f"⏹️ SD {etiqueta}: todos los registros ya estaban en el corpus; fin de la paginación.")
                 break
 
-    return archivos
\ No newline at end of file
+            moved = True
+            if i < paginas:
+                try:
+                    moved = ir_a_siguiente_pagina_sd(driver, timeout=25)
+                except Exception as e:
+                    print(f"⚠️ SD {etiqueta}: no se pudo pasar a la siguiente página: {e}")
+                    moved = False
+        if not moved:
+            print("ℹ️ No hay más páginas (se detiene la paginación).")
+            break
+
+    informar_fallidas(huecos)
+    if fallidas is not None:
+        fallidas.extend(huecos)
+    return archivos
+
+# --------------- paginación directa por offset (varios navegadores) ----------------
+
+def _url_busqueda_sd(url_base, query, show=100, desde=None, hasta=None, orden=None):
+    """/search?qs="query"&show=N, con filtro de años (date=AAAA o AAAA-AAAA) y orden opcionales."""
+    params = {"qs": f"\"{query}\"" if not (query.startswith('"') and query.endswith('"')) else query, "show": show}
+    if desde is not None or hasta is not None:
+        params["date"] = str(desde) if desde == hasta else f"{desde if desde is not None else ''}-{hasta if hasta is not None else ''}"
+    if orden:
+        params["sortBy"] = orden
+    return urljoin(url_base, "/search?" + urlencode(params))
+
+def abrir_busqueda_sd(driver, url_base, query, show=100, desde=None, hasta=None, timeout=25):
+    """Abre la SRP directo por URL (sin el buscador de la home), con filtro de años opcional."""
+    driver.get(_url_busqueda_sd(url_base, query, show=show, desde=desde, hasta=hasta))
+    _esperar_resultados_listos(driver, timeout=timeout)
+
+def contar_resultados_sd(driver, url_base, query, desde=None, hasta=None):
+    """Total de resultados de la consulta (con filtro de años opcional); navega el driver."""
+    driver.get(_url_busqueda_sd(url_base, query, show=25, desde=desde, hasta=hasta))
+    return total_resultados_sd(driver, timeout=15)
+
+def ordenar_por_fecha_sd(driver, timeout=25):
+    """Recarga la búsqueda actual ordenada por fecha (más recientes primero), desde offset 0."""
+    _, show = _get_offset_show_from_url(driver.current_url)
+    partes = urlparse(_url_con_offset(driver.current_url, 0, show))
+    q = parse_qs(partes.query, keep_blank_values=True)
+    q["sortBy"] = [ORDEN_FECHA_SD]
+    driver.get(urlunparse(partes._replace(query=urlencode(q, doseq=True))))
+    _esperar_resultados_listos(driver, timeout=timeout)
+
+def ir_a_pagina_sd(driver, url_resultados, pagina, show, timeout=25):
+    """Navega directo a la página N (1-based) con offset=(N-1)*show, sin clicar 'next'."""
+    driver.get(_url_con_offset(url_resultados, (pagina - 1) * show, show))
+    _esperar_resultados_listos(driver, timeout=timeout)
+
+def descargar_paginas_sd_por_offset(driver, carpeta_descargas, consulta_slug="generative-artificial-intelligence", paginas=5,
+                                    etiqueta_prefijo="p", navegadores=1, reintentos=1, al_descargar=None, fallidas=None):
+    """
+    Como descargar_varias_paginas_sd, pero construye la URL de cada página (offset=k*show)
+    y reparte las páginas entre 'navegadores' Chrome que comparten la sesión autenticada.
+    Una página que falla se reintenta sola ('reintentos' veces).
+    'paginas' puede ser un entero (1..N) o una lista de números de página.
+    Devuelve la lista de archivos en orden de página; informa las páginas que no se pudieron bajar.
+    """
+    url_resultados = driver.current_url
+    _, show = _get_offset_show_from_url(url_resultados)
+    total = total_resultados_sd(driver)
+    lista = plan_paginas(total, show, paginas)
+    informar_plan("SD", consulta_slug, total, show, lista, paginas)
+    progreso = Progreso(len(lista), f"SD {consulta_slug}")
+
+    def tarea(drv, carpeta_w, pagina):
+        etiqueta = f"{etiqueta_prefijo}{pagina}"
+        with en_pagina(f"sd:{etiqueta}"), paso_capturado(drv, carpeta_descargas, f"sd_{etiqueta}"):
+            ir_a_pagina_sd(drv, url_resultados, pagina, show)
+            ruta = exportar_ris_pagina_actual_sd(drv, carpeta_w, consulta_slug=consulta_slug, etiqueta=etiqueta)
+        if not ruta:
+            raise RuntimeError(f"no llegó el .ris de {etiqueta}")
+        ruta = mover_descarga(ruta, carpeta_descargas)
+        if al_descargar:
+            al_descargar(ruta)
+        progreso.avanzar()
+        return ruta
+
+    with navegadores_clonados(driver, navegadores, carpeta_descargas, url_resultados) as navs:
+        print(f"→ SD: {len(lista)} página(s) por offset (show={show}) en {len(navs)} navegador(es)...")
+        resultados, fallidos = repartir_en_navegadores(navs, lista, tarea, reintentos=reintentos)
+
+    for pagina, err in sorted(fallidos.items()):
+        print(f"⚠️ SD {etiqueta_prefijo}{pagina}: no se pudo exportar ({err})")
+        if fallidas is not None:
+            fallidas.append(pagina_fallida("ScienceDirect", consulta_slug, pagina, err))
+    return [resultados[p] for p in lista if p in resultados]
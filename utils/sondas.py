@@ -0,0 +1,117 @@
+# utils/sondas.py
+# Sonda de estado de la SRP en una sola llamada: en vez de 3-6 find_elements/get_attribute
+# por sondeo (cada uno es un viaje HTTP a chromedriver), un execute_script devuelve de una vez
+# número de resultados, total, select-all, botón Export, enlace 'Siguiente', modal y per-page.
+# Las esperas de sage.py / sciencedirect.py / main_pipeline.py sondean con esto.
+
+# Selectores por fuente. Cada entrada es un selector CSS o una lista de candidatos
+# (CSS, o XPath si empieza con '/'); se usa el primero que exista.
+SELECTORES = {
+    "SAGE": {
+        "items": 'a[href*="/doi/"], a.issue-item__title, div.search__item',
+        "total": ['span.result__count', '.result__count'],
+        "select_all": '#action-bar-select-all',
+        "export": 'a[data-id="srp-export-citations"]',
+        "siguiente": [
+            'a.next.hvr-forward.pagination__link',
+            'a.pagination__link.next',
+            'li.pagination-link.next-link > a.anchor',
+            '//a[contains(@class,"pagination__link") and contains(@class,"next")]',
+            '//a[contains(@data-aa-name,"next") or .//span[contains(., "next")]]',
+        ],
+        "modal": '#exportCitation',
+        # contador y 'limpiar' de la selección acumulada entre páginas (barra de acciones de la SRP)
+        "seleccionados": ['.action-bar__selected-count', '[data-selected-count]', '.selected-count'],
+        "limpiar_seleccion": [
+            'button.action-bar__clear-selection',
+            'a[data-id="srp-clear-selection"]',
+            '//button[contains(., "Clear selection") or contains(., "Deselect all")]',
+        ],
+    },
+    "ScienceDirect": {
+        "items": 'a.result-list-title-link, ol.search-results li, div.result-item-content',
+        "total": ['span.search-body-results-text', '.search-body-results-text'],
+        "select_all": ['#select-all-results', 'input.checkbox-input#select-all-results',
+                       'input.checkbox-input[aria-label*="Select all"]'],
+        "select_all_label": ['label[for="select-all-results"]', 'label.checkbox-label[for="select-all-results"]'],
+        "export": 'button[data-aa-button="srp-export-multi-expand"]',
+        "siguiente": [
+            'li.pagination-link.next-link a.anchor[data-aa-name="srp-next-page"]',
+            'a.anchor[data-aa-name="srp-next-page"]',
+            '//a[contains(@data-aa-name,"srp-next-page") or .//span[contains(., "next")]]',
+        ],
+        "por_pagina": ['ol.ResultsPerPage li[aria-current="true"]', 'ol.ResultsPerPage span.active-per-page'],
+    },
+}
+
+_SONDA_JS = """
+const S = arguments[0];
+const lista = s => s ? [].concat(s) : [];
+const uno = s => {
+    for (const sel of lista(s)) {
+        let el = null;
+        try {
+            el = sel.startsWith('/')
+                ? document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+                : document.querySelector(sel);
+        } catch (e) {}
+        if (el) return el;
+    }
+    return null;
+};
+const cuantos = s => lista(s).reduce((n, sel) => { try { return n + document.querySelectorAll(sel).length; } catch (e) { return n; } }, 0);
+const texto = el => el ? (el.innerText || el.textContent || '').trim() : null;
+const visible = el => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)
+                      && getComputedStyle(el).visibility !== 'hidden';
+const habilitado = el => !!el && !el.hasAttribute('disabled')
+                         && (el.getAttribute('aria-disabled') || '').toLowerCase() !== 'true'
+                         && !String(el.className || '').includes('disabled');
+const sa = uno(S.select_all), ex = uno(S.export), sig = uno(S.siguiente);
+return {
+    url: location.href,
+    items: cuantos(S.items),
+    total: texto(uno(S.total)),
+    select_all: sa,
+    select_all_label: uno(S.select_all_label),
+    seleccionado: !!sa && (sa.checked === true || (sa.getAttribute('aria-checked') || '').toLowerCase() === 'true'),
+    export: ex,
+    export_habilitado: habilitado(ex),
+    siguiente: sig,
+    siguiente_habilitado: habilitado(sig),
+    siguiente_href: sig ? sig.getAttribute('href') : null,
+    modal: visible(uno(S.modal)),
+    backdrop: document.querySelectorAll('.modal-backdrop').length > 0,
+    por_pagina: texto(uno(S.por_pagina)),
+    seleccionados: texto(uno(S.seleccionados)),
+    limpiar_seleccion: uno(S.limpiar_seleccion),
+};
+"""
+
+def estado_pagina(driver, fuente):
+    """
+    Estado de la SRP de 'fuente' en un solo execute_script. Claves: url, items (n.º de resultados
+    visibles), total (texto), select_all / select_all_label / export / siguiente (WebElement o None),
+    seleccionado, export_habilitado, siguiente_habilitado, siguiente_href, modal, backdrop, por_pagina,
+    seleccionados (texto del contador de selección), limpiar_seleccion (WebElement o None).
+    Si la página no responde (navegando, alerta, etc.) devuelve {} y los predicados dan False.
+    """
+    try:
+        return driver.execute_script(_SONDA_JS, SELECTORES[fuente]) or {}
+    except Exception:
+        return {}
+
+def cuando(fuente, predicado):
+    """Condición para esperar(): predicado(estado) sobre una sola sonda por sondeo."""
+    return lambda d: predicado(estado_pagina(d, fuente))
+
+# ---------------- predicados sobre el estado ----------------
+
+def resultados_sage(e):
+    return e.get("items", 0) > 0
+
+def resultados_sd(e):
+    """SRP lista: hay select-all o botón Export, y hay resultados visibles."""
+    return bool(e.get("select_all") or e.get("export")) and e.get("items", 0) > 0
+
+def sin_modal(e):
+    return bool(e) and not e.get("modal") and not e.get("backdrop")
@@ -11,27 +11,27 @@
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time, os
+from .esperas import esperar
+from .trazas import trazar
+from .capturas import capturar, paso_capturado
 
 # ------------------------ utilidades básicas ------------------------
 
 def _click(driver, how, what, timeout=10):
-    """Hace clic cuando un elemento es clicable."""
-    WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((how, what))).click()
-
-def _type(driver, how, what, text, timeout=10):
-    """Escribe texto en un input cuando está presente."""
-    elem = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((how, what)))
+    """Hace clic cuando un elemento es clicable. Devuelve el elemento."""
+    elem = esperar(driver, EC.element_to_be_clickable((how, what)), timeout=timeout, paso="login_clic")
+    elem.click()
+    return elem
+
+def _type(driver, how, what, text, timeout=10, condicion=EC.presence_of_element_located):
+    """Escribe texto en un input cuando cumple la condición (por defecto: presente)."""
+    elem = esperar(driver, condicion((how, what)), timeout=timeout, paso="login_escribir")
     elem.clear()
     elem.send_keys(text)
 
 def _guardar_captura(driver, carpeta, nombre):
-    """Guarda una captura PNG con el nombre indicado dentro de la carpeta dada."""
-    try:
-        os.makedirs(carpeta, exist_ok=True)
-        driver.save_screenshot(os.path.join(carpeta, f"{nombre}.png"))
-    except Exception:
-        pass
+    """Captura PNG '<nombre>.png' según la política de utils.capturas (escrita en segundo plano)."""
+    capturar(driver, carpeta, f"{nombre}.png")
 
 # ------------------------ manejo del modal de Chrome ------------------------
 
@@ -42,24 +42,23 @@ def _intentar_cerrar_modal_perfil_chrome(driver):
     Devuelve True si lo cerró, False si no apareció o no pudo.
     """
     try:
-        boton_sin_cuenta = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable(
-                (
-                    By.XPATH,
-                    # Botón que contiene el texto "Usar Chrome sin una cuenta"
-                    '//button[.//span[contains(., "Usar Chrome sin una cuenta")] '
-                    ' or contains(normalize-space(.), "Usar Chrome sin una cuenta")]'
-                )
+        boton_sin_cuenta = esperar(driver, EC.element_to_be_clickable(
+            (
+                By.XPATH,
+                # Botón que contiene el texto "Usar Chrome sin una cuenta"
+                '//button[.//span[contains(., "Usar Chrome sin una cuenta")] '
+                ' or contains(normalize-space(.), "Usar Chrome sin una cuenta")]'
             )
-        )
+        ), timeout=5, paso="login_modal_chrome")
         boton_sin_cuenta.click()
-        time.sleep(1)
+        esperar(driver, EC.staleness_of(boton_sin_cuenta), timeout=3, paso="login_modal_chrome", ignorar_timeout=True)
         return True
     except Exception:
         return False
 
 # ------------------------ flujo principal de login ------------------------
 
+@trazar("login")
 def login_con_google(driver, url_revista, correo_institucional, contrasena, carpeta_descargas, dominio_objetivo=None):
     """
     Flujo:
@@ -71,62 +70,62 @@ def login_con_google(driver, url_revista, correo_institucional, contrasena, carp
       5) Cerrar modal de Chrome si aparece ("Usar Chrome sin una cuenta")
       6) Esperar redirección de vuelta al proxy/base (o esperar a que termines 2FA si aplica)
     """
-    # 1) Abrir la revista
-    driver.get(url_revista)
-    _guardar_captura(driver, carpeta_descargas, "01_pantalla_revista")
+    with paso_capturado(driver, carpeta_descargas, "login"):
+        # 1) Abrir la revista
+        driver.get(url_revista)
+        _guardar_captura(driver, carpeta_descargas, "01_pantalla_revista")
 
-    # 2) Botón "Iniciar sesión con Google"
-    _click(driver, By.ID, "btn-google")
-    _guardar_captura(driver, carpeta_descargas, "02_google_iniciado")
-
-    # 3) ¿Aparece tu cuenta para seleccionarla?
-    try:
-        cuenta_chip = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, f'div[data-identifier="{correo_institucional}"]'))
-        )
-        cuenta_chip.click()
-        _guardar_captura(driver, carpeta_descargas, "03_cuenta_seleccionada")
-    except Exception:
-        # Si no, escribimos el correo manualmente
-        _type(driver, By.ID, "identifierId", correo_institucional, timeout=15)
-        _click(driver, By.ID, "identifierNext")
-        time.sleep(2)
-        _guardar_captura(driver, carpeta_descargas, "03_correo_enviado")
-
-    # 4) Contraseña
-    try:
-        _type(driver, By.NAME, "Passwd", contrasena, timeout=20)
-    except Exception:
-        # Puede tardar en renderizar; esperamos un poco y reintentamos
-        time.sleep(3)
-        _type(driver, By.NAME, "Passwd", contrasena, timeout=20)
+        # 2) Botón "Iniciar sesión con Google"
+        _click(driver, By.ID, "btn-google")
+        _guardar_captura(driver, carpeta_descargas, "02_google_iniciado")
 
-    _click(driver, By.ID, "passwordNext")
-    _guardar_captura(driver, carpeta_descargas, "04_password_enviado")
-
-    # 5) Cerrar el modal de “¿Quieres acceder a Chrome?” si aparece
-    _intentar_cerrar_modal_perfil_chrome(driver)
+        # 3) ¿Aparece tu cuenta para seleccionarla?
+        try:
+            cuenta_chip = esperar(driver, EC.presence_of_element_located(
+                (By.CSS_SELECTOR, f'div[data-identifier="{correo_institucional}"]')
+            ), timeout=5, paso="login_cuenta")
+            cuenta_chip.click()
+            _guardar_captura(driver, carpeta_descargas, "03_cuenta_seleccionada")
+        except Exception:
+            # Si no, escribimos el correo manualmente
+            _type(driver, By.ID, "identifierId", correo_institucional, timeout=15)
+            _click(driver, By.ID, "identifierNext")
+            _guardar_captura(driver, carpeta_descargas, "03_correo_enviado")
 
-    # 5.1) Otras pantallas intermedias (confirmaciones genéricas)
-    for posible in [
-        (By.ID, "confirm"),
-        (By.XPATH, '//button[contains(.,"Aceptar") or contains(.,"Acepto") or contains(.,"Continuar")]'),
-    ]:
+        # 4) Contraseña (el input existe antes de ser interactuable por la animación:
+        #    esperamos a que sea clicable en vez de dormir un tiempo fijo)
+        try:
+            _type(driver, By.NAME, "Passwd", contrasena, timeout=20, condicion=EC.element_to_be_clickable)
+        except Exception:
+            # Puede quedar obsoleto si Google re-renderiza el paso; reintentamos una vez
+            _type(driver, By.NAME, "Passwd", contrasena, timeout=20, condicion=EC.element_to_be_clickable)
+
+        _click(driver, By.ID, "passwordNext")
+        _guardar_captura(driver, carpeta_descargas, "04_password_enviado")
+
+        # 5) Cerrar el modal de “¿Quieres acceder a Chrome?” si aparece
+        _intentar_cerrar_modal_perfil_chrome(driver)
+
+        # 5.1) Otras pantallas intermedias (confirmaciones genéricas)
+        for posible in [
+            (By.ID, "confirm"),
+            (By.XPATH, '//button[contains(.,"Aceptar") or contains(.,"Acepto") or contains(.,"Continuar")]'),
+        ]:
+            try:
+                boton = _click(driver, *posible, timeout=5)
+                esperar(driver, EC.staleness_of(boton), timeout=3, paso="login_confirmar", ignorar_timeout=True)
+            except Exception:
+                pass
+
+        # 6) Esperar a volver a la revista/proxy (o a que salgas de accounts.google.com)
         try:
-            _click(driver, *posible, timeout=5)
-            time.sleep(1)
+            if dominio_objetivo:
+                esperar(driver, EC.url_contains(dominio_objetivo), timeout=40, paso="login_redireccion")
+            else:
+                esperar(driver, lambda d: "accounts.google.com" not in d.current_url, timeout=40, paso="login_redireccion")
         except Exception:
+            # Si hay 2FA/CAPTCHA, aquí se queda esperando a que lo completes manualmente.
             pass
 
-    # 6) Esperar a volver a la revista/proxy (o a que salgas de accounts.google.com)
-    try:
-        if dominio_objetivo:
-            WebDriverWait(driver, 40).until(EC.url_contains(dominio_objetivo))
-        else:
-            WebDriverWait(driver, 40).until_not(EC.url_contains("accounts.google.com"))
-    except Exception:
-        # Si hay 2FA/CAPTCHA, aquí se queda esperando a que lo completes manualmente.
-        pass
-
-    _guardar_captura(driver, carpeta_descargas, "05_redirigido_ok")
-    print("✅ Autenticación con Google finalizada (o en espera de verificación manual si aplica).")
+        _guardar_captura(driver, carpeta_descargas, "05_redirigido_ok")
+        print("✅ Autenticación con Google finalizada (o en espera de verificación manual si aplica).")
@@ -0,0 +1,156 @@
+# utils/trazas.py
+# Trazas opcionales (spans) para saber en qué se va el tiempo del pipeline:
+# login, búsqueda, export por página, espera de descarga, discovery, parseo, merge y export.
+#
+# Activación (opt-in):
+#   - variable de entorno BIBLIO_TRACE=<ruta.jsonl>  (o "1" para un nombre por defecto)
+#   - o activar_trazas(ruta) / flag --trace en main_pipeline.py
+# Apagadas, span() devuelve un contexto nulo compartido y trazar() llama directo a la función.
+
+import os, json, math, time, atexit, threading, functools
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+_NULO = nullcontext()
+
+_activo = False
+_lock = threading.Lock()
+_ctx = threading.local()   # pila de spans abiertos (por hilo)
+_archivo = None
+_ruta = None
+_duraciones = {}           # nombre -> [ms, ...]
+
+# ---------------- activación ----------------
+
+def activar_trazas(ruta=None):
+    """Empieza a escribir spans en 'ruta' (JSON-lines). Devuelve la ruta usada."""
+    global _activo, _archivo, _ruta
+    if not ruta or ruta in ("1", "true", "True"):
+        ruta = f"trazas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    with _lock:
+        if _archivo:
+            _archivo.close()
+        carpeta = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(carpeta, exist_ok=True)
+        _archivo = open(ruta, "a", encoding="utf-8")
+        _ruta = ruta
+        _duraciones.clear()
+        _activo = True
+    return ruta
+
+def desactivar_trazas():
+    global _activo, _archivo
+    with _lock:
+        _activo = False
+        if _archivo:
+            _archivo.close()
+            _archivo = None
+
+def trazas_activas():
+    return _activo
+
+atexit.register(desactivar_trazas)
+
+if os.environ.get("BIBLIO_TRACE"):
+    activar_trazas(os.environ["BIBLIO_TRACE"])
+
+# ---------------- spans ----------------
+
+def span(nombre, **atributos):
+    """
+    with span("sage.export_page", pagina="p3"): ...
+    Sin trazas activas no mide nada (contexto nulo).
+    """
+    if not _activo:
+        return _NULO
+    return _span(nombre, atributos)
+
+def trazar(nombre):
+    """Decorador: envuelve toda la función en un span con ese nombre."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            if not _activo:
+                return fn(*args, **kwargs)
+            with _span(nombre, {}):
+                return fn(*args, **kwargs)
+        return envoltura
+    return deco
+
+@contextmanager
+def _span(nombre, atributos):
+    pila = getattr(_ctx, "pila", None)
+    if pila is None:
+        pila = _ctx.pila = []
+    padre = pila[-1] if pila else None
+    pila.append(nombre)
+    inicio = time.time()
+    t0 = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        dur_ms = (time.perf_counter() - t0) * 1000.0
+        pila.pop()
+        linea = {
+            "name": nombre,
+            "start": inicio,
+            "dur_ms": round(dur_ms, 3),
+            "thread": threading.current_thread().name,
+            "parent": padre,
+        }
+        if atributos:
+            linea["attrs"] = atributos
+        if error:
+            linea["error"] = error
+        with _lock:
+            _duraciones.setdefault(nombre, []).append(dur_ms)
+            if _archivo:
+                _archivo.write(json.dumps(linea, ensure_ascii=False, default=str) + "\n")
+                _archivo.flush()
+
+# ---------------- resumen ----------------
+
+def _percentil(valores_ordenados, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores_ordenados:
+        return 0.0
+    k = max(0, min(len(valores_ordenados) - 1, math.ceil(p / 100.0 * len(valores_ordenados)) - 1))
+    return valores_ordenados[k]
+
+def resumen_trazas():
+    """{nombre: {"n", "total_ms", "p50_ms", "p95_ms", "max_ms"}} de los spans de esta ejecución."""
+    with _lock:
+        datos = {k: sorted(v) for k, v in _duraciones.items()}
+    out = {}
+    for nombre, vals in datos.items():
+        out[nombre] = {
+            "n": len(vals),
+            "total_ms": sum(vals),
+            "p50_ms": _percentil(vals, 50),
+            "p95_ms": _percentil(vals, 95),
+            "max_ms": vals[-1],
+        }
+    return out
+
+def imprimir_resumen_trazas():
+    """Imprime la tabla p50/p95 por paso y la guarda junto a la traza (<ruta>.resumen.txt)."""
+    res = resumen_trazas()
+    if not res:
+        return
+    lineas = [f"{'paso':<28}{'n':>6}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+    for nombre, r in sorted(res.items(), key=lambda kv: -kv[1]["total_ms"]):
+        lineas.append(f"{nombre:<28}{r['n']:>6}{r['total_ms']/1000:>10.2f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['max_ms']:>10.1f}")
+
+    print(f"\n🧭 Trazas ({_ruta})")
+    for ln in lineas:
+        print("   " + ln)
+    if _ruta:
+        try:
+            with open(os.path.splitext(_ruta)[0] + ".resumen.txt", "w", encoding="utf-8") as f:
+                f.write("\n".join(lineas) + "\n")
+        except OSError:
+            pass
@@ -0,0 +1,147 @@
+# utils/vigilancia.py
+# Modo vigilancia (python main_unificar.py --vigilar): un proceso que queda corriendo,
+# mira las carpetas de descarga y, cuando llega un RIS nuevo, lo parsea en el momento,
+# lo pliega en el índice de deduplicación (IndiceDedup, el mismo de merge_records) y
+# reexporta las salidas con un debounce (una ráfaga de descargas = una sola exportación).
+#
+# Sin dependencias extra: sondeo con utils.descubrimiento (las carpetas cuyo mtime no cambió
+# no se relistan) cada 'intervalo' segundos. Un archivo se toma cuando su tamaño y mtime se
+# mantienen entre dos sondeos (descarga terminada), también los que ya estaban al arrancar.
+# Si un archivo ya leído cambia o se borra, el índice se rehace desde los registros guardados
+# por archivo. Las subcarpetas _wN de los navegadores clonados (utils.paralelo) no se miran:
+# lo que baja ahí se mueve después a la carpeta de la fuente.
+# Las salidas se escriben en una carpeta temporal y se reemplazan de a una con os.replace:
+# quien las lea nunca ve un CSV/JSONL a medio escribir.
+
+import os, time, shutil, tempfile
+from contextlib import redirect_stdout
+from .ris_merge import parse_ris_file, export_outputs, IndiceDedup
+from .descubrimiento import recorrer, IGNORAR
+from .metricas import contar, volcar_metricas
+
+# carpetas de descarga de los clones (utils.paralelo.navegadores_clonados)
+IGNORAR_VIGILANCIA = IGNORAR + ("_w*",)
+
+class Vigilante:
+    """
+    dirs: [(carpeta, etiqueta_source_db)] como en load_ris_from_dirs.
+    paso() hace un sondeo (y exporta si venció el debounce); vigilar() repite paso() hasta Ctrl+C.
+    """
+    def __init__(self, dirs, out_dir, base_name="unificado", exts=(".ris", ".RIS", ".txt", ".TXT"),
+                 intervalo=1.0, debounce=3.0):
+        self.dirs = [(d, e) for d, e in dirs if d and os.path.isdir(d)]
+        self.out_dir, self.base_name, self.exts = out_dir, base_name, exts
+        self.intervalo, self.debounce = intervalo, debounce
+        self.indice = IndiceDedup(copiar=True)
+        self.por_archivo = {}       # ruta -> (firma, registros)
+        self._pendientes = {}       # ruta -> firma vista en el sondeo anterior (esperando que se estabilice)
+        self._manifiestos = {}      # carpeta -> entradas de mtimes (en memoria)
+        self._sucio_desde = None    # momento del primer cambio aún no exportado
+        self._ultimo_cambio = None
+        self._primera = True        # hasta tomar lo que ya estaba al arrancar (sin avisos por archivo)
+
+    # ---------------- sondeo ----------------
+
+    def _listar(self):
+        """{ruta: (etiqueta, firma)} de los archivos candidatos (firma = tamaño, mtime)."""
+        vistos = {}
+        for carpeta, etiqueta in self.dirs:
+            archivos, visitadas = recorrer(carpeta, exts=self.exts, ignorar=IGNORAR_VIGILANCIA,
+                                           previas=self._manifiestos.get(carpeta))
+            self._manifiestos[carpeta] = visitadas
+            for ruta in archivos:
+                try:
+                    st = os.stat(ruta)
+                except OSError:
+                    continue
+                vistos.setdefault(ruta, (etiqueta, (st.st_size, st.st_mtime_ns)))
+        return vistos
+
+    def paso(self):
+        """Un sondeo: parsea lo nuevo y estable; devuelve cuántos registros nuevos entraron."""
+        vistos = self._listar()
+        nuevos, rehacer = 0, False
+
+        for ruta in list(self.por_archivo):
+            if ruta not in vistos:
+                print(f"🗑️ {os.path.basename(ruta)} ya no está; se rehace el índice.")
+                del self.por_archivo[ruta]
+                rehacer = True
+
+        for ruta, (etiqueta, firma) in vistos.items():
+            previo = self.por_archivo.get(ruta)
+            if previo and previo[0] == firma:
+                continue
+            if self._pendientes.get(ruta) != firma:
+                self._pendientes[ruta] = firma      # aún escribiéndose: esperar al próximo sondeo
+                continue
+            self._pendientes.pop(ruta, None)
+            try:
+                registros = parse_ris_file(ruta, source_db=etiqueta)
+            except Exception as e:
+                print(f"⚠️ Error parseando {ruta}: {e}")
+                contar("biblio_errores_parseo_total")
+                continue
+            self.por_archivo[ruta] = (firma, registros)
+            if previo:
+                rehacer = True
+            else:
+                n = self.indice.agregar(registros)
+                nuevos += n
+                if not self._primera:
+                    print(f"📥 {os.path.basename(ruta)}: {len(registros)} registro(s), {n} nuevo(s) "
+                          f"(total {len(self.indice)}).")
+            self._marcar()
+
+        self._pendientes = {r: f for r, f in self._pendientes.items() if r in vistos}
+        if self._primera and not self._pendientes:
+            self._primera = False
+            print(f"📚 {len(self.por_archivo)} archivo(s) ya presentes -> {len(self.indice)} registro(s) unificado(s).")
+
+        if rehacer:
+            self.indice = IndiceDedup(copiar=True)
+            for _, registros in self.por_archivo.values():
+                nuevos += self.indice.agregar(registros)
+            self._marcar()
+
+        if self._sucio_desde is not None and time.monotonic() - self._ultimo_cambio >= self.debounce:
+            self.exportar()
+        return nuevos
+
+    def _marcar(self):
+        ahora = time.monotonic()
+        self._ultimo_cambio = ahora
+        if self._sucio_desde is None:
+            self._sucio_desde = ahora
+
+    # ---------------- export ----------------
+
+    def exportar(self):
+        """Exporta el índice actual reemplazando las salidas de forma atómica."""
+        unificados, duplicados = self.indice.resultado()
+        os.makedirs(self.out_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".vigilancia_", dir=self.out_dir)
+        try:
+            with open(os.devnull, "w") as nulo, redirect_stdout(nulo):
+                export_outputs(unificados, duplicados, tmp, base_name=self.base_name)
+            for nombre in os.listdir(tmp):
+                os.replace(os.path.join(tmp, nombre), os.path.join(self.out_dir, nombre))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        volcar_metricas()
+        demora = time.monotonic() - self._sucio_desde if self._sucio_desde is not None else 0.0
+        self._sucio_desde = None
+        print(f"💾 Salidas actualizadas: {len(unificados)} unificado(s), {len(duplicados)} duplicado(s) "
+              f"({demora:.1f} s desde el primer cambio) -> {self.out_dir}")
+
+    def vigilar(self):
+        carpetas = ", ".join(d for d, _ in self.dirs) or "(ninguna carpeta existente)"
+        print(f"👀 Vigilando {carpetas} cada {self.intervalo:g} s (debounce {self.debounce:g} s). Ctrl+C para salir.")
+        try:
+            while True:
+                self.paso()
+                time.sleep(self.intervalo)
+        except KeyboardInterrupt:
+            if self._sucio_desde is not None:
+                self.exportar()
+            print("\n👋 Vigilancia detenida.")